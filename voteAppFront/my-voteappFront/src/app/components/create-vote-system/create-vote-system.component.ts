@@ -438,7 +438,8 @@ export class CreateVoteSystemComponent implements OnInit {
                       this.submitted = true;
                       
                       if (tokenResponse.success) {
-                        this.successMessage = `Sistemul de vot a fost creat cu succes și au fost trimise ${tokenResponse.emails_sent} email-uri cu coduri de acces!`;
+                        // Email-urile pleacă în fundal; starea lor este afișată pe pagina de status
+                        this.successMessage = `Sistemul de vot a fost creat cu succes și au fost puse în coadă ${tokenResponse.emails_queued} email-uri cu coduri de acces!`;
                       } else {
                         this.successMessage = 'Sistemul de vot a fost creat, dar a apărut o eroare la trimiterea email-urilor.';
                       }
@@ -403,7 +403,7 @@ getEmailCount(): number {
                 console.log('Token-urile au fost trimise cu succes:', tokenResponse);
                 this.isEditSubmitting = false;
                 this.isEditing = false;
-                this.editSuccess = 'Sistemul de vot a fost actualizat cu succes! Token-urile de vot au fost trimise.';
+                this.editSuccess = `Sistemul de vot a fost actualizat cu succes! ${tokenResponse.emails_queued} email-uri cu token-uri de vot au fost puse în coadă.`;
                 
                 // Reîncărcăm detaliile sistemului pentru a reflecta modificările
                 this.loadVoteSystem();
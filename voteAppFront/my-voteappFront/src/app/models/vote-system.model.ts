@@ -11,7 +11,6 @@ export interface VoteSystem {
     options: VoteOption[];
     total_votes: number;
     require_email_verification: boolean;
-    allowed_emails?: string;
   }
   
   export interface VoteOption {
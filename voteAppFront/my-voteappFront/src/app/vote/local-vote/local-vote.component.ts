@@ -909,6 +909,9 @@ getMethodName(methodCode: string): string {
     'direct_lookup_exact_selected': 'secție selectată manual',
     'direct_lookup_normalized_selected': 'secție selectată manual',
     'direct_lookup_partial_selected': 'secție selectată manual',
+    'direct_lookup_fuzzy': 'potrivire aproximativă',
+    'direct_lookup_fuzzy_multiple': 'potrivire aproximativă (multiple secții)',
+    'direct_lookup_fuzzy_selected': 'secție selectată manual',
     'direct_lookup': 'căutare directă',
     'ml_model': 'model de inteligență artificială',
     'fallback': 'metodă alternativă',
@@ -1,14 +1,28 @@
 import logging
 import numpy as np
 import cv2
-import face_recognition
-import concurrent.futures
 from PIL import Image
-import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 from .model_manager import model_manager
+from .frame_preprocessing import PreprocessedFrame, decode_image, frame_preprocessor
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class FaceAnalysis:
+    """Rezultatul unei singure treceri de detectare + encoding pe o imagine"""
+    locations: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    encoding: Optional[np.ndarray] = None
+    error: Optional[str] = None
+
+    @property
+    def num_faces(self):
+        return len(self.locations)
+
+
 class FaceRecognitionService:
     """
     Serviciu pentru recunoașterea facială și anti-spoofing
@@ -26,26 +40,23 @@ class FaceRecognitionService:
     
     def detect_spoofing(self, image_array):
         """Verifică dacă imaginea este reală sau falsă folosind YOLO."""
+        try:
+            frame = frame_preprocessor.prepare(image_array)
+        except Exception as e:
+            logger.error(f"Eroare la preprocesarea imaginii pentru anti-spoofing: {e}")
+            return False
+        return self.detect_spoofing_frame(frame)
+
+    def detect_spoofing_frame(self, frame: PreprocessedFrame):
+        """Rulează anti-spoofing pe tensorul egalizat dintr-un cadru deja preprocesat."""
         try:
             model = self.get_model()
             if model is None:
                 logger.error("Modelul YOLO pentru anti-spoofing nu este disponibil")
                 return False
-                
-            # Redimensionare imagine pentru procesare mai rapidă
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 640 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                image_array = cv2.resize(image_array, (new_w, new_h))
-
-            # Normalizare imagine și detectie spoofing cu YOLO 
-            gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-            normalized = cv2.equalizeHist(gray)
-            image_array = cv2.cvtColor(normalized, cv2.COLOR_GRAY2RGB)
 
             # Optimizare inferență YOLO
-            results = model(image_array, stream=True, verbose=False, conf=0.6)
+            results = model(frame.spoof_input, stream=True, verbose=False, conf=0.6)
 
             for r in results:
                 for box in r.boxes:
@@ -61,69 +72,89 @@ class FaceRecognitionService:
             logger.error(f"Eroare la detectarea spoofing-ului: {e}")
             return False
 
-    def detect_and_encode_face(self, image_array):
-        """Detectează și extrage encoding-ul feței."""
+    def analyze_face(self, image_array):
+        """
+        Detectează fețele (o singură trecere HOG) și extrage encoding-ul feței.
+        Returnează locațiile, numărul de fețe și encoding-ul într-un FaceAnalysis,
+        astfel încât apelanții să nu mai ruleze detectarea a doua oară.
+        """
         try:
-            # Redimensionează imaginea pentru procesare mai rapidă
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 480 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                small_image = cv2.resize(image_array, (new_w, new_h))
-            else:
-                small_image = image_array.copy()
-            
-            # Folosește doar HOG pentru detectare, care este mai rapid
-            face_locations = face_recognition.face_locations(small_image, model="hog")
+            frame = frame_preprocessor.prepare(image_array, for_spoofing=False)
+        except Exception as e:
+            logger.error(f"Eroare la preprocesarea imaginii: {e}")
+            return FaceAnalysis(error=f"Eroare la detectarea fetei: {e}")
+        return self.analyze_frame(frame)
 
-            if len(face_locations) == 0:
-                return None, "Nicio fata detectata in imagine. Verificati pozitia si iluminarea."
+    def analyze_frame(self, frame: PreprocessedFrame):
+        """Detectare + encoding pe un cadru deja preprocesat."""
+        try:
+            image_array = frame.image
+            scale = frame.detection_scale
 
-            if len(face_locations) > 1:
-                return None, "S-au detectat mai multe fete. Procesul necesita o singura fata."
+            # Import lazy: dlib se încarcă la prima analiză, nu la importul view-urilor
+            import face_recognition
+            
+            # Folosește doar HOG pentru detectare, care este mai rapid
+            face_locations = face_recognition.face_locations(frame.detection_view, model="hog")
 
             # Dacă am redimensionat, ajustăm locațiile fețelor înapoi la dimensiunea originală
             if scale < 1.0:
-                adjusted_locations = []
-                for top, right, bottom, left in face_locations:
-                    adjusted_locations.append(
-                        (int(top / scale), int(right / scale), 
-                         int(bottom / scale), int(left / scale))
-                    )
-                face_encodings = face_recognition.face_encodings(image_array, known_face_locations=adjusted_locations)
-            else:
-                face_encodings = face_recognition.face_encodings(image_array, known_face_locations=face_locations)
+                face_locations = [
+                    (int(top / scale), int(right / scale), int(bottom / scale), int(left / scale))
+                    for top, right, bottom, left in face_locations
+                ]
+            analysis = FaceAnalysis(locations=face_locations)
+
+            if analysis.num_faces == 0:
+                analysis.error = "Nicio fata detectata in imagine. Verificati pozitia si iluminarea."
+                return analysis
+
+            if analysis.num_faces > 1:
+                analysis.error = "S-au detectat mai multe fete. Procesul necesita o singura fata."
+                return analysis
+
+            face_encodings = face_recognition.face_encodings(image_array, known_face_locations=face_locations)
 
             if len(face_encodings) == 0:
-                return None, "Codificarea fetei a esuat"
+                analysis.error = "Codificarea fetei a esuat"
+                return analysis
 
-            return face_encodings[0], None
+            analysis.encoding = face_encodings[0]
+            return analysis
         except Exception as e:
             logger.error(f"Eroare la detectarea/codificarea fetei: {e}")
-            return None, f"Eroare la detectarea fetei: {e}"
+            return FaceAnalysis(error=f"Eroare la detectarea fetei: {e}")
+
+    def detect_and_encode_face(self, image_array):
+        """Detectează și extrage encoding-ul feței."""
+        analysis = self.analyze_face(image_array)
+        return analysis.encoding, analysis.error
 
     def compare_faces(self, id_card_array, live_array):
         """Compara fetele doar daca imaginea live este autentica."""
         try:
+            # Imaginea live este preprocesată o singură dată pentru ambele modele
+            live_frame = frame_preprocessor.prepare(live_array)
+
             # Executăm detectarea spoofing-ului și encoding-ul feței simultan pentru a economisi timp
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                spoofing_future = executor.submit(self.detect_spoofing, live_array)
-                id_card_future = executor.submit(self.detect_and_encode_face, id_card_array)
-                
-                # Așteaptă finalizarea verificării spoofing
-                is_real = spoofing_future.result()
-                if not is_real:
-                    return False, "Frauda detectata: folositi o imagine reala!"
-                
-                # Obține rezultatele encoding-ului feței din ID
-                id_card_encoding, id_card_error = id_card_future.result()
-                if id_card_encoding is None:
-                    return False, id_card_error
-                
-                # Acum face encoding pentru imaginea live
-                live_encoding, live_error = self.detect_and_encode_face(live_array)
-                if live_encoding is None:
-                    return False, live_error
+            spoofing_future = _comparison_executor.submit(self.detect_spoofing_frame, live_frame)
+            id_card_future = _comparison_executor.submit(self.detect_and_encode_face, id_card_array)
+            
+            # Așteaptă finalizarea verificării spoofing
+            is_real = spoofing_future.result()
+            if not is_real:
+                return False, "Frauda detectata: folositi o imagine reala!"
+            
+            # Obține rezultatele encoding-ului feței din ID
+            id_card_encoding, id_card_error = id_card_future.result()
+            if id_card_encoding is None:
+                return False, id_card_error
+            
+            # Acum face encoding pentru imaginea live
+            live_analysis = self.analyze_frame(live_frame)
+            if live_analysis.encoding is None:
+                return False, live_analysis.error
+            live_encoding = live_analysis.encoding
 
             # Compararea fețelor
             face_distance = np.linalg.norm(id_card_encoding - live_encoding)
@@ -150,47 +181,30 @@ class VoteMonitoringService:
     
     def detect_and_encode_face(self, image_array):
         """Wrapper pentru detectarea și encoding-ul feței cu informații suplimentare pentru vot"""
-        try:
-            encoding, error = self.face_service.detect_and_encode_face(image_array)
-            
-            # Pentru votare, returnăm și numărul de fețe detectate
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 480 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                small_image = cv2.resize(image_array, (new_w, new_h))
-            else:
-                small_image = image_array.copy()
-            
-            face_locations = face_recognition.face_locations(small_image, model="hog")
-            num_faces = len(face_locations)
-            
-            if encoding is None:
-                return None, error, num_faces
-            
-            return encoding, None, num_faces
-            
-        except Exception as e:
-            logger.error(f"Eroare la detectarea/codificarea feței în monitorizarea votului: {e}")
-            return None, f"Eroare la detectarea feței: {e}", 0
+        # Numărul de fețe provine din aceeași trecere de detectare ca encoding-ul
+        analysis = self.face_service.analyze_face(image_array)
+        return analysis.encoding, analysis.error, analysis.num_faces
     
     def verify_voter_identity(self, reference_face_encoding, live_image):
         """Verifică dacă utilizatorul curent este cel înregistrat"""
         try:
-            # Convertim imaginea live
+            # Decodăm imaginea live o singură dată, direct în RGB
             if isinstance(live_image, bytes):
-                live_image = Image.open(io.BytesIO(live_image)).convert("RGB")
-                live_array = np.array(live_image)
+                live_array = decode_image(live_image)
             else:
-                live_array = np.array(live_image)
+                live_array = np.asarray(live_image)
+
+            # Aceeași preprocesare alimentează anti-spoofing-ul și detectarea feței
+            live_frame = frame_preprocessor.prepare(live_array)
                 
             # Verifică anti-spoofing
-            is_real = self.detect_spoofing(live_array)
+            is_real = self.face_service.detect_spoofing_frame(live_frame)
             if not is_real:
                 return False, "Fraudă detectată: folosiți o imagine reală!", 0
             
             # Obține encoding pentru imaginea live
-            live_encoding, live_error, num_faces = self.detect_and_encode_face(live_array)
+            analysis = self.face_service.analyze_frame(live_frame)
+            live_encoding, live_error, num_faces = analysis.encoding, analysis.error, analysis.num_faces
             
             if num_faces > 1:
                 return False, f"S-au detectat {num_faces} fețe în cadru", num_faces
@@ -251,7 +265,34 @@ class IDCardService:
             logger.error(f"Eroare la procesarea buletinului: {e}")
             return {}
 
+# Executor reutilizat între cereri pentru paralelizarea din compare_faces
+_comparison_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='face-compare')
+
 # Instanțe globale pentru servicii
 face_recognition_service = FaceRecognitionService()
 vote_monitoring_service = VoteMonitoringService()
-id_card_service = IDCardService()
\ No newline at end of file
+id_card_service = IDCardService()
+
+
+# Task-uri executate în pool-ul de procese biometrice (funcții la nivel de
+# modul, pentru a putea fi serializate către procesele de lucru)
+def compare_faces_task(id_card_array, live_array):
+    return face_recognition_service.compare_faces(id_card_array, live_array)
+
+
+def encode_reference_face_task(image_path):
+    with Image.open(image_path) as id_card_image:
+        id_card_array = np.array(id_card_image.convert("RGB"))
+    return face_recognition_service.detect_and_encode_face(id_card_array)
+
+
+def verify_voter_identity_task(reference_face_encoding, live_image):
+    return vote_monitoring_service.verify_voter_identity(reference_face_encoding, live_image)
+
+
+def run_biometric_task(task, *args):
+    """
+    Rulează un task biometric în pool-ul de procese gestionat de ModelManager.
+    Poate ridica BiometricPoolBusy / BiometricTaskTimeout.
+    """
+    return model_manager.get_worker_pool().run(task, *args)
@@ -0,0 +1,139 @@
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+ENCODING_DTYPE = np.float64
+ENCODING_SIZE = 128
+
+
+class ReferenceEncodingCache:
+    """
+    Cache LRU în proces pentru encoding-urile faciale de referință (din buletin).
+    Fiecare intrare reține și versiunea imaginii din care a fost calculată
+    (vezi reference_source), astfel încât o imagine nouă de buletin
+    invalidează automat intrarea, chiar dacă păstrează același nume.
+    """
+
+    def __init__(self, max_size=2048):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id, source):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != source:
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, source, encoding):
+        with self._lock:
+            self._entries[user_id] = (source, encoding)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def encoding_to_bytes(encoding):
+    """Serializează encoding-ul într-un blob compact de 1024 de octeți"""
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).tobytes()
+
+
+def encoding_from_bytes(data):
+    """Reconstruiește encoding-ul din blob-ul stocat pe utilizator"""
+    encoding = np.frombuffer(bytes(data), dtype=ENCODING_DTYPE)
+    if encoding.shape != (ENCODING_SIZE,):
+        raise ValueError(f"Encoding facial invalid ({encoding.size} valori)")
+    return encoding
+
+
+def reference_source(user):
+    """
+    Identifică versiunea imaginii de buletin după nume și data modificării
+    fișierului. Returnează None dacă utilizatorul nu are imagine sau fișierul lipsește.
+    """
+    name = user.id_card_image.name if user.id_card_image else None
+    if not name:
+        return None
+    try:
+        modified_time = default_storage.get_modified_time(name)
+    except (OSError, NotImplementedError):
+        return None
+    return f"{name}@{modified_time.timestamp():.6f}"
+
+
+def compute_reference_encoding(user, source=None):
+    """
+    Calculează encoding-ul feței din imaginea buletinului și îl salvează
+    pe utilizator. Detecția rulează în pool-ul de procese biometrice, deci
+    poate ridica BiometricPoolBusy / BiometricTaskTimeout. Versiunea imaginii
+    (source) poate fi transmisă dacă a fost deja determinată. Returnează (encoding, eroare).
+    """
+    # Import local: serviciile AI încarcă face_recognition și cv2
+    from .ai_services import encode_reference_face_task, run_biometric_task
+
+    source = source or reference_source(user)
+    if not source:
+        return None, "Nu există imaginea de referință în baza de date."
+
+    encoding, error = run_biometric_task(encode_reference_face_task, user.id_card_image.path)
+    if encoding is None:
+        return None, error
+
+    encoding = np.asarray(encoding, dtype=ENCODING_DTYPE)
+    get_user_model().objects.filter(pk=user.pk).update(
+        id_card_face_encoding=encoding_to_bytes(encoding),
+        id_card_face_encoding_source=source,
+    )
+    user.id_card_face_encoding = encoding_to_bytes(encoding)
+    user.id_card_face_encoding_source = source
+    reference_encoding_cache.put(user.pk, source, encoding)
+
+    logger.info(f"Encoding facial de referință calculat pentru utilizatorul {user.pk}")
+    return encoding, None
+
+
+def get_reference_encoding(user):
+    """
+    Returnează encoding-ul de referință al utilizatorului: din cache-ul LRU,
+    apoi din blob-ul stocat, iar doar la nevoie îl recalculează din imagine.
+    Returnează (encoding, eroare).
+    """
+    if not user.id_card_image:
+        return None, "Nu există imagine de referință pentru acest utilizator"
+
+    source = reference_source(user)
+    if not source:
+        return None, "Nu există imaginea de referință în baza de date."
+
+    encoding = reference_encoding_cache.get(user.pk, source)
+    if encoding is not None:
+        return encoding, None
+
+    if user.id_card_face_encoding and user.id_card_face_encoding_source == source:
+        try:
+            encoding = encoding_from_bytes(user.id_card_face_encoding)
+            reference_encoding_cache.put(user.pk, source, encoding)
+            return encoding, None
+        except ValueError as e:
+            logger.warning(f"Encoding stocat invalid pentru utilizatorul {user.pk}: {e}")
+
+    return compute_reference_encoding(user, source)
+
+
+# Instanță globală, partajată de toate request-urile din proces
+reference_encoding_cache = ReferenceEncodingCache()
@@ -0,0 +1,116 @@
+import io
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SPOOFING_MAX_SIZE = 640
+DETECTION_MAX_SIZE = 480
+
+
+@dataclass
+class PreprocessedFrame:
+    """
+    Imaginea la rezoluție completă împreună cu vederile derivate din ea:
+    tensorul egalizat pentru anti-spoofing și imaginea mică pentru detectare.
+    Vederile derivate pot fi buffere reutilizate ale firului curent și sunt
+    valide doar până la următorul apel prepare() din același fir.
+    """
+    image: np.ndarray
+    detection_view: np.ndarray
+    detection_scale: float
+    spoof_input: Optional[np.ndarray] = None
+
+
+def _fit_size(h, w, max_size):
+    """Returnează (scale, (new_w, new_h)) pentru încadrarea în max_size"""
+    scale = min(1.0, max_size / max(h, w))
+    return scale, (int(w * scale), int(h * scale))
+
+
+def decode_image(data):
+    """
+    Decodează o singură dată imaginea încărcată direct în RGB.
+    Folosește PIL doar pentru formatele pe care OpenCV nu le poate citi.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        with Image.open(io.BytesIO(data)) as pil_image:
+            return np.array(pil_image.convert("RGB"))
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+
+class FramePreprocessor:
+    """
+    Etapă comună de preprocesare pentru anti-spoofing și detectarea fețelor.
+
+    Redimensionarea la 640px se face o singură dată; imaginea de detectare
+    (480px) este derivată din ea, nu din originalul la rezoluție completă.
+    Rezultatele intermediare sunt scrise în buffere per fir de execuție,
+    refolosite cât timp dimensiunea cadrelor nu se schimbă (camera web
+    trimite mereu aceeași rezoluție).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _buffer(self, name, shape):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def prepare(self, image_array, for_spoofing=True):
+        """Produce vederile necesare modelelor dintr-o singură imagine RGB"""
+        h, w = image_array.shape[:2]
+
+        spoof_scale, spoof_size = _fit_size(h, w, SPOOFING_MAX_SIZE)
+        if spoof_scale < 1.0:
+            resized = cv2.resize(
+                image_array, spoof_size,
+                dst=self._buffer('resized', (spoof_size[1], spoof_size[0], 3))
+            )
+        else:
+            resized = image_array
+
+        detection_scale, detection_size = _fit_size(h, w, DETECTION_MAX_SIZE)
+        if detection_scale < 1.0:
+            detection_view = cv2.resize(
+                resized, detection_size,
+                dst=self._buffer('detection', (detection_size[1], detection_size[0], 3))
+            )
+        else:
+            detection_view = image_array
+
+        spoof_input = None
+        if for_spoofing:
+            # Normalizare pentru YOLO: gri -> egalizare histogramă -> RGB
+            gray = cv2.cvtColor(
+                resized, cv2.COLOR_RGB2GRAY,
+                dst=self._buffer('gray', resized.shape[:2])
+            )
+            cv2.equalizeHist(gray, dst=gray)
+            spoof_input = cv2.cvtColor(
+                gray, cv2.COLOR_GRAY2RGB,
+                dst=self._buffer('spoof', resized.shape)
+            )
+
+        return PreprocessedFrame(
+            image=image_array,
+            detection_view=detection_view,
+            detection_scale=detection_scale,
+            spoof_input=spoof_input,
+        )
+
+
+# Instanță globală; bufferele sunt separate pe fiecare fir de execuție
+frame_preprocessor = FramePreprocessor()
@@ -0,0 +1,135 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Grupează cererile de inferență concurente într-un singur apel batch.
+
+    Fiecare cerere trimite un rând sparse (1 x n_features). Un fir de lucru
+    colectează cererile timp de câteva milisecunde (sau până la max_batch_size),
+    le concatenează într-o matrice sparse și apelează o singură dată
+    `predict_batch`, apoi returnează fiecărei cereri rezultatul ei.
+
+    Pentru alte tipuri de intrări (ex. texte), `combine` primește lista
+    cererilor și construiește intrarea batch.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=5, timeout=10,
+                 combine=None, name='section-inference-batcher'):
+        self.predict_batch = predict_batch
+        self.combine = combine or (lambda rows: sp.vstack(rows, format='csr'))
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'batches': 0,
+            'requests': 0,
+            'max_batch_size': 0,
+            'total_wait_ms': 0.0,
+            'total_predict_ms': 0.0,
+            'max_predict_ms': 0.0,
+            'errors': 0,
+        }
+
+    def _ensure_worker(self):
+        """Pornește firul de lucru la prima cerere"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, row):
+        """Adaugă un rând în coadă și returnează un Future cu predicția"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, row):
+        """Variantă blocantă a submit(), folosită din view-uri"""
+        return self.submit(row).result(timeout=self.timeout)
+
+    def _collect_batch(self):
+        """Așteaptă prima cerere, apoi adună altele până la expirarea ferestrei"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            rows = [row for row, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+            started = time.perf_counter()
+
+            try:
+                predictions = list(self.predict_batch(self.combine(rows)))
+                # Un rezultat lipsă ar lăsa o cerere fără răspuns până la timeout,
+                # iar unul în plus ar atribui predicțiile altor cereri
+                if len(predictions) != len(batch):
+                    raise ValueError(f"Modelul a returnat {len(predictions)} predicții pentru {len(batch)} cereri")
+            except Exception as e:
+                logger.error(f"Eroare la inferența batch ({len(batch)} cereri): {e}")
+                for future in futures:
+                    future.set_exception(e)
+                with self._metrics_lock:
+                    self._metrics['errors'] += 1
+                continue
+
+            predict_ms = (time.perf_counter() - started) * 1000
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+
+            with self._metrics_lock:
+                self._metrics['batches'] += 1
+                self._metrics['requests'] += len(batch)
+                self._metrics['max_batch_size'] = max(self._metrics['max_batch_size'], len(batch))
+                self._metrics['total_wait_ms'] += sum((started - queued) * 1000 for _, _, queued in batch)
+                self._metrics['total_predict_ms'] += predict_ms
+                self._metrics['max_predict_ms'] = max(self._metrics['max_predict_ms'], predict_ms)
+
+    def get_metrics(self):
+        """Returnează statisticile de batch și latență acumulate"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        batches = metrics['batches'] or 1
+        requests = metrics['requests'] or 1
+        return {
+            'batches': metrics['batches'],
+            'requests': metrics['requests'],
+            'errors': metrics['errors'],
+            'avg_batch_size': round(metrics['requests'] / batches, 2),
+            'max_batch_size': metrics['max_batch_size'],
+            'avg_queue_wait_ms': round(metrics['total_wait_ms'] / requests, 3),
+            'avg_predict_ms': round(metrics['total_predict_ms'] / batches, 3),
+            'max_predict_ms': round(metrics['max_predict_ms'], 3),
+            'queue_size': self._queue.qsize(),
+        }
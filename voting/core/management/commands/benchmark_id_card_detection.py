@@ -0,0 +1,69 @@
+import statistics
+import time
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.model_manager import model_manager
+
+
+class Command(BaseCommand):
+    help = 'Compară latența per scanare a detectorului de buletine: sesiune nouă per cerere vs sesiune partajată'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--image', help='Imaginea de test (implicit: imagine sintetică)')
+        parser.add_argument('--runs', type=int, default=10, help='Numărul de scanări măsurate pentru fiecare variantă')
+        parser.add_argument('--width', type=int, default=1280, help='Lățimea imaginii sintetice')
+        parser.add_argument('--height', type=int, default=720, help='Înălțimea imaginii sintetice')
+
+    def load_image(self, options):
+        if options['image']:
+            image = cv2.imread(options['image'])
+            if image is None:
+                raise CommandError(f"Imaginea nu poate fi citită: {options['image']}")
+            return image
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 256, (options['height'], options['width'], 3), dtype=np.uint8)
+
+    def report(self, name, timings):
+        ms = [t * 1000 for t in timings]
+        self.stdout.write(
+            f"  {name:<22} median {statistics.median(ms):9.1f} ms  "
+            f"min {min(ms):9.1f} ms  max {max(ms):9.1f} ms"
+        )
+        return statistics.median(ms)
+
+    def handle(self, *args, **options):
+        from users.utils import IDCardDetector
+
+        image = self.load_image(options)
+        runs = max(options['runs'], 1)
+
+        # Comportamentul anterior: graful este citit și o sesiune nouă deschisă la fiecare cerere
+        cold = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            detector = IDCardDetector()
+            detector.detect_id_card(image)
+            cold.append(time.perf_counter() - started)
+            detector.close()
+
+        # Sesiunea partajată din model_manager; prima scanare include încărcarea
+        model_manager.unload_model('id_card_detector')
+        started = time.perf_counter()
+        model_manager.get_model('id_card_detector').detect_id_card(image)
+        first = time.perf_counter() - started
+
+        warm = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            model_manager.get_model('id_card_detector').detect_id_card(image)
+            warm.append(time.perf_counter() - started)
+
+        self.stdout.write(f"Imagine {image.shape[1]}x{image.shape[0]}, {runs} scanări per variantă")
+        cold_ms = self.report('sesiune per cerere', cold)
+        self.stdout.write(f"  {'prima scanare partajată':<22} {first * 1000:16.1f} ms")
+        warm_ms = self.report('sesiune partajată', warm)
+        if warm_ms:
+            self.stdout.write(self.style.SUCCESS(f"Accelerare per scanare: {cold_ms / warm_ms:.1f}x"))
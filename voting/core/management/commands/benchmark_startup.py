@@ -0,0 +1,95 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Stivele grele care nu trebuie importate la pornire
+HEAVY_MODULES = [
+    'tensorflow', 'torch', 'transformers', 'ultralytics', 'face_recognition', 'dlib', 'pandas', 'sklearn',
+]
+
+DEFAULT_IMPORTS = ['voting.urls', 'users.views', 'vote.views']
+
+# Rulat într-un proces nou, ca fiecare măsurătoare să pornească de la zero
+PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+for module in sys.argv[1].split(','):
+    importlib.import_module(module)
+imported = time.perf_counter() - started
+warm_up = {}
+if sys.argv[2]:
+    from core.model_manager import model_manager
+    warm_up = model_manager.warm_up(sys.argv[2].split(','))
+try:
+    import resource
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+except ImportError:  # Windows
+    max_rss_mb = None
+print(json.dumps({
+    'import_seconds': imported,
+    'max_rss_mb': max_rss_mb,
+    'heavy_modules': [name for name in sys.argv[3].split(',') if name in sys.modules],
+    'warm_up': warm_up,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Măsoară timpul și memoria la pornire (django.setup + importul view-urilor), opțional cu pre-încărcarea modelelor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Numărul de procese pornite')
+        parser.add_argument(
+            '--imports', default=','.join(DEFAULT_IMPORTS),
+            help='Modulele importate după django.setup(), separate prin virgulă'
+        )
+        parser.add_argument(
+            '--warm-up', nargs='*', metavar='MODEL',
+            help='Pre-încarcă modelele date (fără nume: settings.MODEL_WARMUP) după import'
+        )
+
+    def probe(self, imports, warm_up):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, imports, ','.join(warm_up), ','.join(HEAVY_MODULES)],
+            cwd=getattr(settings, 'BASE_DIR', None), env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"Procesul de măsurare a eșuat:\n{completed.stderr.strip()}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        warm_up = options['warm_up']
+        if warm_up is not None and not warm_up:
+            warm_up = list(getattr(settings, 'MODEL_WARMUP', ()))
+        warm_up = warm_up or []
+
+        results = [self.probe(options['imports'], warm_up) for _ in range(max(options['runs'], 1))]
+
+        import_times = [result['import_seconds'] for result in results]
+        memory = [result['max_rss_mb'] for result in results if result['max_rss_mb'] is not None]
+        self.stdout.write(f"Importuri: {options['imports']} ({len(results)} procese)")
+        self.stdout.write(
+            f"  pornire: median {statistics.median(import_times):.3f}s, "
+            f"min {min(import_times):.3f}s, max {max(import_times):.3f}s"
+        )
+        if memory:
+            self.stdout.write(f"  memorie (RSS maxim): median {statistics.median(memory):.1f} MB")
+
+        heavy = results[-1]['heavy_modules']
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"  stive grele importate: {', '.join(heavy)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("  nicio stivă ML grea importată la pornire"))
+
+        for model_name, seconds in results[-1]['warm_up'].items():
+            if seconds is None:
+                self.stdout.write(self.style.ERROR(f"  pre-încărcare {model_name}: eșuată"))
+            else:
+                self.stdout.write(f"  pre-încărcare {model_name}: {seconds:.2f}s")
@@ -58,12 +58,25 @@ class Command(BaseCommand):
             )
             for model in memory_info['loaded_models']:
                 status = "✓ Încărcat" if model_manager.is_model_loaded(model) else "✗ Eroare"
+                load_time = memory_info['load_times'].get(model)
+                if load_time is not None:
+                    status += f" în {load_time:.2f}s"
                 self.stdout.write(f"  - {model}: {status}")
         else:
             self.stdout.write(
                 self.style.WARNING("Niciun model încărcat în memorie")
             )
 
+        pool_stats = model_manager.get_worker_pool().get_stats()
+        self.stdout.write(
+            f"Pool biometric: {pool_stats['max_workers']} procese, coadă {pool_stats['max_queue']}, "
+            f"{'pornit' if pool_stats['started'] else 'oprit'}"
+        )
+        self.stdout.write(
+            f"  În lucru: {pool_stats['in_flight']}, finalizate: {pool_stats['completed']}, "
+            f"respinse: {pool_stats['rejected']}, expirate: {pool_stats['timeouts']}, erori: {pool_stats['failed']}"
+        )
+
     def load_model(self, model_name):
         """Încarcă un model specific"""
         self.stdout.write(f"Încărcare model: {model_name}...")
@@ -124,7 +137,7 @@ class Command(BaseCommand):
         """Pre-încarcă toate modelele disponibile"""
         self.stdout.write("Pre-încărcare toate modelele disponibile...")
         
-        available_models = ['yolo_antispoofing', 'yolo_id_card']
+        available_models = model_manager.available_models()
         
         for model_name in available_models:
             try:
@@ -1,14 +1,195 @@
 import os
+import time
 import logging
-from threading import Lock
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock, RLock, BoundedSemaphore
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+
+class BiometricPoolBusy(Exception):
+    """Coada de verificări biometrice este plină; clientul trebuie să reîncerce"""
+    def __init__(self, retry_after):
+        super().__init__(f"Prea multe verificări biometrice în curs, reîncercați în {retry_after} secunde")
+        self.retry_after = retry_after
+
+
+class BiometricTaskTimeout(Exception):
+    """Verificarea biometrică a depășit timpul maxim permis"""
+    def __init__(self, timeout, retry_after):
+        super().__init__(f"Verificarea biometrică a depășit {timeout} secunde")
+        self.retry_after = retry_after
+
+
+def _init_biometric_worker(model_names):
+    """
+    Inițializează un proces de lucru: configurează Django și pre-încarcă
+    modelele, astfel încât primul task să nu plătească costul încărcării
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    import face_recognition  # noqa: F401 - încarcă modelele dlib în proces
+
+    manager = ModelManager()
+    for model_name in model_names:
+        try:
+            manager.get_model(model_name)
+        except Exception as e:
+            logger.error(f"Procesul {os.getpid()} nu a putut pre-încărca {model_name}: {e}")
+
+    logger.info(f"Proces biometric {os.getpid()} pregătit")
+
+
+def _load_toxic_classifier():
+    # Import lazy: transformers + torch adaugă câteva secunde și sute de MB la pornire
+    from transformers import pipeline
+    return pipeline(
+        "text-classification",
+        model=getattr(settings, 'TOXIC_CLASSIFIER_MODEL', 'unitary/toxic-bert'),
+    )
+
+
+def _load_id_card_detector():
+    # Import lazy: graful TensorFlow este citit și importat o singură dată per proces
+    from users.utils import IDCardDetector
+    return IDCardDetector()
+
+
+def _load_voting_section_ai():
+    # Import lazy: serviciul încarcă TensorFlow și dicționarele pickle ale secțiilor
+    from vote.services_old import VotingSectionAIService
+    return VotingSectionAIService()
+
+
+class BiometricWorkerPool:
+    """
+    Pool de procese de lungă durată pentru verificările biometrice
+    (detectare față, encoding, anti-spoofing), care sunt CPU-bound.
+
+    Numărul de task-uri acceptate simultan este limitat (workeri + coadă);
+    când limita este atinsă cererea este respinsă imediat cu BiometricPoolBusy,
+    iar fiecare task are un timp maxim de așteptare.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8, task_timeout=20, retry_after=2,
+                 preload_models=('yolo_antispoofing',)):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self.retry_after = retry_after
+        self.preload_models = tuple(preload_models)
+
+        self._slots = BoundedSemaphore(max_workers + max_queue)
+        self._executor = None
+        self._executor_lock = Lock()
+        self._stats_lock = Lock()
+        self._stats = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'failed': 0, 'in_flight': 0}
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: procesele nu moștenesc starea torch/dlib a procesului web
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_biometric_worker,
+                    initargs=(self.preload_models,),
+                )
+                logger.info(f"Pool biometric pornit cu {self.max_workers} procese")
+            return self._executor
+
+    def _reset_executor(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _update_stats(self, key, in_flight_delta=0):
+        with self._stats_lock:
+            if key:
+                self._stats[key] += 1
+            self._stats['in_flight'] += in_flight_delta
+
+    def _release_slot(self, _future=None):
+        self._update_stats(None, in_flight_delta=-1)
+        self._slots.release()
+
+    def run(self, func, *args):
+        """
+        Execută func(*args) într-un proces de lucru și returnează rezultatul.
+        Ridică BiometricPoolBusy dacă pool-ul este saturat și
+        BiometricTaskTimeout dacă task-ul nu se termină la timp.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._update_stats('rejected')
+            raise BiometricPoolBusy(self.retry_after)
+        self._update_stats(None, in_flight_delta=1)
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            # Un proces a murit (ex. lipsă memorie); recreăm pool-ul
+            logger.error("Pool-ul biometric a fost compromis, îl repornim")
+            self._reset_executor()
+            try:
+                future = self._get_executor().submit(func, *args)
+            except Exception:
+                self._release_slot()
+                raise
+        except Exception:
+            self._release_slot()
+            raise
+
+        future.add_done_callback(self._release_slot)
+
+        started = time.perf_counter()
+        try:
+            result = future.result(timeout=self.task_timeout)
+        except FutureTimeoutError:
+            # Task-ul în așteptare este anulat; cel deja pornit își eliberează slotul la final
+            future.cancel()
+            self._update_stats('timeouts')
+            logger.warning(f"Task biometric {func.__name__} a depășit {self.task_timeout}s")
+            raise BiometricTaskTimeout(self.task_timeout, self.retry_after)
+        except BrokenProcessPool:
+            self._update_stats('failed')
+            self._reset_executor()
+            raise
+        except Exception:
+            self._update_stats('failed')
+            raise
+
+        self._update_stats('completed')
+        logger.debug(f"Task biometric {func.__name__} executat în {time.perf_counter() - started:.3f}s")
+        return result
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'started': self._executor is not None,
+        })
+        return stats
+
+    def shutdown(self):
+        self._reset_executor()
+
 class ModelManager:
     """
     Singleton pentru managementul modelelor AI
     Încarcă modelele o singură dată și le reutilizează
+
+    Modelele YOLO sunt descrise prin cale (_model_paths), celelalte stive
+    (transformers, TensorFlow) prin funcții de încărcare (_loaders); nimic nu
+    este importat sau încărcat până la primul get_model() sau warm_up().
     """
     _instance = None
     _lock = Lock()
@@ -27,10 +208,19 @@ class ModelManager:
             
         self._initialized = True
         self._models = {}
+        self._load_times = {}
+        self._load_lock = RLock()  # un loader poate cere la rândul lui alt model
+        self._worker_pool = None
+        self._worker_pool_lock = Lock()
         self._model_paths = {
             'yolo_antispoofing': os.path.join(settings.MEDIA_ROOT, 'models', 'l_version_1_300.pt'),
             'yolo_id_card': os.path.join(settings.MEDIA_ROOT, 'models', 'best.pt'),
         }
+        self._loaders = {
+            'toxic_classifier': _load_toxic_classifier,
+            'id_card_detector': _load_id_card_detector,
+            'voting_section_ai': _load_voting_section_ai,
+        }
         
         logger.info("ModelManager initialized")
     
@@ -39,35 +229,59 @@ class ModelManager:
         Returnează modelul cerut, încărcându-l dacă este necesar
         """
         if model_name not in self._models:
-            self._load_model(model_name)
-        return self._models.get(model_name)
+            # Un singur fir încarcă modelul; celelalte așteaptă și îl reutilizează
+            with self._load_lock:
+                if model_name not in self._models:
+                    self._load_model(model_name)
+        return self._models[model_name]
+    
+    def register_loader(self, model_name, loader):
+        """
+        Înregistrează o funcție fără argumente care construiește modelul;
+        este apelată o singură dată, la prima cerere a modelului
+        """
+        self._loaders[model_name] = loader
+    
+    def available_models(self):
+        """
+        Numele tuturor modelelor cunoscute (încărcate sau nu)
+        """
+        return list(self._model_paths) + list(self._loaders)
     
     def _load_model(self, model_name):
         """
         Încarcă un model specific
         """
+        started = time.perf_counter()
         try:
-            if model_name not in self._model_paths:
+            if model_name in self._loaders:
+                logger.info(f"Încărcare model {model_name}")
+                model = self._loaders[model_name]()
+            elif model_name in self._model_paths:
+                model_path = self._model_paths[model_name]
+                
+                if not os.path.exists(model_path):
+                    raise FileNotFoundError(f"Modelul nu există la calea: {model_path}")
+                
+                logger.info(f"Încărcare model {model_name} de la {model_path}")
+                
+                # Import lazy pentru a evita import-urile la nivel de modul
+                from ultralytics import YOLO
+                
+                model = YOLO(model_path)
+            else:
                 raise ValueError(f"Model necunoscut: {model_name}")
             
-            model_path = self._model_paths[model_name]
-            
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"Modelul nu există la calea: {model_path}")
-            
-            logger.info(f"Încărcare model {model_name} de la {model_path}")
-            
-            # Import lazy pentru a evita import-urile la nivel de modul
-            from ultralytics import YOLO
-            
-            model = YOLO(model_path)
             self._models[model_name] = model
+            self._load_times[model_name] = time.perf_counter() - started
             
-            logger.info(f"Modelul {model_name} a fost încărcat cu succes!")
+            logger.info(f"Modelul {model_name} a fost încărcat cu succes în {self._load_times[model_name]:.2f}s!")
             
         except Exception as e:
             logger.error(f"Eroare la încărcarea modelului {model_name}: {e}")
-            self._models[model_name] = None
+            # Eșecul nu este memorat: următoarea cerere reîncearcă încărcarea
+            self._models.pop(model_name, None)
+            self._load_times.pop(model_name, None)
             raise
     
     def is_model_loaded(self, model_name):
@@ -76,28 +290,76 @@ class ModelManager:
         """
         return model_name in self._models and self._models[model_name] is not None
     
+    def _close(self, model):
+        """Eliberează resursele modelelor care le dețin (ex. sesiuni TensorFlow)"""
+        close = getattr(model, 'close', None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logger.warning(f"Eroare la închiderea modelului: {e}")
+    
     def unload_model(self, model_name):
         """
         Descarcă un model din memorie
         """
         if model_name in self._models:
-            del self._models[model_name]
+            self._close(self._models.pop(model_name))
+            self._load_times.pop(model_name, None)
             logger.info(f"Modelul {model_name} a fost descărcat din memorie")
     
     def unload_all_models(self):
         """
         Descarcă toate modelele din memorie
         """
+        for model in self._models.values():
+            self._close(model)
         self._models.clear()
+        self._load_times.clear()
         logger.info("Toate modelele au fost descărcate din memorie")
     
+    def warm_up(self, model_names=None):
+        """
+        Pre-încarcă modelele (implicit cele din settings.MODEL_WARMUP), ca prima
+        cerere a unui worker de producție să nu plătească încărcarea.
+        Returnează {model: secunde de încărcare sau None dacă a eșuat}.
+        """
+        if model_names is None:
+            model_names = getattr(settings, 'MODEL_WARMUP', ())
+        
+        results = {}
+        for model_name in model_names:
+            try:
+                self.get_model(model_name)
+            except Exception as e:
+                logger.error(f"Pre-încărcarea modelului {model_name} a eșuat: {e}")
+            results[model_name] = self._load_times.get(model_name)
+        return results
+    
+    def get_worker_pool(self):
+        """
+        Returnează pool-ul de procese pentru verificările biometrice,
+        creându-l la prima utilizare (configurabil din settings)
+        """
+        if self._worker_pool is None:
+            with self._worker_pool_lock:
+                if self._worker_pool is None:
+                    self._worker_pool = BiometricWorkerPool(
+                        max_workers=getattr(settings, 'BIOMETRIC_WORKERS', 2),
+                        max_queue=getattr(settings, 'BIOMETRIC_QUEUE_DEPTH', 8),
+                        task_timeout=getattr(settings, 'BIOMETRIC_TASK_TIMEOUT', 20),
+                        retry_after=getattr(settings, 'BIOMETRIC_RETRY_AFTER', 2),
+                    )
+        return self._worker_pool
+    
     def get_memory_usage(self):
         """
         Returnează informații despre modelele încărcate
         """
         return {
             'loaded_models': list(self._models.keys()),
-            'model_count': len(self._models)
+            'model_count': len(self._models),
+            'load_times': dict(self._load_times)
         }
 
 # Instanță globală
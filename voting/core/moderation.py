@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from threading import Lock
+
+from django.conf import settings
+
+from .inference_batcher import MicroBatcher
+from .model_manager import model_manager
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_SEPARATORS = re.compile(r'[.!?]')
+
+# Eticheta pozitivă (limbaj nepotrivit) returnată de clasificator
+TOXIC_LABEL = 'LABEL_1'
+
+
+def normalize_text(text):
+    """Forma canonică a unei propoziții: litere mici, spații comprimate"""
+    return ' '.join(text.lower().split())
+
+
+def text_key(text):
+    """Cheia de cache a unei propoziții (hash pe textul normalizat)"""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def split_sentences(message):
+    """Propozițiile distincte (după forma normalizată) ale mesajului: {cheie: propoziție}"""
+    sentences = {}
+    for sentence in SENTENCE_SEPARATORS.split(message or ''):
+        if sentence.strip():
+            sentences.setdefault(text_key(sentence), sentence.strip())
+    return sentences
+
+
+class VerdictCache:
+    """Cache LRU în proces pentru verdictele per propoziție"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+            return verdict
+
+    def put(self, key, verdict):
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ModerationUnavailable(Exception):
+    """Clasificatorul nu a putut fi încărcat sau nu a răspuns în timpul permis"""
+
+
+@dataclass
+class ModerationResult:
+    flagged: bool
+    sentences: int
+    cache_hits: int
+    classified: int
+    latency_ms: float
+
+
+class ModerationService:
+    """
+    Detectarea limbajului nepotrivit cu toxic-bert, în loturi.
+
+    - verdictele sunt păstrate per propoziție (hash pe textul normalizat),
+      astfel încât textele repetate nu mai ajung la model
+    - propozițiile necunoscute ale mesajului, împreună cu cele ale cererilor
+      concurente, sunt clasificate într-un singur batch (padding comun)
+    - verificarea se oprește la primul verdict pozitiv, din cache sau din model
+    """
+
+    def __init__(self, model_name='toxic_classifier', threshold=0.5, cache_size=10000,
+                 max_batch_size=32, max_wait_ms=10, timeout=10):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.timeout = timeout
+        self.cache = VerdictCache(cache_size)
+        self.batcher = MicroBatcher(
+            self.classify_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+            timeout=timeout, combine=list, name='moderation-batcher',
+        )
+
+        self._metrics_lock = Lock()
+        self._metrics = {
+            'calls': 0,
+            'flagged': 0,
+            'short_circuits': 0,
+            'sentences': 0,
+            'cache_hits': 0,
+            'classified': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0,
+        }
+
+    def is_toxic(self, prediction):
+        labels = prediction if isinstance(prediction, list) else [prediction]
+        return any(label['label'] == TOXIC_LABEL and label['score'] > self.threshold for label in labels)
+
+    def classify_batch(self, sentences):
+        """Un singur forward pass pentru toate propozițiile; returnează verdictul fiecăreia"""
+        classifier = model_manager.get_model(self.model_name)
+        predictions = classifier(sentences, batch_size=len(sentences), truncation=True)
+        return [self.is_toxic(prediction) for prediction in predictions]
+
+    def _submit(self, key, sentence):
+        future = self.batcher.submit(sentence)
+        # Verdictul intră în cache și dacă apelantul s-a oprit deja la un alt pozitiv
+        # (callback-ul rulează după deblocarea apelantului, de aceea check() îl scrie și direct)
+        future.add_done_callback(
+            lambda done: done.exception() is None and self.cache.put(key, done.result())
+        )
+        return future
+
+    def check(self, message):
+        """
+        Verifică mesajul și returnează un ModerationResult (verdict + latență).
+        Ridică ModerationUnavailable dacă modelul nu se încarcă sau nu răspunde la timp.
+        """
+        started = time.perf_counter()
+        sentences = split_sentences(message)
+
+        flagged = False
+        cache_hits = 0
+        pending = {}
+        for key, sentence in sentences.items():
+            verdict = self.cache.get(key)
+            if verdict is None:
+                pending[key] = sentence
+                continue
+            cache_hits += 1
+            if verdict:
+                flagged = True
+                break
+
+        classified = 0
+        if not flagged and pending:
+            # Modelul este încărcat înainte de a porni termenul: într-un proces rece
+            # încărcarea toxic-bert nu consumă timpul alocat clasificării
+            try:
+                model_manager.get_model(self.model_name)
+            except Exception as e:
+                raise ModerationUnavailable(f"Clasificatorul {self.model_name} nu a putut fi încărcat: {e}") from e
+
+            keys = {self._submit(key, sentence): key for key, sentence in pending.items()}
+            remaining = set(keys)
+            deadline = time.perf_counter() + self.timeout
+            while remaining and not flagged:
+                done, remaining = wait(
+                    remaining, timeout=max(deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    raise ModerationUnavailable(f"Moderarea a depășit {self.timeout} secunde")
+                for future in done:
+                    try:
+                        verdict = future.result()
+                    except Exception as e:
+                        raise ModerationUnavailable(f"Clasificarea a eșuat: {e}") from e
+                    self.cache.put(keys[future], verdict)
+                    classified += 1
+                    flagged = flagged or verdict
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        short_circuit = flagged and classified + cache_hits < len(sentences)
+        with self._metrics_lock:
+            self._metrics['calls'] += 1
+            self._metrics['flagged'] += flagged
+            self._metrics['short_circuits'] += short_circuit
+            self._metrics['sentences'] += len(sentences)
+            self._metrics['cache_hits'] += cache_hits
+            self._metrics['classified'] += classified
+            self._metrics['total_latency_ms'] += latency_ms
+            self._metrics['max_latency_ms'] = max(self._metrics['max_latency_ms'], latency_ms)
+
+        logger.debug(
+            f"Moderare: {len(sentences)} propoziții, {cache_hits} din cache, "
+            f"{classified} clasificate, {latency_ms:.1f} ms"
+        )
+        return ModerationResult(flagged, len(sentences), cache_hits, classified, latency_ms)
+
+    def get_metrics(self):
+        """Statisticile de cache și latență, plus cele ale batch-urilor de inferență"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        calls = metrics['calls'] or 1
+        return {
+            'calls': metrics['calls'],
+            'flagged': metrics['flagged'],
+            'short_circuits': metrics['short_circuits'],
+            'sentences': metrics['sentences'],
+            'cache_hits': metrics['cache_hits'],
+            'classified': metrics['classified'],
+            'cache_size': len(self.cache),
+            'avg_latency_ms': round(metrics['total_latency_ms'] / calls, 3),
+            'max_latency_ms': round(metrics['max_latency_ms'], 3),
+            'inference': self.batcher.get_metrics(),
+        }
+
+
+moderation_service = ModerationService(
+    threshold=getattr(settings, 'MODERATION_THRESHOLD', 0.5),
+    cache_size=getattr(settings, 'MODERATION_CACHE_SIZE', 10000),
+    max_batch_size=getattr(settings, 'MODERATION_BATCH_SIZE', 32),
+    max_wait_ms=getattr(settings, 'MODERATION_BATCH_WAIT_MS', 10),
+)
@@ -1,3 +1,396 @@
-from django.test import TestCase
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import scipy.sparse as sp
+from django.test import SimpleTestCase
+
+from .ai_services import FaceRecognitionService, VoteMonitoringService
+from .face_encodings import (
+    ReferenceEncodingCache, encoding_from_bytes, encoding_to_bytes, get_reference_encoding, reference_encoding_cache,
+)
+from .inference_batcher import MicroBatcher
+from .frame_preprocessing import FramePreprocessor, decode_image
+from .model_manager import BiometricPoolBusy, BiometricTaskTimeout, BiometricWorkerPool, model_manager
+from .moderation import ModerationService, ModerationUnavailable, split_sentences
+
+
+class ReferenceEncodingCacheTestCase(SimpleTestCase):
+    """Teste pentru cache-ul encoding-urilor faciale de referință"""
+
+    def test_encoding_round_trip(self):
+        encoding = np.random.rand(128)
+        data = encoding_to_bytes(encoding)
+
+        self.assertEqual(len(data), 128 * 8)
+        np.testing.assert_array_equal(encoding_from_bytes(data), encoding)
+        with self.assertRaises(ValueError):
+            encoding_from_bytes(data[:64])
+
+    def test_lru_eviction_and_source_invalidation(self):
+        cache = ReferenceEncodingCache(max_size=2)
+        cache.put(1, 'id_cards/1.jpg', 'enc1')
+        cache.put(2, 'id_cards/2.jpg', 'enc2')
+        self.assertEqual(cache.get(1, 'id_cards/1.jpg'), 'enc1')
+
+        cache.put(3, 'id_cards/3.jpg', 'enc3')  # utilizatorul 2 este cel mai vechi
+
+        self.assertIsNone(cache.get(2, 'id_cards/2.jpg'))
+        self.assertIsNone(cache.get(1, 'id_cards/1_nou.jpg'))
+        cache.invalidate(3)
+        self.assertIsNone(cache.get(3, 'id_cards/3.jpg'))
+        self.assertEqual(len(cache), 1)
+
+    def test_rewritten_id_card_is_encoded_again_in_the_biometric_pool(self):
+        user = mock.Mock(pk=42, id_card_face_encoding=None, id_card_face_encoding_source=None)
+        user.id_card_image.name = 'id_cards/42_buletin.jpg'
+        user.id_card_image.path = '/media/id_cards/42_buletin.jpg'
+        first, second = np.zeros(128), np.ones(128)
+        modified_times = [mock.Mock(timestamp=mock.Mock(return_value=stamp)) for stamp in (100.0, 100.0, 200.0)]
+
+        with mock.patch('core.face_encodings.default_storage') as storage, \
+                mock.patch('core.face_encodings.get_user_model'), \
+                mock.patch('core.ai_services.run_biometric_task', side_effect=[(first, None), (second, None)]) as run:
+            storage.get_modified_time.side_effect = modified_times
+            self.addCleanup(reference_encoding_cache.invalidate, user.pk)
+
+            np.testing.assert_array_equal(get_reference_encoding(user)[0], first)
+            np.testing.assert_array_equal(get_reference_encoding(user)[0], first)  # din cache
+            # aceeași denumire, fișier rescris: encoding-ul este recalculat
+            np.testing.assert_array_equal(get_reference_encoding(user)[0], second)
+
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(run.call_args.args[1], '/media/id_cards/42_buletin.jpg')
+
+
+
+class BiometricWorkerPoolTestCase(SimpleTestCase):
+    """Teste pentru limitarea cererilor în pool-ul biometric"""
+
+    def make_pool(self, **kwargs):
+        pool = BiometricWorkerPool(**kwargs)
+        # În teste folosim fire de execuție în locul proceselor
+        executor = ThreadPoolExecutor(max_workers=pool.max_workers)
+        pool._get_executor = lambda: executor
+        self.addCleanup(executor.shutdown, wait=True)
+        return pool
+
+    def test_saturated_pool_rejects_with_retry_after(self):
+        pool = self.make_pool(max_workers=1, max_queue=0, retry_after=3)
+        release = threading.Event()
+        worker = threading.Thread(target=pool.run, args=(release.wait,))
+        worker.start()
+        while pool.get_stats()['in_flight'] == 0:
+            time.sleep(0.001)
+
+        with self.assertRaises(BiometricPoolBusy) as ctx:
+            pool.run(abs, -1)
+        self.assertEqual(ctx.exception.retry_after, 3)
+
+        release.set()
+        worker.join()
+        self.assertEqual(pool.run(abs, -1), 1)
+        stats = pool.get_stats()
+        self.assertEqual((stats['completed'], stats['rejected'], stats['in_flight']), (2, 1, 0))
+
+    def test_slow_task_times_out(self):
+        pool = self.make_pool(max_workers=1, max_queue=1, task_timeout=0.05)
+        with self.assertRaises(BiometricTaskTimeout):
+            pool.run(time.sleep, 0.3)
+        self.assertEqual(pool.get_stats()['timeouts'], 1)
+
+
+class MicroBatcherTestCase(SimpleTestCase):
+    """Teste pentru gruparea cererilor de inferență"""
+
+    def test_concurrent_requests_share_batches(self):
+        batch_sizes = []
+
+        def predict_batch(batch):
+            batch_sizes.append(batch.shape[0])
+            return np.asarray(batch.sum(axis=1)).ravel()
+
+        batcher = MicroBatcher(predict_batch, max_wait_ms=20)
+        results = {}
+
+        def request(i):
+            results[i] = batcher.predict(sp.csr_matrix([[i, 1.0]]))
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {i: i + 1 for i in range(20)})
+        self.assertLess(len(batch_sizes), 20)
+        metrics = batcher.get_metrics()
+        self.assertEqual(metrics['requests'], 20)
+        self.assertEqual(metrics['batches'], len(batch_sizes))
+
+    def test_errors_are_propagated_to_each_request(self):
+        def predict_batch(batch):
+            raise ValueError('model indisponibil')
+
+        batcher = MicroBatcher(predict_batch, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher.predict(sp.csr_matrix([[1.0]]))
+        self.assertEqual(batcher.get_metrics()['errors'], 1)
+
+    def test_prediction_count_mismatch_fails_every_request(self):
+        batcher = MicroBatcher(lambda batch: np.zeros(batch.shape[0] - 1), max_wait_ms=1)
+
+        with self.assertRaises(ValueError):
+            batcher.predict(sp.csr_matrix([[1.0]]))
+        self.assertEqual(batcher.get_metrics()['errors'], 1)
+
+
+class ModelManagerTestCase(SimpleTestCase):
+    """Teste pentru încărcarea leneșă a modelelor prin registrul de loadere"""
+
+    def register(self, model_name, loader):
+        model_manager.register_loader(model_name, loader)
+        self.addCleanup(model_manager._loaders.pop, model_name, None)
+        self.addCleanup(model_manager.unload_model, model_name)
+
+    def test_loader_runs_once_on_first_use(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)  # firele concurente ajung în timpul încărcării
+            return object()
+
+        self.register('test_model', loader)
+        self.assertFalse(model_manager.is_model_loaded('test_model'))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            models = list(executor.map(lambda _: model_manager.get_model('test_model'), range(4)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(model is models[0] for model in models))
+        self.assertIn('test_model', model_manager.available_models())
+
+    def test_warm_up_reports_load_times_and_failures(self):
+        def broken():
+            raise RuntimeError('lipsă fișier')
+
+        self.register('test_model', object)
+        self.register('test_broken', broken)
+
+        results = model_manager.warm_up(['test_model', 'test_broken'])
+
+        self.assertGreaterEqual(results['test_model'], 0)
+        self.assertIsNone(results['test_broken'])
+        self.assertTrue(model_manager.is_model_loaded('test_model'))
+        self.assertFalse(model_manager.is_model_loaded('test_broken'))
+
+    def test_failed_load_is_retried_on_next_request(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('lipsă fișier')
+            return object()
+
+        self.register('test_flaky', flaky)
+
+        with self.assertRaises(RuntimeError):
+            model_manager.get_model('test_flaky')
+        self.assertFalse(model_manager.is_model_loaded('test_flaky'))
+
+        model = model_manager.get_model('test_flaky')
+
+        self.assertIsNotNone(model)
+        self.assertEqual(len(attempts), 2)
+        self.assertTrue(model_manager.is_model_loaded('test_flaky'))
+
+    def test_unload_closes_model_resources(self):
+        class Session:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        self.register('test_session', Session)
+        session = model_manager.get_model('test_session')
+        self.assertIs(model_manager.get_model('test_session'), session)
+
+        model_manager.unload_model('test_session')
+
+        self.assertTrue(session.closed)
+        self.assertIsNot(model_manager.get_model('test_session'), session)
+
+
+class ModerationServiceTestCase(SimpleTestCase):
+    """Teste pentru clasificarea în loturi a propozițiilor"""
+
+    def setUp(self):
+        self.calls = []
+
+        def classifier(sentences, **kwargs):
+            self.calls.append(list(sentences))
+            return [
+                {'label': 'LABEL_1' if 'prost' in sentence.lower() else 'LABEL_0', 'score': 0.9}
+                for sentence in sentences
+            ]
+
+        model_manager.register_loader('test_classifier', lambda: classifier)
+        self.addCleanup(model_manager._loaders.pop, 'test_classifier', None)
+        self.addCleanup(model_manager.unload_model, 'test_classifier')
+        self.service = ModerationService(model_name='test_classifier', max_wait_ms=1)
+
+    def test_sentences_are_classified_in_one_batch_and_cached(self):
+        result = self.service.check('Bună ziua. Mulțumesc!  bună   ZIUA? Totul e în regulă')
+
+        self.assertFalse(result.flagged)
+        self.assertEqual((result.sentences, result.classified, result.cache_hits), (3, 3, 0))
+        self.assertEqual(len(self.calls), 1)
+
+        repeated = self.service.check('Mulțumesc. Bună ziua')
+        self.assertEqual((repeated.classified, repeated.cache_hits), (0, 2))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.service.get_metrics()['calls'], 2)
+
+    def test_cached_positive_short_circuits(self):
+        self.assertTrue(self.service.check('Ești prost').flagged)
+
+        result = self.service.check('Ești PROST. Altă propoziție nouă')
+
+        self.assertTrue(result.flagged)
+        self.assertEqual((result.cache_hits, result.classified), (1, 0))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.service.get_metrics()['short_circuits'], 1)
+
+    def test_model_load_does_not_count_against_the_deadline(self):
+        classifier = model_manager.get_model('test_classifier')
+
+        def slow_loader():
+            time.sleep(0.2)  # încărcarea la rece depășește timeout-ul clasificării
+            return classifier
+
+        model_manager.register_loader('test_slow', slow_loader)
+        self.addCleanup(model_manager._loaders.pop, 'test_slow', None)
+        self.addCleanup(model_manager.unload_model, 'test_slow')
+        service = ModerationService(model_name='test_slow', max_wait_ms=1, timeout=0.1)
+
+        self.assertTrue(service.check('Ești prost').flagged)
+
+    def test_unresponsive_classifier_raises_unavailable(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        model_manager.register_loader('test_stuck', lambda: lambda sentences, **kwargs: release.wait() and [])
+        self.addCleanup(model_manager._loaders.pop, 'test_stuck', None)
+        self.addCleanup(model_manager.unload_model, 'test_stuck')
+        service = ModerationService(model_name='test_stuck', max_wait_ms=1, timeout=0.05)
+
+        with self.assertRaises(ModerationUnavailable):
+            service.check('Bună ziua')
+
+    def test_lru_eviction(self):
+        service = ModerationService(model_name='test_classifier', cache_size=2, max_wait_ms=1)
+        service.check('unu. doi. trei')
+        self.assertEqual(len(service.cache), 2)
+        self.assertEqual(len(split_sentences('unu. doi. trei')), 3)
+
+
+class FramePreprocessorTestCase(SimpleTestCase):
+    """Teste pentru preprocesarea comună anti-spoofing + detectare"""
+
+    def setUp(self):
+        self.image = np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+    def test_views_match_model_sizes_and_reuse_buffers(self):
+        preprocessor = FramePreprocessor()
+        frame = preprocessor.prepare(self.image)
+
+        self.assertEqual(frame.spoof_input.shape, (360, 640, 3))
+        self.assertEqual(frame.detection_view.shape, (270, 480, 3))
+        self.assertAlmostEqual(frame.detection_scale, 0.375)
+        self.assertIs(frame.image, self.image)
+
+        spoof_buffer = frame.spoof_input
+        self.assertIs(preprocessor.prepare(self.image).spoof_input, spoof_buffer)
+
+    def test_small_images_are_not_copied(self):
+        small = self.image[:300, :400]
+        frame = FramePreprocessor().prepare(small, for_spoofing=False)
+
+        self.assertIs(frame.detection_view, small)
+        self.assertEqual(frame.detection_scale, 1.0)
+        self.assertIsNone(frame.spoof_input)
+
+    def test_decode_image_returns_rgb(self):
+        import cv2
+        _, encoded = cv2.imencode('.png', cv2.cvtColor(self.image, cv2.COLOR_RGB2BGR))
+        np.testing.assert_array_equal(decode_image(encoded.tobytes()), self.image)
+
+
+class FaceAnalysisTestCase(SimpleTestCase):
+    """Teste pentru trecerea unică de detectare + encoding a feței"""
+
+    NO_FACE = "Nicio fata detectata in imagine. Verificati pozitia si iluminarea."
+    MANY_FACES = "S-au detectat mai multe fete. Procesul necesita o singura fata."
+
+    def setUp(self):
+        # face_recognition este importat leneș în analyze_frame
+        self.face_recognition = mock.Mock()
+        self.face_recognition.face_encodings.return_value = [np.ones(128)]
+        self.enterContext(mock.patch.dict(sys.modules, {'face_recognition': self.face_recognition}))
+        self.enterContext(mock.patch.object(FaceRecognitionService, 'detect_spoofing_frame', return_value=True))
+        self.service = FaceRecognitionService()
+        self.image = np.zeros((200, 200, 3), dtype=np.uint8)
+
+    def test_single_face_is_detected_and_encoded_once(self):
+        self.face_recognition.face_locations.return_value = [(10, 60, 60, 10)]
+
+        analysis = self.service.analyze_face(self.image)
+
+        self.assertEqual(analysis.num_faces, 1)
+        self.assertIsNone(analysis.error)
+        np.testing.assert_array_equal(analysis.encoding, np.ones(128))
+        self.face_recognition.face_locations.assert_called_once()
+        self.face_recognition.face_encodings.assert_called_once()
+        self.assertEqual(
+            self.face_recognition.face_encodings.call_args.kwargs['known_face_locations'], [(10, 60, 60, 10)]
+        )
+
+    def test_locations_are_scaled_back_to_the_original_image(self):
+        self.face_recognition.face_locations.return_value = [(10, 30, 20, 5)]
+
+        analysis = self.service.analyze_face(np.zeros((960, 960, 3), dtype=np.uint8))
+
+        self.assertEqual(analysis.locations, [(20, 60, 40, 10)])
+
+    def test_multiple_faces_are_rejected_without_encoding(self):
+        self.face_recognition.face_locations.return_value = [(10, 60, 60, 10), (100, 160, 160, 100)]
+
+        analysis = self.service.analyze_face(self.image)
+
+        self.assertEqual((analysis.num_faces, analysis.error), (2, self.MANY_FACES))
+        self.assertIsNone(analysis.encoding)
+        self.face_recognition.face_encodings.assert_not_called()
+
+        result = VoteMonitoringService().verify_voter_identity(np.ones(128), self.image)
+        self.assertEqual(result, (False, "S-au detectat 2 fețe în cadru", 2))
+        self.assertEqual(self.face_recognition.face_locations.call_count, 2)
+
+    def test_missing_face_is_reported(self):
+        self.face_recognition.face_locations.return_value = []
+
+        analysis = self.service.analyze_face(self.image)
+
+        self.assertEqual((analysis.num_faces, analysis.error), (0, self.NO_FACE))
+        self.assertEqual(self.service.compare_faces(self.image, self.image), (False, self.NO_FACE))
+        self.assertEqual(VoteMonitoringService().verify_voter_identity(np.ones(128), self.image), (False, self.NO_FACE, 0))
+
+    def test_comparison_runs_one_detection_per_image(self):
+        self.face_recognition.face_locations.return_value = [(10, 60, 60, 10)]
+
+        self.assertEqual(self.service.compare_faces(self.image, self.image), (True, "Identificare reusita!"))
+        self.assertEqual(self.face_recognition.face_locations.call_count, 2)
+        self.assertEqual(self.face_recognition.face_encodings.call_count, 2)
@@ -1,3 +1,41 @@
 from django.shortcuts import render
+from rest_framework import status
+from rest_framework.response import Response
 
-# Create your views here.
+from .model_manager import BiometricPoolBusy
+
+# Secunde după care frontend-ul poate reîncerca verificarea limbajului
+MODERATION_RETRY_AFTER = 5
+
+
+def biometric_unavailable_response(error):
+    """
+    Răspuns pentru cererile biometrice respinse de pool-ul de procese:
+    429 când coada este plină, 503 când verificarea a expirat.
+    Ambele includ Retry-After pentru ca frontend-ul să reîncerce.
+    """
+    if isinstance(error, BiometricPoolBusy):
+        message = "Serverul procesează prea multe verificări faciale. Reîncercați în câteva secunde."
+        response_status = status.HTTP_429_TOO_MANY_REQUESTS
+    else:
+        message = "Verificarea facială a durat prea mult. Reîncercați în câteva secunde."
+        response_status = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return Response(
+        {"error": message, "detail": message, "retry_after": error.retry_after},
+        status=response_status,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+def moderation_unavailable_response(error):
+    """
+    Răspuns 503 când verificarea limbajului nu poate da un verdict (model
+    indisponibil sau timp depășit), în loc de o eroare internă.
+    """
+    message = "Verificarea limbajului nu este disponibilă momentan. Reîncercați în câteva secunde."
+    return Response(
+        {"error": message, "detail": message, "retry_after": MODERATION_RETRY_AFTER},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(MODERATION_RETRY_AFTER)},
+    )
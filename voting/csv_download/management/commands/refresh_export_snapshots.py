@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from csv_download.snapshots import LIVE_ROUNDS, SNAPSHOT_LOCATIONS, SNAPSHOT_ROUNDS, export_snapshot_service
+
+
+class Command(BaseCommand):
+    help = 'Generează snapshot-urile CSV de prezență; cu --loop regenerează periodic rundele live'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', choices=SNAPSHOT_LOCATIONS, help='Doar locația specificată')
+        parser.add_argument('--round', choices=SNAPSHOT_ROUNDS, help='Doar runda specificată')
+        parser.add_argument('--force', action='store_true', help='Regenerează și snapshot-urile existente')
+        parser.add_argument(
+            '--loop',
+            type=int,
+            metavar='SECUNDE',
+            help='După prima trecere, regenerează rundele live la intervalul dat',
+        )
+
+    def handle(self, *args, **options):
+        locations = [options['location']] if options['location'] else SNAPSHOT_LOCATIONS
+        rounds = [options['round']] if options['round'] else SNAPSHOT_ROUNDS
+
+        self.build_all(locations, rounds, options['force'])
+
+        if not options['loop']:
+            self.stdout.write(self.style.SUCCESS('Snapshot-urile CSV au fost generate.'))
+            return
+
+        live_rounds = [round_type for round_type in rounds if round_type in LIVE_ROUNDS]
+        if not live_rounds:
+            self.stdout.write(self.style.WARNING('Nicio rundă live selectată, --loop este ignorat.'))
+            return
+
+        while True:
+            time.sleep(options['loop'])
+            self.build_all(locations, live_rounds, force=True)
+
+    def build_all(self, locations, rounds, force):
+        for round_type in rounds:
+            for location in locations:
+                started = time.perf_counter()
+                try:
+                    snapshot = export_snapshot_service.build(location, round_type, force=force)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"{location}/{round_type}: eroare - {e}"))
+                    continue
+
+                if snapshot is None:
+                    self.stdout.write(f"{location}/{round_type}: generare deja în curs, omis")
+                    continue
+
+                self.stdout.write(
+                    f"{location}/{round_type}: {snapshot.records_count} înregistrări, "
+                    f"{snapshot.file_size / 1024:.1f} KB gzip, {time.perf_counter() - started:.2f}s"
+                )
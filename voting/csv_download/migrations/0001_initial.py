@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=15)),
+                ('round_type', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'În așteptare'), ('running', 'În generare'), ('ready', 'Disponibil'), ('failed', 'Eșuat')], default='pending', max_length=10)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('etag', models.CharField(blank=True, max_length=64)),
+                ('records_count', models.PositiveIntegerField(default=0)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot Export CSV',
+                'verbose_name_plural': 'Snapshot-uri Export CSV',
+                'unique_together': {('location', 'round_type')},
+            },
+        ),
+    ]
@@ -1,3 +1,41 @@
 from django.db import models
 
-# Create your models here.
+
+class ExportSnapshot(models.Model):
+    """
+    Fișier CSV (gzip) generat o singură dată pentru o pereche (locație, rundă).
+    Rundele istorice sunt generate o dată; cele live sunt regenerate periodic.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'În așteptare'),
+        ('running', 'În generare'),
+        ('ready', 'Disponibil'),
+        ('failed', 'Eșuat'),
+    ]
+
+    location = models.CharField(max_length=15)
+    round_type = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+
+    file_path = models.CharField(max_length=500, blank=True)
+    etag = models.CharField(max_length=64, blank=True)
+    records_count = models.PositiveIntegerField(default=0)
+    file_size = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    generated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Snapshot Export CSV"
+        verbose_name_plural = "Snapshot-uri Export CSV"
+        unique_together = ('location', 'round_type')
+
+    @property
+    def is_ready(self):
+        return self.status == 'ready' and bool(self.file_path)
+
+    def __str__(self):
+        return f"Export {self.location} - {self.round_type} ({self.status})"
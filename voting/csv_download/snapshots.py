@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ExportSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Rundele ale căror date se schimbă și trebuie regenerate periodic
+LIVE_ROUNDS = {'tur_activ'}
+
+# Locațiile și rundele pentru care se pot genera snapshot-uri
+SNAPSHOT_LOCATIONS = ['romania', 'strainatate']
+SNAPSHOT_ROUNDS = ['tur1_2024', 'tur2_2024', 'tur_activ']
+
+
+class ExportSnapshotService:
+    """
+    Generează exporturile CSV de prezență o singură dată, ca fișiere gzip pe disc,
+    pentru a fi servite direct (FileResponse + ETag) la descărcările următoare.
+
+    - un job per (locație, rundă): jobul este revendicat atomic în baza de date,
+      deci nici mai multe procese nu generează același fișier în paralel
+    - fișierele sunt scrise într-un fișier temporar și redenumite atomic;
+      numele conține ETag-ul, astfel încât o descărcare în curs nu este afectată
+    - rundele live sunt considerate expirate după `live_refresh_interval`
+    """
+
+    def __init__(self, directory, live_refresh_interval=60, job_timeout=600, max_workers=1):
+        self.directory = directory
+        self.live_refresh_interval = timedelta(seconds=live_refresh_interval)
+        self.job_timeout = timedelta(seconds=job_timeout)
+        self.max_workers = max_workers
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._queued = set()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'CSV_EXPORT_SNAPSHOTS_ENABLED', True)
+
+    def is_fresh(self, snapshot):
+        """Snapshot-ul poate fi servit: istoric generat sau live generat recent"""
+        if not snapshot.is_ready:
+            return False
+        if snapshot.round_type not in LIVE_ROUNDS:
+            return True
+        return timezone.now() - snapshot.generated_at < self.live_refresh_interval
+
+    def get_snapshot(self, location, round_type):
+        """Returnează snapshot-ul pentru (locație, rundă) și pornește generarea dacă nu este proaspăt"""
+        snapshot, _ = ExportSnapshot.objects.get_or_create(location=location, round_type=round_type)
+        if not self.is_fresh(snapshot):
+            self.enqueue(location, round_type)
+        return snapshot
+
+    def invalidate(self, snapshot):
+        """Marchează snapshot-ul pentru regenerare (ex. fișierul lipsește de pe disc)"""
+        ExportSnapshot.objects.filter(pk=snapshot.pk, status='ready').update(
+            status='pending', updated_at=timezone.now()
+        )
+        self.enqueue(snapshot.location, snapshot.round_type)
+
+    def enqueue(self, location, round_type):
+        """Pune jobul în coada procesului curent; False dacă este deja în coadă"""
+        key = (location, round_type)
+        with self._lock:
+            if key in self._queued:
+                return False
+            self._queued.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='csv-export'
+                )
+            executor = self._executor
+
+        executor.submit(self._run_job, location, round_type)
+        return True
+
+    def _run_job(self, location, round_type):
+        try:
+            close_old_connections()
+            self.build(location, round_type)
+        except Exception as e:
+            logger.error(f"Eroare la generarea snapshot-ului CSV {location}/{round_type}: {e}")
+        finally:
+            with self._lock:
+                self._queued.discard((location, round_type))
+            close_old_connections()
+
+    def _claim(self, snapshot):
+        """Revendică atomic jobul; False dacă altcineva îl generează deja"""
+        now = timezone.now()
+        claimable = ~Q(status='running') | Q(updated_at__lt=now - self.job_timeout)
+        return ExportSnapshot.objects.filter(claimable, pk=snapshot.pk).update(
+            status='running', updated_at=now
+        ) == 1
+
+    def build(self, location, round_type, force=False):
+        """
+        Generează snapshot-ul sincron. Returnează snapshot-ul actualizat sau
+        None dacă generarea rulează deja în alt fir/proces.
+        """
+        # Import local: views folosește acest modul (evităm importul circular)
+        from .views import CSVDownloadView
+
+        snapshot, _ = ExportSnapshot.objects.get_or_create(location=location, round_type=round_type)
+        if not force and self.is_fresh(snapshot):
+            return snapshot
+        if not self._claim(snapshot):
+            return None
+
+        view = CSVDownloadView()
+        vote_type, start_date, end_date = view.get_vote_parameters(round_type)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(
+            self.directory, f'.prezenta_{location}_{round_type}.{os.getpid()}.{threading.get_ident()}.tmp'
+        )
+
+        try:
+            if not vote_type:
+                raise ValueError(f'Tip de rundă invalid: {round_type}')
+
+            # mtime=0: același conținut produce același fișier (și același ETag)
+            with open(tmp_path, 'wb') as raw, \
+                    gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as compressed, \
+                    io.TextIOWrapper(compressed, encoding='utf-8', newline='') as output:
+                records_count = view.write_csv(output, location, round_type, vote_type, start_date, end_date)
+
+            etag = self._file_digest(tmp_path)
+            file_path = os.path.join(self.directory, f'prezenta_{location}_{round_type}_{etag[:16]}.csv.gz')
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            ExportSnapshot.objects.filter(pk=snapshot.pk).update(
+                status='failed', error=str(e), updated_at=timezone.now()
+            )
+            raise
+
+        previous_path = snapshot.file_path
+        now = timezone.now()
+        ExportSnapshot.objects.filter(pk=snapshot.pk).update(
+            status='ready', file_path=file_path, etag=etag, records_count=records_count,
+            file_size=os.path.getsize(file_path), error='', generated_at=now, updated_at=now
+        )
+
+        # Versiunea anterioară poate fi ștearsă: descărcările în curs au deja fișierul deschis
+        if previous_path and previous_path != file_path and os.path.exists(previous_path):
+            os.remove(previous_path)
+
+        snapshot.refresh_from_db()
+        logger.info(f"Snapshot CSV generat: {file_path}, {records_count} înregistrări")
+        return snapshot
+
+    def _file_digest(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+export_snapshot_service = ExportSnapshotService(
+    directory=getattr(settings, 'CSV_EXPORT_SNAPSHOT_DIR', os.path.join(settings.MEDIA_ROOT, 'exports')),
+    live_refresh_interval=getattr(settings, 'CSV_EXPORT_LIVE_REFRESH_INTERVAL', 60),
+    job_timeout=getattr(settings, 'CSV_EXPORT_JOB_TIMEOUT', 600),
+    max_workers=getattr(settings, 'CSV_EXPORT_WORKERS', 1),
+)
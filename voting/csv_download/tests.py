@@ -1,3 +1,155 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import tempfile
+from unittest import mock
+from datetime import datetime
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from prezenta.models import VotingPresence
+from vote.models import VotingSection, PresidentialCandidate, PresidentialVote
+from .snapshots import export_snapshot_service
+from .views import CSVDownloadView, LIVE_COUNTIES, LIVE_COUNTRIES
+
+User = get_user_model()
+
+
+@override_settings(CSV_EXPORT_SNAPSHOTS_ENABLED=False)
+class CSVStreamingExportTestCase(TestCase):
+    """Teste pentru exportul CSV transmis în flux"""
+
+    def setUp(self):
+        vote_datetime = timezone.make_aware(datetime(2024, 12, 8, 12, 0, 0))
+        for county, section_number in [('Cluj', 2), ('Alba', 1)]:
+            VotingPresence.objects.create(
+                county=county, locality=county, section_number=section_number, environment='urban',
+                vote_type='prezidentiale', vote_datetime=vote_datetime,
+                voters_permanent=10, voters_supplementary=2, voters_mobile=1,
+                demographic_data={'men_18': 3, 'women_120': 4},
+            )
+
+    def download(self):
+        request = APIRequestFactory().get('/api/csv/download/', {'location': 'romania', 'round': 'tur1_2024'})
+        return CSVDownloadView.as_view()(request)
+
+    def test_historical_export_is_streamed(self):
+        response = self.download()
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+
+        rows = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        header, data = rows[0], rows[1:]
+        self.assertEqual(len(header), 23 + 2 * 103)
+        self.assertEqual([row[0] for row in data], ['Alba', 'Cluj'])
+        for row in data:
+            self.assertEqual(len(row), len(header))
+            self.assertEqual(row[12], '13')
+            self.assertEqual(row[header.index('Barbati 18')], '3')
+            self.assertEqual(row[header.index('Femei 120')], '4')
+
+
+class LivePresenceExportTestCase(TestCase):
+    """Teste pentru agregarea prezenței live din exportul CSV"""
+
+    def setUp(self):
+        section = VotingSection.objects.create(
+            section_id='1', name='Școala 1', address='Str. A', city='Ploiești', county='PH'
+        )
+        candidate = PresidentialCandidate.objects.create(name='Ion', party='P1')
+        self.users = [User.objects.create(email=f'voter{i}@example.com', cnp=f'100000000000{i}') for i in range(4)]
+        for user in self.users[:3]:
+            PresidentialVote.objects.create(user=user, candidate=candidate, voting_section=section)
+        PresidentialVote.objects.create(user=self.users[3], candidate=candidate)
+
+    def test_county_tallies_come_from_one_query(self):
+        view = CSVDownloadView()
+        with self.assertNumQueries(1):
+            records = view.calculate_live_presence_from_votes(PresidentialVote.objects.all(), 'romania')
+
+        fallback_county = LIVE_COUNTIES[self.users[3].id % len(LIVE_COUNTIES)]
+        expected = {'Prahova': 3}
+        expected[fallback_county] = expected.get(fallback_county, 0) + 1
+        self.assertEqual({record['county']: record['total_votes'] for record in records}, expected)
+
+    def test_section_and_fallback_votes_share_the_county_row(self):
+        area_counts = CSVDownloadView().count_votes_by_area(
+            PresidentialVote.objects.all(), ['Prahova'], use_section=True
+        )
+
+        self.assertEqual(area_counts, {'Prahova': 4})
+
+    def test_abroad_tallies_are_grouped_by_country(self):
+        records = CSVDownloadView().calculate_live_presence_from_votes(PresidentialVote.objects.all(), 'strainatate')
+
+        expected = {}
+        for user in self.users:
+            country = LIVE_COUNTRIES[user.id % len(LIVE_COUNTRIES)]
+            expected[country] = expected.get(country, 0) + 1
+        self.assertEqual({record['county']: record['total_votes'] for record in records}, expected)
+
+
+class ExportSnapshotTestCase(TestCase):
+    """Teste pentru snapshot-urile CSV servite de pe disc"""
+
+    def setUp(self):
+        VotingPresence.objects.create(
+            county='Alba', section_number=1, environment='urban', vote_type='prezidentiale',
+            vote_datetime=timezone.make_aware(datetime(2024, 12, 8, 12, 0, 0)), voters_permanent=5,
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(mock.patch.object(export_snapshot_service, 'directory', directory.name))
+
+    def download(self, **headers):
+        request = APIRequestFactory().get(
+            '/api/csv/download/', {'location': 'romania', 'round': 'tur1_2024'},
+            HTTP_ACCEPT_ENCODING='gzip', **headers
+        )
+        return CSVDownloadView.as_view()(request)
+
+    def test_snapshot_matches_streamed_export_and_is_served_with_etag(self):
+        snapshot = export_snapshot_service.build('romania', 'tur1_2024')
+        self.assertEqual((snapshot.status, snapshot.records_count), ('ready', 1))
+
+        with override_settings(CSV_EXPORT_SNAPSHOTS_ENABLED=False):
+            streamed = b''.join(self.download().streaming_content)
+
+        response = self.download()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f'"{snapshot.etag}"')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), streamed)
+        response.close()
+
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=f'"{snapshot.etag}"').status_code, 304)
+
+    def test_snapshot_downloads_are_audited_as_completed_exports(self):
+        snapshot = export_snapshot_service.build('romania', 'tur1_2024')
+
+        with mock.patch('csv_download.views.create_security_event') as create_event:
+            self.download().close()
+            self.assertEqual(self.download(HTTP_IF_NONE_MATCH=f'"{snapshot.etag}"').status_code, 304)
+
+        completed = [
+            call.kwargs['additional_data'] for call in create_event.call_args_list
+            if call.kwargs['additional_data'].get('export_status') == 'success'
+        ]
+        self.assertEqual(len(completed), 2)
+        for data in completed:
+            self.assertEqual(data['records_count'], snapshot.records_count)
+            self.assertEqual(data['export_round'], 'tur1_2024')
+
+    def test_rebuild_replaces_previous_file(self):
+        first = export_snapshot_service.build('romania', 'tur1_2024')
+        VotingPresence.objects.update(voters_permanent=7)
+        second = export_snapshot_service.build('romania', 'tur1_2024', force=True)
+
+        self.assertNotEqual(first.etag, second.etag)
+        self.assertFalse(os.path.exists(first.file_path))
+        self.assertTrue(os.path.exists(second.file_path))
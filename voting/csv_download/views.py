@@ -1,21 +1,60 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
 from django.utils import timezone
 from datetime import datetime, timedelta
 import csv
 from django.utils.encoding import smart_str
 from prezenta.models import VotingPresence
 from vote.models import VoteSettings, PresidentialVote, PresidentialRound2Vote, LocalVote, ParliamentaryVote
+from vote.services.turnout import COUNTY_NAMES, get_county_name
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Mod
 import logging
 from security.utils import log_vote_security_event, log_captcha_attempt, create_security_event
+from .models import ExportSnapshot
+from .snapshots import LIVE_ROUNDS, SNAPSHOT_LOCATIONS, export_snapshot_service
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Numărul de rânduri citite odată din cursorul server-side la export
+EXPORT_CHUNK_SIZE = getattr(settings, 'CSV_EXPORT_CHUNK_SIZE', 2000)
+
+# Coloanele VotingPresence citite pentru export (fără instanțe de model)
+PRESENCE_EXPORT_FIELDS = (
+    'county', 'uat', 'locality', 'siruta', 'section_number', 'section_name', 'environment',
+    'location_type', 'registered_permanent', 'voters_permanent', 'voters_supplementary', 'voters_mobile',
+    'men_18_24', 'men_25_34', 'men_35_44', 'men_45_64', 'men_65_plus',
+    'women_18_24', 'women_25_34', 'women_35_44', 'women_45_64', 'women_65_plus',
+    'demographic_data',
+)
+
+# Zonele exportului live pentru voturile fără secție de votare (România)
+# și pentru străinătate; alegătorul este atribuit după user_id % len(zone)
+LIVE_COUNTIES = list(COUNTY_NAMES.values())
+LIVE_COUNTRIES = [
+    'Germania', 'Italia', 'Spania', 'Franța', 'Regatul Unit', 'Statele Unite',
+    'Canada', 'Australia', 'Austria', 'Belgia', 'Olanda', 'Suedia', 'Norvegia',
+    'Danemarca', 'Elveția', 'Irlanda', 'Portugalia', 'Grecia', 'Cipru', 'Malta'
+]
+
+# Cheile din demographic_data pentru coloanele pe vârste individuale (18-120)
+MEN_AGE_KEYS = [f'men_{age}' for age in range(18, 121)]
+WOMEN_AGE_KEYS = [f'women_{age}' for age in range(18, 121)]
+
+
+class Echo:
+    """Pseudo-buffer pentru csv.writer: întoarce linia scrisă în loc să o păstreze"""
+
+    def write(self, value):
+        return value
+
+
 class CSVDownloadView(APIView):
     permission_classes = [AllowAny]
     
@@ -45,40 +84,81 @@ class CSVDownloadView(APIView):
         # Determină numele fișierului
         filename = self.generate_filename(location, vote_type, round_type)
         
-        # Creează răspunsul HTTP pentru CSV
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        # Snapshot-ul gata generat este servit direct de pe disc; altfel jobul
+        # este pus în coadă și exportul curent este generat în flux
+        if export_snapshot_service.enabled and location in SNAPSHOT_LOCATIONS:
+            snapshot = export_snapshot_service.get_snapshot(location, round_type)
+            if export_snapshot_service.is_fresh(snapshot) and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                response = self.snapshot_response(request, snapshot, filename)
+                if response is not None:
+                    self.log_export_success(request, location, round_type, snapshot.records_count, filename)
+                    return response
+        
+        # Răspunsul este trimis linie cu linie: memoria rămâne constantă,
+        # iar primul octet pleacă înainte ca exportul să fie complet citit
+        response = StreamingHttpResponse(
+            self.stream_csv(request, location, round_type, vote_type, start_date, end_date, filename),
+            content_type='text/csv; charset=utf-8'
+        )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def snapshot_response(self, request, snapshot, filename):
+        """Servește snapshot-ul gzip (cu ETag); None dacă fișierul nu mai există"""
+        etag = f'"{snapshot.etag}"'
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
         
-        # Adaugă BOM pentru UTF-8(pt Excel)
-        response.write('\ufeff')
+        try:
+            snapshot_file = open(snapshot.file_path, 'rb')
+        except OSError:
+            logger.warning(f"Fișierul snapshot-ului CSV lipsește: {snapshot.file_path}")
+            export_snapshot_service.invalidate(snapshot)
+            return None
         
-        writer = csv.writer(response)
+        response = FileResponse(snapshot_file, content_type='text/csv; charset=utf-8')
+        response['Content-Encoding'] = 'gzip'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        return response
+    
+    def iter_rows(self, location, round_type, vote_type, start_date, end_date):
+        """Generează rândurile de date ale exportului (fără header)"""
+        if round_type in LIVE_ROUNDS:
+            return self.iter_live_rows(location, vote_type, start_date, end_date)
+        return self.iter_historical_rows(location, vote_type, start_date, end_date)
+    
+    def write_csv(self, output, location, round_type, vote_type, start_date, end_date):
+        """Scrie exportul complet într-un fișier text; returnează numărul de înregistrări"""
+        writer = csv.writer(output)
+        output.write('\ufeff')
+        writer.writerow(self.get_csv_header())
+        
+        records_count = 0
+        for row in self.iter_rows(location, round_type, vote_type, start_date, end_date):
+            writer.writerow(row)
+            records_count += 1
+        return records_count
+    
+    def stream_csv(self, request, location, round_type, vote_type, start_date, end_date, filename):
+        """Generează conținutul CSV (BOM, header, rânduri) și auditează rezultatul exportului"""
+        writer = csv.writer(Echo())
         
-        # Scrie header-ul CSV
-        self.write_csv_header(writer)
+        # BOM pentru UTF-8(pt Excel)
+        yield '\ufeff'
+        yield writer.writerow(self.get_csv_header())
         
-        # Obține și scrie datele
+        records_count = 0
         try:
-            if round_type == 'tur_activ':
-                records_count = self.write_live_data(writer, location, vote_type, start_date, end_date)
-            else:
-                records_count = self.write_historical_data(writer, location, vote_type, start_date, end_date)
+            for row in self.iter_rows(location, round_type, vote_type, start_date, end_date):
+                yield writer.writerow(row)
+                records_count += 1
             
             logger.info(f"CSV generat cu succes: {filename}, {records_count} înregistrări")
-            create_security_event(
-                user=request.user if request.user.is_authenticated else None,
-                event_type='data_export',
-                description=f"Export CSV finalizat cu succes: {filename}, {records_count} înregistrări",
-                request=request,
-                additional_data={
-                    'export_location': location,
-                    'export_round': round_type,
-                    'records_count': records_count,
-                    'filename': filename,
-                    'export_status': 'success'
-                },
-                risk_level='low'
-            )
+            self.log_export_success(request, location, round_type, records_count, filename)
         except Exception as e:
             logger.error(f"Eroare la generarea CSV: {str(e)}")
             create_security_event(
@@ -89,15 +169,30 @@ class CSVDownloadView(APIView):
                 additional_data={
                     'export_location': location,
                     'export_round': round_type,
+                    'records_count': records_count,
                     'error': str(e),
                     'export_status': 'failed'
                 },
                 risk_level='medium'
             )
-
-            return Response({'error': 'Eroare la generarea fișierului CSV'}, status=500)
-        
-        return response
+            # Header-ul HTTP a fost deja trimis: fișierul rămâne incomplet
+    
+    def log_export_success(self, request, location, round_type, records_count, filename):
+        """Auditează finalizarea exportului (generat în flux sau servit din snapshot)"""
+        create_security_event(
+            user=request.user if request.user.is_authenticated else None,
+            event_type='data_export',
+            description=f"Export CSV finalizat cu succes: {filename}, {records_count} înregistrări",
+            request=request,
+            additional_data={
+                'export_location': location,
+                'export_round': round_type,
+                'records_count': records_count,
+                'filename': filename,
+                'export_status': 'success'
+            },
+            risk_level='low'
+        )
     
     def get_vote_model(self, vote_type):
         """Returnează modelul de vot pe baza tipului"""
@@ -112,15 +207,15 @@ class CSVDownloadView(APIView):
         else:
             return None
     
-    def write_live_data(self, writer, location, vote_type, start_date, end_date):
-        """Scrie datele live REALE în CSV pe baza voturilor din baza de date"""
+    def iter_live_rows(self, location, vote_type, start_date, end_date):
+        """Generează rândurile CSV live REALE pe baza voturilor din baza de date"""
         logger.info(f"Generez date live REALE pentru {location}, {vote_type}")
         
         # Obține modelul de vot corect
         vote_model = self.get_vote_model(vote_type)
         if not vote_model:
             logger.error(f"Model de vot necunoscut: {vote_type}")
-            return 0
+            return
         
         # Obține toate voturile din perioada specificată
         votes_query = vote_model.objects.all()
@@ -134,120 +229,67 @@ class CSVDownloadView(APIView):
         # Calculează prezența pe județe sau țări pe baza voturilor reale
         presence_data = self.calculate_live_presence_from_votes(votes_query, location)
         
-        count = 0
         for presence_record in presence_data:
-            row = self.format_live_presence_row(presence_record, location)
-            writer.writerow(row)
-            count += 1
+            yield self.format_live_presence_row(presence_record, location)
         
-        logger.info(f"Generat {count} înregistrări live pentru {location}")
-        return count
+        logger.info(f"Generat {len(presence_data)} înregistrări live pentru {location}")
     
     def calculate_live_presence_from_votes(self, votes_query, location):
-        """Calculează prezența pe baza voturilor reale live"""
-        
-        # Grupează voturile pe județe pentru România sau pe țări pentru străinătate
+        """
+        Calculează prezența pe baza voturilor reale live, dintr-un singur query
+        grupat: numărul de rânduri citite depinde de numărul de județe/țări,
+        nu de numărul de voturi.
+        """
         if location == 'romania':
-            # Pentru România, grupează pe județ (din profilul utilizatorului)
-            county_votes = {}
-            
-            for vote in votes_query:
-                # Obține județul din profilul utilizatorului
-                county = self.get_user_county(vote.user) if hasattr(vote, 'user') and vote.user else 'Necunoscut'
-                
-                if county not in county_votes:
-                    county_votes[county] = {
-                        'votes': [],
-                        'total_votes': 0
-                    }
-                
-                county_votes[county]['votes'].append(vote)
-                county_votes[county]['total_votes'] += 1
-            
-            # Generează înregistrări pe județe
-            presence_records = []
-            for county, data in county_votes.items():
-                if county and county != 'Necunoscut':  # Exclude județul necunoscut
-                    presence_records.append(self.create_county_presence_record(county, data, location))
-            
+            # Pentru România, grupează pe județul secției de votare; votul fără
+            # secție primește un județ determinist după ID-ul utilizatorului
+            area_counts = self.count_votes_by_area(votes_query, LIVE_COUNTIES, use_section=True)
+            create_record = self.create_county_presence_record
         else:
-            # Pentru străinătate, grupează pe țări
-            country_votes = {}
-            
-            for vote in votes_query:
-                # Pentru străinătate, țara poate fi determinată din IP sau profil
-                country = self.get_user_country(vote.user) if hasattr(vote, 'user') and vote.user else 'Necunoscut'
-                
-                if country not in country_votes:
-                    country_votes[country] = {
-                        'votes': [],
-                        'total_votes': 0
-                    }
-                
-                country_votes[country]['votes'].append(vote)
-                country_votes[country]['total_votes'] += 1
-            
-            # Generează înregistrări pe țări
-            presence_records = []
-            for country, data in country_votes.items():
-                if country and country != 'Necunoscut':
-                    presence_records.append(self.create_country_presence_record(country, data, location))
-        
-        return presence_records
-    
-    def get_user_county(self, user):
-        """Obține județul utilizatorului din profil sau din date istorice"""
-        if not user:
-            return 'București'  # Default pentru testare
-        
-        # Încearcă să obțină județul din profilul utilizatorului
-        # Dacă nu există, folosește o distribuție aleatoare pe județele din România
-        counties = [
-            'Alba', 'Arad', 'Argeș', 'Bacău', 'Bihor', 'Bistrița-Năsăud', 'Botoșani',
-            'Brăila', 'Brașov', 'București', 'Buzău', 'Călărași', 'Caraș-Severin',
-            'Cluj', 'Constanța', 'Covasna', 'Dâmbovița', 'Dolj', 'Galați', 'Giurgiu',
-            'Gorj', 'Harghita', 'Hunedoara', 'Ialomița', 'Iași', 'Ilfov', 'Maramureș',
-            'Mehedinți', 'Mureș', 'Neamț', 'Olt', 'Prahova', 'Sălaj', 'Satu Mare',
-            'Sibiu', 'Suceava', 'Teleorman', 'Timiș', 'Tulcea', 'Vâlcea', 'Vaslui', 'Vrancea'
+            # Pentru străinătate, grupează pe țări (distribuite după ID-ul utilizatorului)
+            area_counts = self.count_votes_by_area(votes_query, LIVE_COUNTRIES, use_section=False)
+            create_record = self.create_country_presence_record
+        
+        return [
+            create_record(area, total_votes, location)
+            for area, total_votes in sorted(area_counts.items())
+            if area
         ]
-        
-        # Folosește hash-ul ID-ului pentru a atribui consistent același județ aceluiași utilizator
-        import hashlib
-        hash_obj = hashlib.md5(str(user.id).encode())
-        hash_int = int(hash_obj.hexdigest(), 16)
-        county_index = hash_int % len(counties)
-        
-        return counties[county_index]
     
-    def get_user_country(self, user):
-        """Obține țara utilizatorului pentru străinătate"""
-        if not user:
-            return 'Germania'  # Default pentru testare
-        
-        # Pentru străinătate, folosește o distribuție pe țări
-        countries = [
-            'Germania', 'Italia', 'Spania', 'Franța', 'Regatul Unit', 'Statele Unite',
-            'Canada', 'Australia', 'Austria', 'Belgia', 'Olanda', 'Suedia', 'Norvegia',
-            'Danemarca', 'Elveția', 'Irlanda', 'Portugalia', 'Grecia', 'Cipru', 'Malta'
-        ]
-        
-        # Folosește hash-ul ID-ului pentru consistență
-        import hashlib
-        hash_obj = hashlib.md5(str(user.id).encode())
-        hash_int = int(hash_obj.hexdigest(), 16)
-        country_index = hash_int % len(countries)
-        
-        return countries[country_index]
+    def count_votes_by_area(self, votes_query, areas, use_section):
+        """
+        Returnează {zonă: voturi}. Zona este județul secției de votare (dacă
+        use_section) sau areas[user_id % len(areas)], calculată în baza de date.
+        """
+        bucket = Mod(F('user_id'), Value(len(areas)))
+        group_by = ['bucket']
+        if use_section:
+            # -1 marchează voturile pentru care zona este județul secției
+            bucket = Case(
+                When(voting_section__isnull=True, then=bucket),
+                default=Value(-1),
+                output_field=IntegerField()
+            )
+            group_by.insert(0, 'voting_section__county')
+        
+        rows = votes_query.annotate(bucket=bucket)\
+            .values(*group_by)\
+            .annotate(total_votes=Count('id'))\
+            .order_by()
+        
+        area_counts = {}
+        for row in rows:
+            # Unele baze de date (SQLite) întorc restul împărțirii ca float.
+            # Secțiile păstrează codul județului, zonele folosesc denumirea
+            if row['bucket'] < 0:
+                area = get_county_name(row['voting_section__county'])
+            else:
+                area = areas[int(row['bucket'])]
+            area_counts[area] = area_counts.get(area, 0) + row['total_votes']
+        return area_counts
     
-    def create_county_presence_record(self, county, vote_data, location):
+    def create_county_presence_record(self, county, total_votes, location):
         """Creează o înregistrare de prezență pentru un județ"""
-        total_votes = vote_data['total_votes']
-        votes = vote_data['votes']
-        
-        # Calculează date demografice pe baza voturilor
-        men_votes = 0
-        women_votes = 0
-        
         # Distribuție pe grupe de vârstă (simulată proporțional)
         men_18_24 = int(total_votes * 0.08)
         men_25_34 = int(total_votes * 0.12)
@@ -299,9 +341,8 @@ class CSVDownloadView(APIView):
             )
         }
     
-    def create_country_presence_record(self, country, vote_data, location):
+    def create_country_presence_record(self, country, total_votes, location):
         """Creează o înregistrare de prezență pentru o țară"""
-        total_votes = vote_data['total_votes']
         
         # Pentru străinătate, structura este similară dar cu unele diferențe
         men_18_24 = int(total_votes * 0.10)
@@ -437,17 +478,9 @@ class CSVDownloadView(APIView):
         # Adaugă datele demografice pe vârste individuale
         demographic_data = presence_record.get('demographic_data', {})
         
-        # Bărbați pe vârste (18-120)
-        for age in range(18, 121):
-            key = f'men_{age}'
-            value = demographic_data.get(key, 0)
-            row.append(value)
-        
-        # Femei pe vârste (18-120)
-        for age in range(18, 121):
-            key = f'women_{age}'
-            value = demographic_data.get(key, 0)
-            row.append(value)
+        # Bărbați și femei pe vârste (18-120)
+        row.extend([demographic_data.get(key, 0) for key in MEN_AGE_KEYS])
+        row.extend([demographic_data.get(key, 0) for key in WOMEN_AGE_KEYS])
         
         return row
 
@@ -474,8 +507,8 @@ class CSVDownloadView(APIView):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M')
         return f'prezenta_{location_name}_{round_name}_{timestamp}.csv'
     
-    def write_csv_header(self, writer):
-        """Scrie header-ul CSV exact ca în fișierul original"""
+    def get_csv_header(self):
+        """Returnează header-ul CSV exact ca în fișierul original"""
         headers = [
             'Judet', 'UAT', 'Localitate', 'Siruta', 'Nr sectie de votare',
             'Nume sectie de votare', 'Mediu', 'Înscriși pe liste permanente',
@@ -492,10 +525,14 @@ class CSVDownloadView(APIView):
         for age in range(18, 121):
             headers.append(f'Femei {age}')
         
-        writer.writerow(headers)
+        return headers
     
-    def write_historical_data(self, writer, location, vote_type, start_date, end_date):
-        """Scrie datele istorice în CSV"""
+    def iter_historical_rows(self, location, vote_type, start_date, end_date):
+        """
+        Generează rândurile CSV istorice. Înregistrările sunt citite în bucăți
+        de EXPORT_CHUNK_SIZE printr-un cursor server-side (values_list, fără
+        instanțe de model), astfel încât memoria nu crește cu mărimea exportului.
+        """
         logger.info(f"Generez date istorice pentru {location}, {vote_type}")
         
         presence_query = VotingPresence.objects.filter(
@@ -509,18 +546,17 @@ class CSVDownloadView(APIView):
                 vote_datetime__lte=end_date
             )
         
-        presence_query = presence_query.order_by('county', 'locality', 'section_number')
+        presence_query = presence_query.order_by('county', 'locality', 'section_number')\
+            .values_list(*PRESENCE_EXPORT_FIELDS, named=True)
         
-        count = 0
-        for presence in presence_query:
-            row = self.format_presence_row(presence)
-            writer.writerow(row)
-            count += 1
-        
-        return count
+        for presence in presence_query.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield self.format_presence_row(presence)
     
     def format_presence_row(self, presence):
-        """Formatează o înregistrare de prezență istorică pentru CSV"""
+        """
+        Formatează o înregistrare de prezență istorică pentru CSV
+        (instanță VotingPresence sau rând values_list cu named=True)
+        """
         
         # Calculează totalul votanților
         total_voters = presence.voters_permanent + presence.voters_supplementary + presence.voters_mobile
@@ -559,17 +595,9 @@ class CSVDownloadView(APIView):
         # Adaugă datele demografice pe vârste individuale
         demographic_data = presence.demographic_data or {}
         
-        # Bărbați pe vârste (18-120)
-        for age in range(18, 121):
-            key = f'men_{age}'
-            value = demographic_data.get(key, 0)
-            row.append(value or 0)
-        
-        # Femei pe vârste (18-120)
-        for age in range(18, 121):
-            key = f'women_{age}'
-            value = demographic_data.get(key, 0)
-            row.append(value or 0)
+        # Bărbați și femei pe vârste (18-120)
+        row.extend([demographic_data.get(key, 0) or 0 for key in MEN_AGE_KEYS])
+        row.extend([demographic_data.get(key, 0) or 0 for key in WOMEN_AGE_KEYS])
         
         return row
     
@@ -631,7 +659,21 @@ class CSVDownloadStatusView(APIView):
             else:
                 data_count = 0
         else:
-            # Pentru date istorice
+            # Pentru date istorice, snapshot-ul generat știe deja numărul de înregistrări
+            snapshot = ExportSnapshot.objects.filter(
+                location=location, round_type=round_type, status='ready'
+            ).first()
+            if snapshot:
+                return Response({
+                    'available': snapshot.records_count > 0,
+                    'data_count': snapshot.records_count,
+                    'vote_type': vote_type,
+                    'location': location,
+                    'round_type': round_type,
+                    'estimated_file_size': f"{snapshot.file_size / 1024:.1f} KB",
+                    'is_live': False
+                })
+            
             query = VotingPresence.objects.filter(
                 vote_type=vote_type,
                 location_type=location
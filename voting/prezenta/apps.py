@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PrezentaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prezenta'
+
+    def ready(self):
+        # Importă signal-urile care țin sumarele de prezență sincronizate
+        import prezenta.signals
@@ -4,6 +4,7 @@ from datetime import datetime
 import csv
 import os
 from prezenta.models import VotingPresence, PresenceSummary
+from prezenta.summaries import rebuild_presence_summaries
 from django.db import transaction
 from django.db.models import Sum
 import logging
@@ -132,8 +133,8 @@ class Command(BaseCommand):
             ))
             
             # Creează sumarele separate
-            self.create_county_summaries(vote_type, 'romania', vote_datetime)
-            self.create_county_summaries(vote_type, 'strainatate', vote_datetime)
+            self.create_county_summaries(vote_type, 'romania')
+            self.create_county_summaries(vote_type, 'strainatate')
             
             # Afișează statistici finale
             self.show_final_statistics(vote_type, 'romania')
@@ -335,67 +336,11 @@ class Command(BaseCommand):
         except (ValueError, TypeError):
             return 0
     
-    def create_county_summaries(self, vote_type, location_type, vote_datetime):
+    def create_county_summaries(self, vote_type, location_type):
         """Creează sumarele pe județe/țări"""
         self.stdout.write(f'Creez sumarele pentru {location_type}...')
-        
-        counties = VotingPresence.objects.filter(
-            vote_type=vote_type,
-            location_type=location_type
-        ).values_list('county', flat=True).distinct()
-        
-        for county in counties:
-            county_data = VotingPresence.objects.filter(
-                county=county,
-                vote_type=vote_type,
-                location_type=location_type
-            ).aggregate(
-                total_registered=Sum('registered_permanent'),
-                total_permanent=Sum('voters_permanent'),
-                total_supplementary=Sum('voters_supplementary'),
-                total_mobile=Sum('voters_mobile'),
-                total_men=Sum('men_18_24') + Sum('men_25_34') + Sum('men_35_44') + Sum('men_45_64') + Sum('men_65_plus'),
-                total_women=Sum('women_18_24') + Sum('women_25_34') + Sum('women_35_44') + Sum('women_45_64') + Sum('women_65_plus')
-            )
-            
-            # Urban/rural
-            urban_rural = VotingPresence.objects.filter(
-                county=county,
-                vote_type=vote_type,
-                location_type=location_type
-            ).values('environment').annotate(
-                voters=Sum('voters_permanent') + Sum('voters_supplementary') + Sum('voters_mobile')
-            )
-            
-            urban_voters = 0
-            rural_voters = 0
-            for data in urban_rural:
-                if data['environment'] == 'urban':
-                    urban_voters = data['voters'] or 0
-                else:
-                    rural_voters = data['voters'] or 0
-            
-            total_voters = (county_data['total_permanent'] or 0) + \
-                          (county_data['total_supplementary'] or 0) + \
-                          (county_data['total_mobile'] or 0)
-            
-            PresenceSummary.objects.update_or_create(
-                vote_type=vote_type,
-                location_type=location_type,
-                county=county,
-                vote_datetime=vote_datetime,
-                defaults={
-                    'total_registered': county_data['total_registered'] or 0,
-                    'total_voters': total_voters,
-                    'total_permanent': county_data['total_permanent'] or 0,
-                    'total_supplementary': county_data['total_supplementary'] or 0,
-                    'total_mobile': county_data['total_mobile'] or 0,
-                    'urban_voters': urban_voters,
-                    'rural_voters': rural_voters,
-                    'total_men': county_data['total_men'] or 0,
-                    'total_women': county_data['total_women'] or 0
-                }
-            )
+        summaries_count = rebuild_presence_summaries(vote_type, location_type)
+        self.stdout.write(f'Sumare create: {summaries_count}')
     
     def show_final_statistics(self, vote_type, location_type):
         """Afișează statistici finale"""
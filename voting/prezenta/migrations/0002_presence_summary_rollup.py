@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:52
+
+from django.db import migrations, models
+
+
+def clear_presence_summaries(apps, schema_editor):
+    # Sumarele existente nu au coloanele noi; sunt reconstruite la prima cerere
+    apps.get_model('prezenta', 'PresenceSummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prezenta', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presencesummary',
+            name='rural_registered',
+            field=models.IntegerField(default=0, verbose_name='Înscriși rural'),
+        ),
+        migrations.AddField(
+            model_name='presencesummary',
+            name='sections_count',
+            field=models.IntegerField(default=0, verbose_name='Număr secții de votare'),
+        ),
+        migrations.AddField(
+            model_name='presencesummary',
+            name='urban_registered',
+            field=models.IntegerField(default=0, verbose_name='Înscriși urban'),
+        ),
+        migrations.AddIndex(
+            model_name='presencesummary',
+            index=models.Index(fields=['vote_type', 'location_type', '-total_voters'], name='prezenta_pr_vote_ty_d13268_idx'),
+        ),
+        migrations.RunPython(clear_presence_summaries, migrations.RunPython.noop),
+    ]
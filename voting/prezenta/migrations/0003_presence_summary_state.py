@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prezenta', '0002_presence_summary_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceSummaryState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_type', models.CharField(max_length=25)),
+                ('location_type', models.CharField(max_length=15)),
+                ('is_dirty', models.BooleanField(default=True)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Stare Sumare Prezență',
+                'verbose_name_plural': 'Stări Sumare Prezență',
+                'unique_together': {('vote_type', 'location_type')},
+            },
+        ),
+    ]
@@ -96,7 +96,11 @@ class VotingPresence(models.Model):
         return f"Prezență {self.county} - {self.vote_type} ({self.vote_datetime.strftime('%d.%m.%Y')})"
 
 class PresenceSummary(models.Model):
-    """Model pentru sumarele de prezență pe județe/țări"""
+    """
+    Model pentru sumarele de prezență pe județe/țări.
+    Este ținut sincronizat cu VotingPresence (vezi prezenta.summaries), astfel
+    încât pagina de prezență să nu mai agrege tabela secțiilor la fiecare cerere.
+    """
     
     vote_type = models.CharField(max_length=25, choices=[
         ('prezidentiale', 'Alegeri Prezidențiale'),
@@ -119,10 +123,13 @@ class PresenceSummary(models.Model):
     total_permanent = models.IntegerField(default=0, verbose_name="Total liste permanente")
     total_supplementary = models.IntegerField(default=0, verbose_name="Total liste suplimentare")
     total_mobile = models.IntegerField(default=0, verbose_name="Total urnă mobilă")
+    sections_count = models.IntegerField(default=0, verbose_name="Număr secții de votare")
     
     # Mediu urban/rural
     urban_voters = models.IntegerField(default=0, verbose_name="Votanți urban")
     rural_voters = models.IntegerField(default=0, verbose_name="Votanți rural")
+    urban_registered = models.IntegerField(default=0, verbose_name="Înscriși urban")
+    rural_registered = models.IntegerField(default=0, verbose_name="Înscriși rural")
     
     # Demografie
     total_men = models.IntegerField(default=0, verbose_name="Total bărbați")
@@ -132,6 +139,9 @@ class PresenceSummary(models.Model):
         verbose_name = "Sumar Prezență"
         verbose_name_plural = "Sumare Prezență"
         unique_together = ['vote_type', 'location_type', 'county', 'vote_datetime']
+        indexes = [
+            models.Index(fields=['vote_type', 'location_type', '-total_voters']),
+        ]
     
     @property
     def participation_rate(self):
@@ -141,4 +151,26 @@ class PresenceSummary(models.Model):
         return 0
     
     def __str__(self):
-        return f"Sumar {self.county} - {self.vote_type} ({self.vote_datetime.strftime('%d.%m.%Y')})"
\ No newline at end of file
+        return f"Sumar {self.county} - {self.vote_type} ({self.vote_datetime.strftime('%d.%m.%Y')})"
+
+
+class PresenceSummaryState(models.Model):
+    """
+    Starea sumarelor unei runde (tip de vot + locație). Rândul există și pentru
+    rundele fără date, ca sumarele goale să nu fie reconstruite la fiecare
+    cerere; is_dirty este setat la modificarea VotingPresence, în baza de date,
+    astfel încât invalidarea este văzută de toate procesele.
+    """
+    vote_type = models.CharField(max_length=25)
+    location_type = models.CharField(max_length=15)
+    is_dirty = models.BooleanField(default=True)
+    built_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Stare Sumare Prezență"
+        verbose_name_plural = "Stări Sumare Prezență"
+        unique_together = ['vote_type', 'location_type']
+    
+    def __str__(self):
+        state = "de reconstruit" if self.is_dirty else "actuale"
+        return f"Sumare {self.vote_type}/{self.location_type} ({state})"
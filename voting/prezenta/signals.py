@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import VotingPresence
+from .summaries import mark_summaries_dirty
+
+
+@receiver(post_save, sender=VotingPresence)
+@receiver(post_delete, sender=VotingPresence)
+def invalidate_presence_summaries(sender, instance, **kwargs):
+    """Sumarele rundei modificate sunt reconstruite la următoarea citire"""
+    mark_summaries_dirty(instance.vote_type, instance.location_type)
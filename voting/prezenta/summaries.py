@@ -0,0 +1,104 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+
+from .models import VotingPresence, PresenceSummary, PresenceSummaryState
+
+logger = logging.getLogger(__name__)
+
+VOTERS = F('voters_permanent') + F('voters_supplementary') + F('voters_mobile')
+MEN = F('men_18_24') + F('men_25_34') + F('men_35_44') + F('men_45_64') + F('men_65_plus')
+WOMEN = F('women_18_24') + F('women_25_34') + F('women_35_44') + F('women_45_64') + F('women_65_plus')
+
+URBAN = Q(environment='urban')
+RURAL = Q(environment='rural')
+
+
+def mark_summaries_dirty(vote_type, location_type):
+    """Marchează sumarele unei runde pentru reconstruire la următoarea citire"""
+    PresenceSummaryState.objects.filter(vote_type=vote_type, location_type=location_type)\
+        .update(is_dirty=True)
+
+
+def rebuild_presence_summaries(vote_type, location_type, only_if_dirty=False):
+    """
+    Reconstruiește sumarele pe județe/țări ale unei runde dintr-un singur
+    query GROUP BY peste VotingPresence. Returnează numărul de sumare create.
+
+    Reconstruirea ține blocat rândul de stare al rundei, deci cererile
+    concurente se serializează; cu only_if_dirty=True, cererile care au
+    așteptat o reconstruire deja făcută de alt proces nu o mai repetă.
+    """
+    with transaction.atomic():
+        state, _ = PresenceSummaryState.objects.select_for_update()\
+            .get_or_create(vote_type=vote_type, location_type=location_type)
+        if only_if_dirty and not state.is_dirty:
+            return 0
+        count = _build_presence_summaries(vote_type, location_type)
+        state.is_dirty = False
+        state.built_at = timezone.now()
+        state.save(update_fields=['is_dirty', 'built_at'])
+
+    logger.info(f"Sumare de prezență reconstruite pentru {vote_type}/{location_type}: {count} județe/țări")
+    return count
+
+
+def _build_presence_summaries(vote_type, location_type):
+    rows = VotingPresence.objects.filter(vote_type=vote_type, location_type=location_type)\
+        .values('county')\
+        .annotate(
+            latest_datetime=Max('vote_datetime'),
+            total_registered=Sum('registered_permanent', default=0),
+            total_voters=Sum(VOTERS, default=0),
+            total_permanent=Sum('voters_permanent', default=0),
+            total_supplementary=Sum('voters_supplementary', default=0),
+            total_mobile=Sum('voters_mobile', default=0),
+            sections_count=Count('id'),
+            urban_voters=Sum(VOTERS, filter=URBAN, default=0),
+            rural_voters=Sum(VOTERS, filter=RURAL, default=0),
+            urban_registered=Sum('registered_permanent', filter=URBAN, default=0),
+            rural_registered=Sum('registered_permanent', filter=RURAL, default=0),
+            total_men=Sum(MEN, default=0),
+            total_women=Sum(WOMEN, default=0),
+        )\
+        .order_by()
+
+    summaries = []
+    for row in rows:
+        row['vote_datetime'] = row.pop('latest_datetime')
+        summaries.append(PresenceSummary(vote_type=vote_type, location_type=location_type, **row))
+
+    PresenceSummary.objects.filter(vote_type=vote_type, location_type=location_type).delete()
+    PresenceSummary.objects.bulk_create(summaries, batch_size=500, ignore_conflicts=True)
+    return len(summaries)
+
+
+def get_presence_summaries(vote_type, location_type):
+    """
+    Returnează queryset-ul sumarelor unei runde. Sumarele sunt materializate
+    la prima cerere și reconstruite după modificări ale VotingPresence; o
+    rundă fără date rămâne marcată ca reconstruită și nu mai este recalculată.
+    """
+    is_dirty = PresenceSummaryState.objects.filter(vote_type=vote_type, location_type=location_type)\
+        .values_list('is_dirty', flat=True).first()
+    if is_dirty is None or is_dirty:
+        rebuild_presence_summaries(vote_type, location_type, only_if_dirty=True)
+    return PresenceSummary.objects.filter(vote_type=vote_type, location_type=location_type)
+
+
+def get_presence_totals(summaries):
+    """Totalurile naționale și urban/rural, adunate din sumarele pe județe într-un singur query"""
+    return summaries.aggregate(
+        total_registered=Sum('total_registered', default=0),
+        total_voters=Sum('total_voters', default=0),
+        total_permanent=Sum('total_permanent', default=0),
+        total_supplementary=Sum('total_supplementary', default=0),
+        total_mobile=Sum('total_mobile', default=0),
+        sections_count=Sum('sections_count', default=0),
+        urban_voters=Sum('urban_voters', default=0),
+        rural_voters=Sum('rural_voters', default=0),
+        urban_registered=Sum('urban_registered', default=0),
+        rural_registered=Sum('rural_registered', default=0),
+    )
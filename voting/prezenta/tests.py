@@ -1,3 +1,99 @@
+from datetime import datetime
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from vote.models import CountyTurnoutCounter, DemographicTurnoutCounter
+from .models import VotingPresence, PresenceSummary, PresenceSummaryState
+from .summaries import rebuild_presence_summaries
+from .views import VotingPresenceView
+
+
+class PresenceSummaryTestCase(TestCase):
+    """Teste pentru sumarele de prezență materializate"""
+
+    def setUp(self):
+        cache.clear()
+        self.vote_datetime = timezone.make_aware(datetime(2024, 12, 8, 21, 0, 0))
+        for county, environment, registered, voters in [
+            ('Cluj', 'urban', 1000, 600), ('Cluj', 'rural', 500, 200), ('Alba', 'rural', 400, 100),
+        ]:
+            self.add_section(county, environment, registered, voters)
+
+    def add_section(self, county, environment, registered, voters):
+        return VotingPresence.objects.create(
+            county=county, environment=environment, vote_type='parlamentare', vote_datetime=self.vote_datetime,
+            registered_permanent=registered, voters_permanent=voters, voters_mobile=1, men_18_24=voters,
+        )
+
+    def get_presence(self, page_size=10, location='romania'):
+        return VotingPresenceView().get_historical_presence(location, 'parlamentare', None, None, 1, page_size).data
+
+    def test_presence_is_served_from_summaries(self):
+        self.get_presence()  # prima cerere materializează sumarele
+        self.assertEqual(PresenceSummary.objects.count(), 2)
+
+        with self.assertNumQueries(4):
+            data = self.get_presence(page_size=1)
+
+        self.assertEqual(data['general_stats']['total_voters'], 903)
+        self.assertEqual(data['general_stats']['registered_permanent'], 1900)
+        self.assertEqual(data['urban_rural']['urban']['voters'], 601)
+        self.assertEqual(data['urban_rural']['rural'], {'voters': 302, 'registered': 900, 'participation_rate': 302 / 900 * 100})
+        self.assertEqual(data['pagination']['total_counties'], 2)
+        self.assertEqual(
+            data['counties'],
+            [{
+                'county': 'Cluj', 'total_voters': 802, 'registered_permanent': 1500,
+                'participation_rate': 802 / 1500 * 100, 'urban_voters': 601, 'rural_voters': 201,
+                'men_voters': 800, 'women_voters': 0,
+            }]
+        )
+
+    def test_live_presence_uses_summary_registered_and_county_names(self):
+        CountyTurnoutCounter.objects.create(vote_type='parlamentare', county='CJ', total_votes=300, unique_voters=300)
+        for value, voters in [('urban', 200), ('rural', 100)]:
+            DemographicTurnoutCounter.objects.create(
+                vote_type='parlamentare', dimension='environment', value=value, voters=voters
+            )
+
+        data = VotingPresenceView().get_live_presence('romania', 'parlamentare', None, None, 1, 10).data
+
+        self.assertEqual(data['urban_rural']['urban'], {'voters': 200, 'registered': 1000, 'participation_rate': 20.0})
+        self.assertEqual(data['urban_rural']['rural']['registered'], 900)
+        self.assertEqual(len(data['counties']), 1)
+        self.assertEqual(data['counties'][0]['county'], 'Cluj')
+        self.assertEqual(data['counties'][0]['registered_permanent'], 1500)
+        self.assertEqual(data['counties'][0]['participation_rate'], 20.0)
+
+        abroad = VotingPresenceView().get_live_presence('strainatate', 'parlamentare', None, None, 1, 10).data
+        self.assertEqual(abroad['urban_rural']['urban']['voters'], 0)
+        self.assertEqual(abroad['urban_rural']['rural']['voters'], 0)
+
+    def test_changes_to_presence_rebuild_summaries(self):
+        self.get_presence()
+        self.add_section('Alba', 'urban', 1000, 999)
+
+        data = self.get_presence()
+
+        self.assertEqual([county['county'] for county in data['counties']], ['Alba', 'Cluj'])
+        self.assertEqual(data['counties'][0]['total_voters'], 1101)
+
+    def test_round_without_presence_is_built_once(self):
+        data = self.get_presence(location='strainatate')
+        self.assertEqual(data['counties'], [])
+        state = PresenceSummaryState.objects.get(vote_type='parlamentare', location_type='strainatate')
+        self.assertFalse(state.is_dirty)
+        self.assertIsNotNone(state.built_at)
+
+        with self.assertNumQueries(4):
+            self.get_presence(location='strainatate')
+
+    def test_rebuild_is_skipped_when_another_request_already_built(self):
+        self.get_presence()
 
-# Create your tests here.
+        self.assertEqual(rebuild_presence_summaries('parlamentare', 'romania', only_if_dirty=True), 0)
+        self.assertEqual(PresenceSummary.objects.count(), 2)
+        self.assertEqual(rebuild_presence_summaries('parlamentare', 'romania'), 2)
+        self.assertEqual(PresenceSummary.objects.count(), 2)
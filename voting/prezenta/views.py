@@ -5,7 +5,10 @@ from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import VotingPresence, PresenceSummary
+from .summaries import get_presence_summaries, get_presence_totals
 from vote.models import VoteSettings, PresidentialVote, PresidentialRound2Vote, LocalVote, ParliamentaryVote
+from vote.services.turnout import get_county_name, get_county_turnout
+from vote.services.demographics import get_demographic_counts
 from django.contrib.auth import get_user_model
 import logging
 
@@ -55,8 +58,23 @@ class VotingPresenceView(APIView):
             )
         
         total_votes = votes_query.count()
-        county_presence = self.calculate_live_county_presence(votes_query, location)
-        urban_rural_data = self.get_urban_rural_comparison(location, vote_type, start_date, end_date)
+        
+        # Înscrișii rămân cei din sumarele rundei pentru locația cerută
+        registered = self.get_registered_by_county(vote_type, location)
+        county_presence = self.calculate_live_county_presence(vote_type, total_votes, location, registered)
+        
+        # Urban/rural din contoarele demografice actualizate la fiecare vot; mediul
+        # este dedus din adresa de domiciliu, deci contoarele descriu doar România
+        if location == 'romania':
+            environment_counts = get_demographic_counts(vote_type)['environment']
+        else:
+            environment_counts = {}
+        urban_rural_data = self.format_urban_rural(
+            environment_counts.get('urban', 0),
+            sum(county['urban_registered'] for county in registered.values()),
+            environment_counts.get('rural', 0),
+            sum(county['rural_registered'] for county in registered.values())
+        )
         
         # Paginare
         total_counties = len(county_presence)
@@ -109,37 +127,38 @@ class VotingPresenceView(APIView):
         
         return Response(results)
     
-    def calculate_live_county_presence(self, votes_query, location):
-        """Calculează prezența pe județe/țări din voturile live"""
+    def get_registered_by_county(self, vote_type, location):
+        """Returnează {județ/țară: înscriși totali, urban și rural} din sumarele rundei"""
+        summaries = get_presence_summaries(vote_type, location)\
+            .values('county', 'total_registered', 'urban_registered', 'rural_registered')
+        return {get_county_name(summary.pop('county')): summary for summary in summaries}
+    
+    def calculate_live_county_presence(self, vote_type, total_votes, location, registered):
+        """Calculează prezența pe județe/țări din contoarele live"""
         county_stats = []
-        total_votes = votes_query.count()
         
         if location == 'romania':
-            # Pentru România - județul din profil sau distribuție pe județe
-            historic_counties = VotingPresence.objects.filter(
-                location_type='romania'
-            ).values_list('county', flat=True).distinct()
-            
-            for county in historic_counties:
-                if county != 'SR':  # Exclude SR din România
-                    county_votes = max(1, total_votes // 42)
-                    
-                    county_stats.append({
-                        'county': county,
-                        'total_voters': county_votes,
-                        'registered_permanent': 400000,
-                        'participation_rate': (county_votes / 400000 * 100),
-                        'urban_voters': county_votes // 2,
-                        'rural_voters': county_votes // 2,
-                        'men_voters': county_votes // 2,
-                        'women_voters': county_votes // 2
-                    })
+            # Pentru România - contoarele pe județe actualizate la fiecare vot,
+            # cheiate după denumire ca în prezența istorică
+            for county, counters in get_county_turnout(vote_type).items():
+                county = get_county_name(county)
+                county_votes = counters['total_votes']
+                county_registered = registered.get(county, {}).get('total_registered', 0)
+                
+                county_stats.append({
+                    'county': county,
+                    'total_voters': county_votes,
+                    'registered_permanent': county_registered,
+                    'participation_rate': (county_votes / county_registered * 100) if county_registered > 0 else 0,
+                    'urban_voters': county_votes // 2,
+                    'rural_voters': county_votes // 2,
+                    'men_voters': county_votes // 2,
+                    'women_voters': county_votes // 2
+                })
         
         else:  # străinătate
-            # Pentru străinătate - țările din datele istorice
-            countries = VotingPresence.objects.filter(
-                location_type='strainatate'
-            ).values_list('county', flat=True).distinct()
+            # Pentru străinătate - țările din sumarele rundei
+            countries = list(registered)
             
             for country in countries:
                 country_votes = max(1, total_votes // len(countries))
@@ -158,22 +177,17 @@ class VotingPresenceView(APIView):
         return sorted(county_stats, key=lambda x: x['total_voters'], reverse=True)
     
     def get_historical_presence(self, location, vote_type, start_date, end_date, page, page_size):
-        """Returnează prezența istorică"""
-        
-        presence_query = VotingPresence.objects.filter(
-            vote_type=vote_type,
-            location_type=location
-        )
+        """Returnează prezența istorică din sumarele materializate pe județe/țări"""
         
-        if start_date and end_date:
-            presence_query = presence_query.filter(
-                vote_datetime__gte=start_date,
-                vote_datetime__lte=end_date
-            )
+        summaries = get_presence_summaries(vote_type, location)
+        totals = get_presence_totals(summaries)
         
-        general_stats = self.calculate_general_stats(presence_query, vote_type, location)
-        urban_rural_data = self.get_urban_rural_comparison(location, vote_type, start_date, end_date)
-        county_data = self.get_county_presence_data(presence_query, page, page_size)
+        general_stats = self.calculate_general_stats(totals, vote_type, location)
+        urban_rural_data = self.format_urban_rural(
+            totals['urban_voters'], totals['urban_registered'],
+            totals['rural_voters'], totals['rural_registered']
+        )
+        county_data = self.get_county_presence_data(summaries, page, page_size)
         
         results = {
             'round_info': {
@@ -195,8 +209,8 @@ class VotingPresenceView(APIView):
         
         return Response(results)
     
-    def calculate_general_stats(self, presence_query, vote_type, location):
-        """Calculează statisticile generale"""
+    def calculate_general_stats(self, totals, vote_type, location):
+        """Calculează statisticile generale din totalurile sumarelor"""
         
         if vote_type == 'prezidentiale' and location == 'romania':
             return {
@@ -230,58 +244,28 @@ class VotingPresenceView(APIView):
             }
         else:
             # Calculează din datele reale
-            aggregated = presence_query.aggregate(
-                total_registered=Sum('registered_permanent'),
-                total_voters=Sum('voters_permanent') + Sum('voters_supplementary') + Sum('voters_mobile'),
-                total_permanent=Sum('voters_permanent'),
-                total_supplementary=Sum('voters_supplementary'),
-                total_mobile=Sum('voters_mobile')
-            )
-            
-            total_voters = aggregated['total_voters'] or 0
-            total_registered = aggregated['total_registered'] or 1
+            total_voters = totals['total_voters']
+            total_registered = totals['total_registered'] or 1
             
             stats = {
                 'registered_permanent': total_registered,
-                'voters_permanent': aggregated['total_permanent'] or 0,
-                'voters_supplementary': aggregated['total_supplementary'] or 0,
+                'voters_permanent': totals['total_permanent'],
+                'voters_supplementary': totals['total_supplementary'],
                 'total_voters': total_voters,
                 'participation_rate': (total_voters / total_registered * 100) if total_registered > 0 else 0
             }
             
             if location == 'strainatate':
-                stats['voters_correspondence'] = aggregated['total_mobile'] or 0
-                stats['sections_count'] = presence_query.count()
+                stats['voters_correspondence'] = totals['total_mobile']
+                stats['sections_count'] = totals['sections_count']
             else:
-                stats['voters_mobile'] = aggregated['total_mobile'] or 0
+                stats['voters_mobile'] = totals['total_mobile']
             
             return stats
     
-    def get_urban_rural_comparison(self, location, vote_type, start_date, end_date):
-        """Calculează comparația urban/rural"""
-        
-        query = VotingPresence.objects.filter(
-            vote_type=vote_type,
-            location_type=location
-        )
-        
-        if start_date and end_date:
-            query = query.filter(vote_datetime__gte=start_date, vote_datetime__lte=end_date)
-        
-        urban_data = query.filter(environment='urban').aggregate(
-            total_voters=Sum('voters_permanent') + Sum('voters_supplementary') + Sum('voters_mobile'),
-            total_registered=Sum('registered_permanent')
-        )
-        
-        rural_data = query.filter(environment='rural').aggregate(
-            total_voters=Sum('voters_permanent') + Sum('voters_supplementary') + Sum('voters_mobile'),
-            total_registered=Sum('registered_permanent')
-        )
-        
-        urban_voters = urban_data['total_voters'] or 0
-        rural_voters = rural_data['total_voters'] or 0
-        urban_registered = urban_data['total_registered'] or 1
-        rural_registered = rural_data['total_registered'] or 1
+    def format_urban_rural(self, urban_voters, urban_registered, rural_voters, rural_registered):
+        """Formatează comparația urban/rural"""
+        total_voters = urban_voters + rural_voters
         
         return {
             'urban': {
@@ -295,54 +279,30 @@ class VotingPresenceView(APIView):
                 'participation_rate': (rural_voters / rural_registered * 100) if rural_registered > 0 else 0
             },
             'comparison': {
-                'urban_percentage': (urban_voters / (urban_voters + rural_voters) * 100) if (urban_voters + rural_voters) > 0 else 0,
-                'rural_percentage': (rural_voters / (urban_voters + rural_voters) * 100) if (urban_voters + rural_voters) > 0 else 0
+                'urban_percentage': (urban_voters / total_voters * 100) if total_voters > 0 else 0,
+                'rural_percentage': (rural_voters / total_voters * 100) if total_voters > 0 else 0
             }
         }
     
-    def get_county_presence_data(self, presence_query, page, page_size):
-        """Obține datele pe județe/țări cu paginare"""
-        
-        # Încearcă să folosească PresenceSummary
-        if presence_query.exists():
-            first_record = presence_query.first()
-            county_summaries = PresenceSummary.objects.filter(
-                vote_type=first_record.vote_type,
-                location_type=first_record.location_type
-            ).order_by('-total_voters')
-        else:
-            county_summaries = PresenceSummary.objects.none()
+    def get_county_presence_data(self, summaries, page, page_size):
+        """Obține pagina curentă de județe/țări din sumare"""
         
-        # Dacă nu există sumare, calculează dinamic
-        if not county_summaries.exists():
-            county_summaries = self.calculate_county_summaries_dynamic(presence_query)
-        
-        # Paginare
-        total_counties = len(county_summaries)
+        total_counties = summaries.count()
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
         
-        if isinstance(county_summaries, list):
-            paginated_counties = county_summaries[start_idx:end_idx]
-        else:
-            paginated_counties = list(county_summaries[start_idx:end_idx])
-        
-        # Formatează datele
         counties_data = []
-        for summary in paginated_counties:
-            if isinstance(summary, dict):
-                counties_data.append(summary)
-            else:
-                counties_data.append({
-                    'county': summary.county,
-                    'total_voters': summary.total_voters,
-                    'registered_permanent': summary.total_registered,
-                    'participation_rate': summary.participation_rate,
-                    'urban_voters': summary.urban_voters,
-                    'rural_voters': summary.rural_voters,
-                    'men_voters': summary.total_men,
-                    'women_voters': summary.total_women
-                })
+        for summary in summaries.order_by('-total_voters')[start_idx:end_idx]:
+            counties_data.append({
+                'county': get_county_name(summary.county),
+                'total_voters': summary.total_voters,
+                'registered_permanent': summary.total_registered,
+                'participation_rate': summary.participation_rate,
+                'urban_voters': summary.urban_voters,
+                'rural_voters': summary.rural_voters,
+                'men_voters': summary.total_men,
+                'women_voters': summary.total_women
+            })
         
         return {
             'counties': counties_data,
@@ -354,48 +314,6 @@ class VotingPresenceView(APIView):
             }
         }
     
-    def calculate_county_summaries_dynamic(self, presence_query):
-        """Calculează sumarele dinamic"""
-        
-        counties = presence_query.values_list('county', flat=True).distinct()
-        summaries = []
-        
-        for county in counties:
-            county_data = presence_query.filter(county=county).aggregate(
-                total_registered=Sum('registered_permanent'),
-                total_voters=Sum('voters_permanent') + Sum('voters_supplementary') + Sum('voters_mobile'),
-                total_men=Sum('men_18_24') + Sum('men_25_34') + Sum('men_35_44') + Sum('men_45_64') + Sum('men_65_plus'),
-                total_women=Sum('women_18_24') + Sum('women_25_34') + Sum('women_35_44') + Sum('women_45_64') + Sum('women_65_plus')
-            )
-            
-            urban_rural = presence_query.filter(county=county).values('environment').annotate(
-                voters=Sum('voters_permanent') + Sum('voters_supplementary') + Sum('voters_mobile')
-            )
-            
-            urban_voters = 0
-            rural_voters = 0
-            for data in urban_rural:
-                if data['environment'] == 'urban':
-                    urban_voters = data['voters'] or 0
-                else:
-                    rural_voters = data['voters'] or 0
-            
-            total_voters = county_data['total_voters'] or 0
-            total_registered = county_data['total_registered'] or 1
-            
-            summaries.append({
-                'county': county,
-                'total_voters': total_voters,
-                'registered_permanent': total_registered,
-                'participation_rate': (total_voters / total_registered * 100) if total_registered > 0 else 0,
-                'urban_voters': urban_voters,
-                'rural_voters': rural_voters,
-                'men_voters': county_data['total_men'] or 0,
-                'women_voters': county_data['total_women'] or 0
-            })
-        
-        return sorted(summaries, key=lambda x: x['total_voters'], reverse=True)
-    
     def get_vote_parameters(self, round_type):
         """Determină parametrii votului"""
         now = timezone.now()
@@ -1,3 +1,54 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from vote.models import VotingSection, LocalCandidate, LocalVote
+from .views import VoteResultsView
+
+User = get_user_model()
+
+
+class LocalResultsTestCase(TestCase):
+    """Teste pentru calculul rezultatelor locale live"""
+
+    def setUp(self):
+        cache.clear()
+        section = VotingSection.objects.create(
+            section_id='1', name='Școala 1', address='Str. A', city='Ploiești', county='PH'
+        )
+        candidates = [
+            LocalCandidate.objects.create(name='Ion', party='P1', position='mayor', county='PH', city='Ploiești'),
+            LocalCandidate.objects.create(name='Ana', party='', position='mayor', county='PH', city='Ploiești'),
+            LocalCandidate.objects.create(name='Dan', party='P3', position='mayor', county='CJ', city='Cluj'),
+        ]
+        for i, candidate in enumerate([0, 0, 1, 2]):
+            user = User.objects.create(email=f'voter{i}@example.com', cnp=f'100000000000{i}')
+            LocalVote.objects.create(user=user, candidate=candidates[candidate], voting_section=section)
+
+    def test_county_tallies_come_from_one_query(self):
+        view = VoteResultsView()
+        with self.assertNumQueries(1):
+            results = view.calculate_local_results_from_votes(LocalVote.objects.all(), 4)
+
+        by_county = {row['county']: row for row in results}
+        self.assertEqual(by_county['PH']['total_votes'], 3)
+        self.assertEqual(
+            [(c['candidate_name'], c['votes'], c['percentage']) for c in by_county['PH']['candidates']],
+            [('Ion', 2, 66.67), ('Ana', 1, 33.33)]
+        )
+        self.assertEqual(by_county['PH']['candidates'][1]['party'], 'Independent')
+        self.assertEqual(by_county['CJ']['total_votes'], 1)
+
+    def test_live_results_are_cached_per_period(self):
+        view = VoteResultsView()
+        start = timezone.now() - timedelta(days=1)
+
+        closed = view.get_live_results('romania', 'locale', start, start + timedelta(hours=1)).data
+        extended = view.get_live_results('romania', 'locale', start, timezone.now() + timedelta(days=1)).data
+
+        self.assertEqual(closed['total_votes'], 0)
+        self.assertEqual(extended['total_votes'], 4)
 
-# Create your tests here.
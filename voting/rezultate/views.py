@@ -1,6 +1,8 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -9,12 +11,16 @@ from vote.models import (
     VoteSettings, PresidentialVote, PresidentialRound2Vote, LocalVote, ParliamentaryVote,
     PresidentialCandidate, PresidentialRound2Candidate, ParliamentaryParty, LocalCandidate
 )
+from vote.services.time_buckets import cumulative_progression, last_minutes
 from django.contrib.auth import get_user_model
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Rezultatele live sunt interogate des de frontend; le recalculăm cel mult o dată la câteva secunde
+LIVE_RESULTS_CACHE_TTL = getattr(settings, 'LIVE_RESULTS_CACHE_TTL', 10)
+
 class VoteResultsView(APIView):
     permission_classes = [AllowAny]
     
@@ -42,6 +48,15 @@ class VoteResultsView(APIView):
     def get_live_results(self, location, vote_type, start_date, end_date):
         """Calculează rezultatele live din voturile reale folosind candidații din vote app"""
         
+        # Rezultatul complet este păstrat în cache per (tur, locație, perioadă)
+        cache_key = (
+            f"rezultate:live:{vote_type}:{location}:"
+            f"{start_date.isoformat() if start_date else ''}:{end_date.isoformat() if end_date else ''}"
+        )
+        results = cache.get(cache_key)
+        if results is not None:
+            return Response(results)
+        
         # Determină modelul de vot pe baza tipului
         if vote_type == 'prezidentiale':
             vote_model = PresidentialVote
@@ -75,6 +90,10 @@ class VoteResultsView(APIView):
         elif vote_type == 'parlamentare':
             votes = votes.select_related('party')
         
+        # Totalul este calculat o singură dată și refolosit de toate sub-calculele
+        total_votes = votes.count()
+        vote_results = self.calculate_real_vote_results(votes, vote_type, total_votes)
+        
         # Calculează rezultatele din voturile reale
         results = {
             'round_info': {
@@ -86,19 +105,21 @@ class VoteResultsView(APIView):
                     'end': end_date.isoformat() if end_date else None
                 }
             },
-            'total_votes': votes.count(),
-            'results': self.calculate_real_vote_results(votes, vote_type),
+            'total_votes': total_votes,
+            'results': vote_results,
             'vote_progression': self.calculate_vote_progression(votes, start_date) if start_date else [],
-            'winner': self.determine_winner_from_votes(votes, vote_type),
+            'winner': self.determine_winner_from_results(vote_results, vote_type),
             'is_final': self.is_voting_finished(start_date, end_date),
             'real_time_data': True
         }
         
+        cache.set(cache_key, results, LIVE_RESULTS_CACHE_TTL)
         return Response(results)
     
-    def calculate_real_vote_results(self, votes, vote_type):
+    def calculate_real_vote_results(self, votes, vote_type, total_votes=None):
         """Calculează rezultatele reale din voturile din baza de date"""
-        total_votes = votes.count()
+        if total_votes is None:
+            total_votes = votes.count()
         
         if total_votes == 0:
             return []
@@ -199,89 +220,71 @@ class VoteResultsView(APIView):
         return results
     
     def calculate_local_results_from_votes(self, votes, total_votes):
-        """Calculează rezultatele locale din voturile reale"""
-        # Grupează pe județe
-        counties = votes.values_list('candidate__county', flat=True).distinct()
+        """Calculează rezultatele locale din voturile reale (un singur query grupat pe județ și candidat)"""
+        candidate_votes = votes.filter(candidate__county__isnull=False).exclude(candidate__county='').values(
+            'candidate__county',
+            'candidate__id',
+            'candidate__name',
+            'candidate__party',
+            'candidate__position'
+        ).annotate(
+            vote_count=Count('id')
+        ).order_by('candidate__county', '-vote_count')
+        
+        # Grupează rândurile pe județe; totalul județului este suma voturilor candidaților săi
+        counties = {}
+        for result in candidate_votes:
+            county = counties.setdefault(result['candidate__county'], {'total_votes': 0, 'rows': []})
+            county['total_votes'] += result['vote_count']
+            county['rows'].append(result)
         
         results = []
-        for county in counties:
-            if county:
-                county_votes = votes.filter(candidate__county=county)
-                county_total = county_votes.count()
-                
-                if county_total > 0:
-                    candidate_votes = county_votes.values(
-                        'candidate__id',
-                        'candidate__name',
-                        'candidate__party',
-                        'candidate__position'
-                    ).annotate(
-                        vote_count=Count('id')
-                    ).order_by('-vote_count')
-                    
-                    candidates = []
-                    for result in candidate_votes:
-                        if result['candidate__name']:
-                            percentage = (result['vote_count'] / county_total * 100)
-                            candidates.append({
-                                'candidate_id': result['candidate__id'],
-                                'candidate_name': result['candidate__name'],
-                                'party': result['candidate__party'] or 'Independent',
-                                'position': result['candidate__position'] or 'primar',
-                                'votes': result['vote_count'],
-                                'percentage': round(percentage, 2)
-                            })
-                    
-                    results.append({
-                        'county': county,
-                        'total_votes': county_total,
-                        'candidates': candidates
+        for county, county_data in counties.items():
+            county_total = county_data['total_votes']
+            candidates = []
+            for result in county_data['rows']:
+                if result['candidate__name']:
+                    percentage = (result['vote_count'] / county_total * 100)
+                    candidates.append({
+                        'candidate_id': result['candidate__id'],
+                        'candidate_name': result['candidate__name'],
+                        'party': result['candidate__party'] or 'Independent',
+                        'position': result['candidate__position'] or 'primar',
+                        'votes': result['vote_count'],
+                        'percentage': round(percentage, 2)
                     })
+            
+            results.append({
+                'county': county,
+                'total_votes': county_total,
+                'candidates': candidates
+            })
         
         return results
     
-    def determine_winner_from_votes(self, votes, vote_type):
-        """Determină câștigătorul din voturile reale"""
-        total_votes = votes.count()
-        
-        if total_votes == 0:
+    def determine_winner_from_results(self, vote_results, vote_type):
+        """Determină câștigătorul din rezultatele deja calculate (ordonate descrescător după voturi)"""
+        if not vote_results:
             return None
         
+        leader = vote_results[0]
         if vote_type in ['prezidentiale', 'prezidentiale_tur2']:
-            winner = votes.values(
-                'candidate__name',
-                'candidate__party'
-            ).annotate(
-                vote_count=Count('id')
-            ).order_by('-vote_count').first()
-            
-            if winner and winner['candidate__name']:
-                percentage = (winner['vote_count'] / total_votes * 100)
-                return {
-                    'type': 'candidate',
-                    'name': winner['candidate__name'],
-                    'party': winner['candidate__party'] or 'Independent',
-                    'votes': winner['vote_count'],
-                    'percentage': round(percentage, 2)
-                }
+            return {
+                'type': 'candidate',
+                'name': leader['candidate_name'],
+                'party': leader['party'],
+                'votes': leader['votes'],
+                'percentage': leader['percentage']
+            }
         
         elif vote_type == 'parlamentare':
-            winner = votes.values(
-                'party__name',
-                'party__abbreviation'
-            ).annotate(
-                vote_count=Count('id')
-            ).order_by('-vote_count').first()
-            
-            if winner and winner['party__name']:
-                percentage = (winner['vote_count'] / total_votes * 100)
-                return {
-                    'type': 'party',
-                    'name': winner['party__name'],
-                    'abbreviation': winner['party__abbreviation'] or '',
-                    'votes': winner['vote_count'],
-                    'percentage': round(percentage, 2)
-                }
+            return {
+                'type': 'party',
+                'name': leader['party_name'],
+                'abbreviation': leader['abbreviation'],
+                'votes': leader['votes'],
+                'percentage': leader['percentage']
+            }
         
         return None
     
@@ -348,6 +351,9 @@ class VoteResultsView(APIView):
                 vote_datetime__lte=end_date
             )
         
+        total_votes = historical_votes.count()
+        vote_results = self.calculate_real_vote_results(historical_votes, vote_type, total_votes)
+        
         # Calculează rezultatele
         results = {
             'round_info': {
@@ -359,10 +365,10 @@ class VoteResultsView(APIView):
                     'end': end_date.isoformat() if end_date else None
                 }
             },
-            'total_votes': historical_votes.count(),
-            'results': self.calculate_real_vote_results(historical_votes, vote_type),
+            'total_votes': total_votes,
+            'results': vote_results,
             'vote_progression': self.calculate_vote_progression(historical_votes, start_date) if start_date else [],
-            'winner': self.determine_winner_from_votes(historical_votes, vote_type),
+            'winner': self.determine_winner_from_results(vote_results, vote_type),
             'is_final': True,
             'real_time_data': False
         }
@@ -586,27 +592,8 @@ class VoteResultsView(APIView):
         if not start_date:
             return []
         
-        end_date = start_date + timedelta(hours=14)
-        intervals = []
-        current_time = start_date
-        
-        while current_time < end_date:
-            interval_end = current_time + timedelta(minutes=30)  # Intervale de 30 minute
-            
-            votes_in_interval = votes.filter(
-                vote_datetime__gte=current_time,
-                vote_datetime__lt=interval_end
-            ).count()
-            
-            intervals.append({
-                'time': current_time.strftime('%H:%M'),
-                'votes': votes_in_interval,
-                'cumulative': sum(interval['votes'] for interval in intervals) + votes_in_interval
-            })
-            
-            current_time = interval_end
-        
-        return intervals
+        # Intervale de 30 minute pe o zi de 14 ore, dintr-un singur query grupat
+        return cumulative_progression(votes, start_date, timedelta(hours=14), timedelta(minutes=30))
     
     def get_vote_progression(self, query, start_date):
         """Obține progresiunea voturilor din VoteResult"""
@@ -692,21 +679,11 @@ class LiveResultsView(APIView):
             vote_datetime__gte=active_vote.start_datetime
         )
         
-        # Calculează rata de actualizare a rezultatelor
-        result_updates = []
-        for i in range(30):
-            minute_start = last_30_min + timedelta(minutes=i)
-            minute_end = minute_start + timedelta(minutes=1)
-            
-            votes_this_minute = recent_votes.filter(
-                vote_datetime__gte=minute_start,
-                vote_datetime__lt=minute_end
-            ).count()
-            
-            result_updates.append({
-                'minute': minute_start.strftime('%H:%M'),
-                'new_votes': votes_this_minute
-            })
+        # Calculează rata de actualizare a rezultatelor (un singur query grupat pe minut)
+        result_updates = [
+            {'minute': minute_start.strftime('%H:%M'), 'new_votes': votes_this_minute}
+            for minute_start, votes_this_minute in last_minutes(vote_model.objects.all(), now)
+        ]
         
         # Calculează timpul rămas până la închiderea votării
         time_remaining = (active_vote.end_datetime - now).total_seconds()
@@ -0,0 +1,157 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Evenimentele cu risc ridicat nu sunt niciodată puse în coadă sau pierdute
+WRITE_THROUGH_RISK_LEVELS = ('high', 'critical')
+
+# Tipurile recitite imediat din tabelă sunt scrise direct: detecția (ex. 5
+# autentificări eșuate în 15 minute) trebuie să numere evenimentul curent, iar
+# dashboard-ul verifică login_success recent ca să nu-l dubleze
+WRITE_THROUGH_EVENT_TYPES = ('login_failed', 'login_success')
+
+
+class SecurityEventSink:
+    """
+    Scrie evenimentele de securitate în fundal, în loturi (bulk_create),
+    pentru ca auditul să nu adauge INSERT-uri pe calea critică a request-urilor.
+
+    - coada este limitată; când este plină evenimentele cu risc scăzut/mediu
+      sunt respinse și numărate (politica drop-newest)
+    - evenimentele cu risc ridicat/critic și cele folosite la detecție
+      (WRITE_THROUGH_EVENT_TYPES) sunt scrise imediat
+    - în modul sincron (SECURITY_EVENTS_ASYNC = False, ex. în setările de
+      test) fiecare eveniment este salvat direct
+    """
+
+    def __init__(self, max_queue_size=10000, batch_size=200, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    @property
+    def synchronous(self):
+        return not getattr(settings, 'SECURITY_EVENTS_ASYNC', True)
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self._stats[key] += value
+            return self._stats[key]
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='security-event-sink', daemon=True
+                )
+                self._worker.start()
+
+    def emit(self, event):
+        """Primește o instanță SecurityEvent nesalvată"""
+        if (self.synchronous or event.risk_level in WRITE_THROUGH_RISK_LEVELS
+                or event.event_type in WRITE_THROUGH_EVENT_TYPES):
+            self._write([event])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(event)
+            self._count('queued')
+        except queue.Full:
+            dropped = self._count('dropped')
+            # Nu inundăm logurile: raportăm prima pierdere și apoi din 100 în 100
+            if dropped == 1 or dropped % 100 == 0:
+                logger.warning(
+                    f"Coada evenimentelor de securitate este plină, "
+                    f"{dropped} evenimente pierdute până acum"
+                )
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from .models import SecurityEvent
+
+        try:
+            SecurityEvent.objects.bulk_create(batch)
+            self._count('written', len(batch))
+            self._count('batches')
+        except Exception as e:
+            # Un eveniment invalid nu trebuie să blocheze tot lotul
+            logger.error(f"Eroare la scrierea lotului de evenimente de securitate ({len(batch)}): {e}")
+            for event in batch:
+                try:
+                    event.save(force_insert=True)
+                    self._count('written')
+                except Exception as event_error:
+                    self._count('failed')
+                    logger.error(f"Eroare la crearea evenimentului de securitate: {event_error}")
+
+    def _collect_batch(self):
+        """Așteaptă primul eveniment, apoi adună altele până la batch_size sau flush_interval"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            with self._flush_lock:
+                close_old_connections()
+                self._write(batch)
+
+    def flush(self):
+        """Scrie imediat tot ce se află în coadă (la oprire sau din teste)"""
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._write(batch)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        stats['synchronous'] = self.synchronous
+        return stats
+
+
+security_event_sink = SecurityEventSink(
+    max_queue_size=getattr(settings, 'SECURITY_EVENT_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'SECURITY_EVENT_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'SECURITY_EVENT_FLUSH_INTERVAL', 1.0),
+)
+
+# Evenimentele rămase în coadă sunt scrise la oprirea procesului
+atexit.register(security_event_sink.flush)
@@ -1,8 +1,7 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth import get_user_model
-from .utils import create_security_event, get_client_info
-from .models import UserSession
-from django.utils import timezone
+from .utils import create_security_event
+from .session_activity import session_activity_tracker
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,28 +35,9 @@ class SecurityMiddleware(MiddlewareMixin):
                     break
         
         # Actualizează ultima activitate pentru sesiuni autentificate
+        # (sesiunea este citită din cache, iar scrierile sunt grupate)
         if request.user.is_authenticated and hasattr(request, 'session'):
-            try:
-                user_session = UserSession.objects.get(
-                    session_key=request.session.session_key,
-                    user=request.user,
-                    is_active=True
-                )
-                user_session.last_activity = timezone.now()
-                user_session.save(update_fields=['last_activity'])
-            except UserSession.DoesNotExist:
-                # Creează sesiunea dacă nu există
-                client_info = get_client_info(request)
-                UserSession.objects.create(
-                    session_key=request.session.session_key,
-                    user=request.user,
-                    ip_address=client_info.get('ip_address', ''),
-                    user_agent=client_info.get('user_agent', ''),
-                    device_info=client_info.get('device_info', {}),
-                    location_info=client_info.get('location_info', {}),
-                    is_current=True,
-                    expires_at=request.session.get_expiry_date(),
-                )
+            session_activity_tracker.touch(request)
             if request.user.is_authenticated and hasattr(request.user, 'email') and request.user.email:
                 important_pages = [
                     '/menu/',
@@ -0,0 +1,122 @@
+import atexit
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import UserSession
+
+logger = logging.getLogger(__name__)
+
+
+class SessionActivityTracker:
+    """
+    Urmărește ultima activitate a sesiunilor fără citiri/scrieri la fiecare request.
+
+    Sesiunea activă (pk + ultima activitate salvată) este ținută în cache;
+    last_activity este marcat pentru scriere doar când valoarea salvată este mai
+    veche decât `granularity`, iar scrierile sunt grupate într-un singur
+    bulk_update, executat cel mult o dată la `granularity` secunde.
+    """
+
+    CACHE_PREFIX = 'security:session_activity:'
+
+    def __init__(self, granularity=60, cache_timeout=300):
+        self.granularity = timedelta(seconds=granularity)
+        self.cache_timeout = cache_timeout
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = timezone.now()
+
+    def _cache_key(self, session_key):
+        return f"{self.CACHE_PREFIX}{session_key}"
+
+    def _load_session(self, request, session_key):
+        """Încarcă sesiunea activă din baza de date sau o creează dacă lipsește"""
+        # Import local: utils importă acest modul (evităm importul circular)
+        from .utils import get_client_info
+
+        user_session = UserSession.objects.filter(
+            session_key=session_key,
+            user=request.user,
+            is_active=True
+        ).values('pk', 'last_activity').first()
+
+        if user_session is None:
+            client_info = get_client_info(request)
+            created = UserSession.objects.create(
+                session_key=session_key,
+                user=request.user,
+                ip_address=client_info.get('ip_address', ''),
+                user_agent=client_info.get('user_agent', ''),
+                device_info=client_info.get('device_info', {}),
+                location_info=client_info.get('location_info', {}),
+                is_current=True,
+                expires_at=request.session.get_expiry_date(),
+            )
+            user_session = {'pk': created.pk, 'last_activity': created.last_activity}
+
+        return {
+            'pk': user_session['pk'],
+            'user_id': request.user.pk,
+            'last_activity': user_session['last_activity'],
+        }
+
+    def touch(self, request):
+        """Înregistrează activitatea sesiunii curente (apelat din middleware)"""
+        session_key = request.session.session_key
+        if not session_key:
+            return
+
+        now = timezone.now()
+        cache_key = self._cache_key(session_key)
+        entry = cache.get(cache_key)
+        if entry is None or entry['user_id'] != request.user.pk:
+            entry = self._load_session(request, session_key)
+            cache.set(cache_key, entry, self.cache_timeout)
+
+        if now - entry['last_activity'] >= self.granularity:
+            with self._lock:
+                self._pending[entry['pk']] = now
+            entry['last_activity'] = now
+            cache.set(cache_key, entry, self.cache_timeout)
+
+        if now - self._last_flush >= self.granularity:
+            self.flush()
+
+    def forget(self, session_key):
+        """Scoate sesiunea din cache (la deconectare sau terminare forțată)"""
+        if session_key:
+            cache.delete(self._cache_key(session_key))
+
+    def flush(self):
+        """Scrie într-un singur UPDATE toate activitățile acumulate"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = timezone.now()
+
+        if not pending:
+            return 0
+
+        try:
+            UserSession.objects.bulk_update(
+                [UserSession(pk=pk, last_activity=last_activity) for pk, last_activity in pending.items()],
+                ['last_activity'],
+            )
+        except Exception as e:
+            logger.error(f"Eroare la actualizarea activității sesiunilor ({len(pending)}): {e}")
+            return 0
+
+        return len(pending)
+
+
+session_activity_tracker = SessionActivityTracker(
+    granularity=getattr(settings, 'SESSION_ACTIVITY_GRANULARITY', 60),
+    cache_timeout=getattr(settings, 'SESSION_ACTIVITY_CACHE_TIMEOUT', 300),
+)
+
+atexit.register(session_activity_tracker.flush)
@@ -6,6 +6,7 @@ from django.contrib.sessions.models import Session
 from django.utils import timezone
 from .models import SecurityEvent, UserSession, SecurityAlert
 from .utils import get_client_info, create_security_event
+from .session_activity import session_activity_tracker
 import logging
 from django.contrib.auth.signals import user_logged_out
 
@@ -70,6 +71,7 @@ def log_logout(sender, request, user, **kwargs):
                 user_session.ended_at = timezone.now()
                 user_session.end_reason = 'logout'
                 user_session.save()
+                session_activity_tracker.forget(session_key)
                 logger.info(f"Sesiune încheiată pentru {user.email}")
             except UserSession.DoesNotExist:
                 logger.warning(f"Sesiune nu a fost găsită pentru deconectare: {user.email}")
@@ -149,6 +151,7 @@ def log_session_deletion(sender, instance, **kwargs):
             user_session.ended_at = timezone.now()
             user_session.end_reason = 'session_expired'
             user_session.save()
+            session_activity_tracker.forget(instance.session_key)
             
             create_security_event(
                 user=user_session.user,
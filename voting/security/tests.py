@@ -1,3 +1,113 @@
-from django.test import TestCase
+from datetime import timedelta
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.auth.signals import user_login_failed
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from .event_sink import SecurityEventSink
+from .models import SecurityAlert, SecurityEvent, UserSession
+from .session_activity import SessionActivityTracker
+from .utils import create_security_event
+
+User = get_user_model()
+
+
+class SecurityEventSinkTestCase(TestCase):
+    """Teste pentru scrierea în loturi a evenimentelor de securitate"""
+
+    def make_event(self, risk_level='low'):
+        return SecurityEvent(event_type='page_visit', description='Acces', risk_level=risk_level)
+
+    @override_settings(SECURITY_EVENTS_ASYNC=False)
+    def test_synchronous_mode_writes_immediately(self):
+        create_security_event(event_type='page_visit', description='Acces la pagina: vot')
+        self.assertEqual(SecurityEvent.objects.count(), 1)
+
+    @override_settings(SECURITY_EVENTS_ASYNC=True)
+    def test_queued_events_are_written_in_one_batch(self):
+        sink = SecurityEventSink(max_queue_size=10, batch_size=50)
+        sink._ensure_worker = lambda: None  # golim coada manual, fără firul de fundal
+
+        for _ in range(5):
+            sink.emit(self.make_event())
+        self.assertEqual(SecurityEvent.objects.count(), 0)
+
+        sink.flush()
+        self.assertEqual(SecurityEvent.objects.count(), 5)
+        stats = sink.get_stats()
+        self.assertEqual((stats['written'], stats['batches'], stats['pending']), (5, 1, 0))
+
+    @override_settings(SECURITY_EVENTS_ASYNC=True)
+    def test_overflow_drops_low_risk_but_keeps_critical_events(self):
+        sink = SecurityEventSink(max_queue_size=2)
+        sink._ensure_worker = lambda: None
+
+        for _ in range(4):
+            sink.emit(self.make_event())
+        sink.emit(self.make_event(risk_level='critical'))
+
+        stats = sink.get_stats()
+        self.assertEqual((stats['queued'], stats['dropped'], stats['pending']), (2, 2, 2))
+        self.assertEqual(SecurityEvent.objects.filter(risk_level='critical').count(), 1)
+
+    @override_settings(SECURITY_EVENTS_ASYNC=True)
+    def test_detection_events_bypass_a_full_queue(self):
+        sink = SecurityEventSink(max_queue_size=1)
+        sink._ensure_worker = lambda: None
+
+        sink.emit(self.make_event())
+        sink.emit(SecurityEvent(event_type='login_failed', description='Eșec', risk_level='medium'))
+        sink.emit(SecurityEvent(event_type='login_success', description='Autentificare', risk_level='low'))
+
+        self.assertEqual(SecurityEvent.objects.filter(event_type='login_failed').count(), 1)
+        self.assertEqual(SecurityEvent.objects.filter(event_type='login_success').count(), 1)
+        self.assertEqual(sink.get_stats()['dropped'], 0)
+
+    @override_settings(SECURITY_EVENTS_ASYNC=True)
+    def test_fifth_failed_login_raises_alert_in_async_mode(self):
+        User.objects.create(email='victima@example.com', cnp='1000000000002')
+        request = RequestFactory().post('/login/')
+
+        for _ in range(5):
+            user_login_failed.send(sender=User, credentials={'email': 'victima@example.com'}, request=request)
+
+        self.assertEqual(SecurityEvent.objects.filter(event_type='login_failed').count(), 5)
+        self.assertTrue(SecurityAlert.objects.filter(alert_type='multiple_failed_logins').exists())
+
+
+class SessionActivityTrackerTestCase(TestCase):
+    """Teste pentru actualizarea grupată a ultimei activități"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@example.com', cnp='1000000000001')
+        self.stale = timezone.now() - timedelta(minutes=5)
+        self.user_session = UserSession.objects.create(
+            user=self.user, session_key='abc', ip_address='127.0.0.1', user_agent='test',
+            last_activity=self.stale, expires_at=timezone.now() + timedelta(days=1),
+        )
+        self.request = SimpleNamespace(user=self.user, session=SimpleNamespace(session_key='abc'))
+
+    def test_steady_state_requests_do_not_hit_the_database(self):
+        tracker = SessionActivityTracker(granularity=60)
+        tracker.touch(self.request)  # prima cerere: citire + marcare pentru scriere
+
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                tracker.touch(self.request)
+
+        self.assertEqual(tracker.flush(), 1)
+        self.user_session.refresh_from_db()
+        self.assertGreater(self.user_session.last_activity, self.stale)
+
+    def test_missing_session_is_created(self):
+        self.request.session.session_key = 'nou'
+        self.request.session.get_expiry_date = lambda: timezone.now() + timedelta(days=1)
+        self.request.META = {'REMOTE_ADDR': '127.0.0.1', 'HTTP_USER_AGENT': ''}
+
+        SessionActivityTracker().touch(self.request)
+
+        self.assertTrue(UserSession.objects.filter(session_key='nou', is_active=True).exists())
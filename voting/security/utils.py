@@ -2,11 +2,29 @@ from django.utils import timezone
 from .models import SecurityEvent, SecurityAlert, CaptchaAttempt
 import logging
 import user_agents
+from functools import lru_cache
 from django.contrib.sessions.models import Session
 from .models import UserSession
+from .event_sink import security_event_sink
+from .session_activity import session_activity_tracker
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1024)
+def _parse_device_info(user_agent_string):
+    """Parsarea user-agent-ului este costisitoare; browserele se repetă, deci o memorăm"""
+    user_agent = user_agents.parse(user_agent_string)
+    return (
+        ('browser', f"{user_agent.browser.family} {user_agent.browser.version_string}"),
+        ('os', f"{user_agent.os.family} {user_agent.os.version_string}"),
+        ('device', user_agent.device.family),
+        ('is_mobile', user_agent.is_mobile),
+        ('is_tablet', user_agent.is_tablet),
+        ('is_pc', user_agent.is_pc),
+        ('is_bot', user_agent.is_bot),
+        ('type', 'mobile' if user_agent.is_mobile else 'tablet' if user_agent.is_tablet else 'desktop'),
+    )
+
 def get_client_info(request):
     """Extrage informații despre client din request"""
     if not request:
@@ -21,19 +39,9 @@ def get_client_info(request):
     
     # User Agent
     user_agent_string = request.META.get('HTTP_USER_AGENT', '')
-    user_agent = user_agents.parse(user_agent_string)
     
-    # Informații despre dispozitiv
-    device_info = {
-        'browser': f"{user_agent.browser.family} {user_agent.browser.version_string}",
-        'os': f"{user_agent.os.family} {user_agent.os.version_string}",
-        'device': user_agent.device.family,
-        'is_mobile': user_agent.is_mobile,
-        'is_tablet': user_agent.is_tablet,
-        'is_pc': user_agent.is_pc,
-        'is_bot': user_agent.is_bot,
-        'type': 'mobile' if user_agent.is_mobile else 'tablet' if user_agent.is_tablet else 'desktop'
-    }
+    # Informații despre dispozitiv (dicționar nou la fiecare apel, rezultatul parsării e memorat)
+    device_info = dict(_parse_device_info(user_agent_string))
     
     # informații despre locație (placeholder, poate fi extins cu o API de geolocalizare)
     location_info = {
@@ -51,11 +59,14 @@ def get_client_info(request):
 
 def create_security_event(user=None, event_type='', description='', request=None, 
                          additional_data=None, risk_level='low'):
-    """Creează un eveniment de securitate"""
+    """
+    Creează un eveniment de securitate. Scrierea în baza de date este făcută
+    în loturi de security_event_sink (imediat pentru riscul ridicat/critic).
+    """
     try:
         client_info = get_client_info(request) if request else {}
         
-        SecurityEvent.objects.create(
+        event = SecurityEvent(
             user=user,
             event_type=event_type,
             risk_level=risk_level,
@@ -67,6 +78,7 @@ def create_security_event(user=None, event_type='', description='', request=None
             additional_data=additional_data or {},
             session_key=request.session.session_key if request and hasattr(request, 'session') else None,
         )
+        security_event_sink.emit(event)
         logger.info(f"Eveniment de securitate creat: {event_type} pentru {user}")
     except Exception as e:
         logger.error(f"Eroare la crearea evenimentului de securitate: {e}")
@@ -179,6 +191,7 @@ def terminate_all_user_sessions(user, except_current=None):
         session.ended_at = timezone.now()
         session.end_reason = 'force_logout'
         session.save()
+        session_activity_tracker.forget(session.session_key)
         terminated_count += 1
         
         # Șterge sesiunea din Django
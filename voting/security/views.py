@@ -8,6 +8,7 @@ from django.db.models import Q, Count, Sum
 from .models import SecurityEvent, UserSession, SecurityAlert, DeviceFingerprint, CaptchaAttempt
 from .utils import terminate_all_user_sessions, create_security_event, log_captcha_attempt
 from .fingerprinting import process_device_fingerprint, get_trusted_devices, mark_device_as_trusted
+from .session_activity import session_activity_tracker
 from django.contrib.sessions.models import Session
 import logging
 
@@ -335,6 +336,7 @@ class TerminateSessionView(APIView):
             user_session.ended_at = timezone.now()
             user_session.end_reason = 'user_terminated'
             user_session.save()
+            session_activity_tracker.forget(session_key)
             
             # Șterge sesiunea din Django
             try:
@@ -1,3 +1,52 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from vote.models import VoteSettings, PresidentialCandidate, PresidentialVote
+from .views import VoteStatisticsView
+
+User = get_user_model()
+
+
+class LiveStatisticsTestCase(TestCase):
+    """Teste pentru distribuțiile demografice ale statisticilor live"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        candidate = PresidentialCandidate.objects.create(name='Ion', party='P1')
+        man = User.objects.create(email='m@example.com', cnp='1800101290011', address='Municipiul Ploiești')
+        woman = User.objects.create(email='f@example.com', cnp='6030101290012', address='Comuna Bărcănești')
+        PresidentialVote.objects.create(user=man, candidate=candidate)
+        old_vote = PresidentialVote.objects.create(user=woman, candidate=candidate)
+        PresidentialVote.objects.filter(pk=old_vote.pk).update(vote_datetime=self.now - timedelta(hours=5))
+
+    def get_statistics(self, start_date, end_date):
+        return VoteStatisticsView().get_live_statistics('romania', 'prezidentiale', start_date, end_date).data
+
+    def counts(self, distribution, key):
+        return {item[key]: item['count'] for item in distribution if item['count']}
+
+    def test_window_with_every_vote_reads_the_counters(self):
+        start, end = self.now - timedelta(hours=6), self.now + timedelta(hours=1)
+
+        with mock.patch('statistici.views.count_demographics') as count_demographics:
+            data = self.get_statistics(start, end)
+
+        count_demographics.assert_not_called()
+        self.assertEqual(data['total_votes'], 2)
+        self.assertEqual(self.counts(data['gender_distribution'], 'gender'), {'M': 1, 'F': 1})
+
+    def test_votes_of_an_earlier_round_are_left_out(self):
+        # Votul de acum 5 ore aparține unui tur anterior de același tip
+        start = self.now - timedelta(hours=1)
+        end = self.now + timedelta(minutes=1)
+        VoteSettings.objects.create(vote_type='prezidentiale', is_active=True, start_datetime=start, end_datetime=end)
+
+        data = self.get_statistics(start, end)
 
-# Create your tests here.
+        self.assertEqual(data['total_votes'], 1)
+        self.assertEqual(self.counts(data['gender_distribution'], 'gender'), {'M': 1})
+        self.assertEqual(self.counts(data['environment_distribution'], 'environment'), {'urban': 1})
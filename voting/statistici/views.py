@@ -6,6 +6,8 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import VoteStatistics
 from vote.models import VoteSettings, PresidentialVote, PresidentialRound2Vote, LocalVote, ParliamentaryVote
+from vote.services.time_buckets import cumulative_progression, last_minutes
+from vote.services.demographics import AGE_GROUPS, GENDERS, ENVIRONMENTS, count_demographics, get_demographic_counts
 from django.contrib.auth import get_user_model
 import logging
 import re
@@ -66,8 +68,13 @@ class VoteStatisticsView(APIView):
         # Pentru demonstrație, nu filtrăm pe locație pentru că nu avem acest câmp în voturile reale
         # În practică, ai putea adăuga logica de filtrare pe județ/oraș
         
-        # Obține toate voturile
-        votes = base_query.select_related('user')
+        # Distribuțiile demografice sunt calculate la vot și citite din contoare.
+        # Contoarele numără toate voturile tipului (inclusiv tururile anterioare),
+        # deci sunt folosite doar când fereastra le include pe toate
+        if self.window_includes_all_votes(vote_model, start_date, end_date):
+            demographics = get_demographic_counts(vote_type)
+        else:
+            demographics = count_demographics(base_query)
         
         # Calculează statisticile
         statistics = {
@@ -80,16 +87,25 @@ class VoteStatisticsView(APIView):
                     'end': end_date.isoformat() if end_date else None
                 }
             },
-            'total_votes': votes.count(),
-            'age_distribution': self.calculate_age_distribution_from_votes(votes),
-            'gender_distribution': self.calculate_gender_distribution_from_votes(votes),
-            'environment_distribution': self.calculate_environment_distribution_from_votes(votes),
-            'hourly_turnout': self.calculate_hourly_turnout_from_votes(votes, start_date) if start_date else [],
+            'total_votes': base_query.count(),
+            'age_distribution': self.age_distribution_from_counts(demographics['age_group']),
+            'gender_distribution': self.gender_distribution_from_counts(demographics['gender']),
+            'environment_distribution': self.environment_distribution_from_counts(demographics['environment']),
+            'hourly_turnout': self.calculate_hourly_turnout_from_votes(base_query, start_date) if start_date else [],
             'real_time_data': True
         }
         
         return Response(statistics)
     
+    def window_includes_all_votes(self, vote_model, start_date, end_date):
+        """Verifică dacă niciun vot al tipului nu este în afara ferestrei cerute"""
+        if not (start_date and end_date):
+            return True
+        
+        return not vote_model.objects.filter(
+            Q(vote_datetime__lt=start_date) | Q(vote_datetime__gt=end_date)
+        ).exists()
+    
     def get_historical_statistics(self, location, vote_type, start_date, end_date, round_type):
         """Returnează statisticile istorice din tabela VoteStatistics"""
         
@@ -126,23 +142,13 @@ class VoteStatisticsView(APIView):
         
         return Response(statistics)
     
-    def calculate_age_distribution_from_votes(self, votes):
-        """Calculează distribuția pe vârstă din voturile reale"""
-        age_groups = {'18-24': 0, '25-34': 0, '35-44': 0, '45-64': 0, '65+': 0}
-        total_votes = 0
-        
-        for vote in votes:
-            if vote.user and vote.user.cnp:
-                age = self.calculate_age_from_cnp(vote.user.cnp)
-                if age:
-                    age_group = self.get_age_group(age)
-                    if age_group in age_groups:
-                        age_groups[age_group] += 1
-                        total_votes += 1
-        
-        # Convertește în format pentru răspuns
+    def age_distribution_from_counts(self, age_counts):
+        """Distribuția pe vârstă din contoarele demografice ale turului"""
+        total_votes = sum(age_counts.values())
+        
         result = []
-        for age_group, count in age_groups.items():
+        for age_group in AGE_GROUPS:
+            count = age_counts.get(age_group, 0)
             percentage = (count / total_votes * 100) if total_votes > 0 else 0
             result.append({
                 'age_group': age_group,
@@ -152,21 +158,13 @@ class VoteStatisticsView(APIView):
         
         return result
     
-    def calculate_gender_distribution_from_votes(self, votes):
-        """Calculează distribuția pe gen din voturile reale"""
-        gender_counts = {'M': 0, 'F': 0}
-        total_votes = 0
-        
-        for vote in votes:
-            if vote.user and vote.user.cnp:
-                gender = self.get_gender_from_cnp(vote.user.cnp)
-                if gender in gender_counts:
-                    gender_counts[gender] += 1
-                    total_votes += 1
-        
-        # Convertește în format pentru răspuns
+    def gender_distribution_from_counts(self, gender_counts):
+        """Distribuția pe gen din contoarele demografice ale turului"""
+        total_votes = sum(gender_counts.values())
+        
         result = []
-        for gender, count in gender_counts.items():
+        for gender in GENDERS:
+            count = gender_counts.get(gender, 0)
             percentage = (count / total_votes * 100) if total_votes > 0 else 0
             gender_name = 'Bărbați' if gender == 'M' else 'Femei'
             result.append({
@@ -178,21 +176,13 @@ class VoteStatisticsView(APIView):
         
         return result
     
-    def calculate_environment_distribution_from_votes(self, votes):
-        """Calculează distribuția pe mediu din voturile reale"""
-        env_counts = {'urban': 0, 'rural': 0}
-        total_votes = 0
-        
-        for vote in votes:
-            if vote.user and vote.user.address:
-                environment = self.determine_environment_from_address(vote.user.address)
-                if environment in env_counts:
-                    env_counts[environment] += 1
-                    total_votes += 1
-        
-        # Convertește în format pentru răspuns
+    def environment_distribution_from_counts(self, env_counts):
+        """Distribuția pe mediu din contoarele demografice ale turului"""
+        total_votes = sum(env_counts.values())
+        
         result = []
-        for env, count in env_counts.items():
+        for env in ENVIRONMENTS:
+            count = env_counts.get(env, 0)
             percentage = (count / total_votes * 100) if total_votes > 0 else 0
             env_name = 'Urban' if env == 'urban' else 'Rural'
             result.append({
@@ -209,135 +199,8 @@ class VoteStatisticsView(APIView):
         if not start_date:
             return []
         
-        # Calculează end_date dacă nu este furnizat
-        end_date = start_date + timedelta(hours=14)  # Presupunem o zi de vot de 14 ore
-        
-        # Generează intervalele de 10 minute
-        intervals = []
-        current_time = start_date
-        
-        while current_time < end_date:
-            interval_end = current_time + timedelta(minutes=10)
-            
-            # Calculează numărul de voturi în acest interval
-            votes_in_interval = votes.filter(
-                vote_datetime__gte=current_time,
-                vote_datetime__lt=interval_end
-            ).count()
-            
-            intervals.append({
-                'time': current_time.strftime('%H:%M'),
-                'votes': votes_in_interval,
-                'cumulative': sum(interval['votes'] for interval in intervals) + votes_in_interval
-            })
-            
-            current_time = interval_end
-        
-        return intervals
-    
-    def calculate_age_from_cnp(self, cnp):
-        """Calculează vârsta din CNP"""
-        if not cnp or len(cnp) != 13:
-            return None
-            
-        try:
-            # Prima cifră determină secolul și genul
-            first_digit = int(cnp[0])
-            
-            # Determinarea secolului conform algoritmului CNP românesc
-            if first_digit in [1, 2]:
-                century = 1900  # Născuți între 1900-1999
-            elif first_digit in [3, 4]:
-                century = 1800  # Născuți între 1800-1899  
-            elif first_digit in [5, 6]:
-                century = 2000  # Născuți între 2000-2099
-            elif first_digit in [7, 8]:
-                century = 1900  # Străini rezidenți născuți între 1900-1999
-            elif first_digit == 9:
-                century = 2000  # Străini născuți între 2000-2099
-            else:
-                return None  # Cazuri speciale
-            
-            # Extragerea datei de naștere
-            year = century + int(cnp[1:3])
-            month = int(cnp[3:5])
-            day = int(cnp[5:7])
-            
-            # Verificarea validității datei
-            if month < 1 or month > 12 or day < 1 or day > 31:
-                return None
-                
-            birth_date = date(year, month, day)
-            
-            # Calcularea vârstei
-            today = date.today()
-            age = today.year - birth_date.year
-            
-            # Ajustează vârsta dacă ziua de naștere nu a trecut încă în anul curent
-            if (today.month, today.day) < (birth_date.month, birth_date.day):
-                age -= 1
-            
-            return age
-            
-        except (ValueError, TypeError):
-            return None
-    
-    def get_gender_from_cnp(self, cnp):
-        """Extrage genul din CNP"""
-        if not cnp or len(cnp) != 13:
-            return None
-            
-        try:
-            first_digit = int(cnp[0])
-            # Pentru români: 1,3,5 = bărbați, 2,4,6 = femei
-            if first_digit % 2 == 1:
-                return 'M'
-            else:
-                return 'F'
-        except (ValueError, TypeError):
-            return None
-    
-    def get_age_group(self, age):
-        """Determină grupa de vârstă"""
-        if age is None:
-            return None
-        elif 18 <= age <= 24:
-            return '18-24'
-        elif 25 <= age <= 34:
-            return '25-34'
-        elif 35 <= age <= 44:
-            return '35-44'
-        elif 45 <= age <= 64:
-            return '45-64'
-        elif age >= 65:
-            return '65+'
-        else:
-            return None
-    
-    def determine_environment_from_address(self, address):
-        """Determină mediul (urban/rural) din adresă"""
-        if not address:
-            return None
-            
-        address_lower = address.lower()
-        
-        # Cuvinte cheie pentru urban
-        urban_keywords = ['municipiu', 'oraș', 'oras', 'municipiul', 'orasul', 'sector', 'sectorul']
-        # Cuvinte cheie pentru rural
-        rural_keywords = ['comună', 'comuna', 'sat', 'satul', 'cătun', 'catun', 'cătunul', 'catunul']
-        
-        # Verifică cuvintele cheie urbane
-        for keyword in urban_keywords:
-            if keyword in address_lower:
-                return 'urban'
-        
-        # Verifică cuvintele cheie rurale
-        for keyword in rural_keywords:
-            if keyword in address_lower:
-                return 'rural'
-        
-        # Default: considerăm urban dacă nu găsim indicatori clari
-        return 'urban'
+        # Intervale de 10 minute pe o zi de vot de 14 ore, dintr-un singur query grupat
+        return cumulative_progression(votes, start_date, timedelta(hours=14), timedelta(minutes=10))
     
     def get_vote_parameters(self, round_type):
         """Determină parametrii votului pe baza tipului de rundă"""
@@ -439,31 +302,8 @@ class VoteStatisticsView(APIView):
         if not start_date:
             return []
         
-        # Calculează end_date dacă nu este furnizat
-        end_date = start_date + timedelta(hours=14)  # Presupunem o zi de vot de 14 ore
-        
-        # Generează intervalele de 10 minute
-        intervals = []
-        current_time = start_date
-        
-        while current_time < end_date:
-            interval_end = current_time + timedelta(minutes=10)
-            
-            # Calculează numărul de voturi în acest interval
-            votes_in_interval = query.filter(
-                vote_datetime__gte=current_time,
-                vote_datetime__lt=interval_end
-            ).count()
-            
-            intervals.append({
-                'time': current_time.strftime('%H:%M'),
-                'votes': votes_in_interval,
-                'cumulative': sum(interval['votes'] for interval in intervals) + votes_in_interval
-            })
-            
-            current_time = interval_end
-        
-        return intervals
+        # Intervale de 10 minute pe o zi de vot de 14 ore, dintr-un singur query grupat
+        return cumulative_progression(query, start_date, timedelta(hours=14), timedelta(minutes=10))
 
 class LiveStatisticsView(APIView):
     permission_classes = [AllowAny]
@@ -509,21 +349,11 @@ class LiveStatisticsView(APIView):
             vote_datetime__gte=active_vote.start_datetime
         )
         
-        # Calculează rata de vot per minut
-        vote_rate_data = []
-        for i in range(30):
-            minute_start = last_30_min + timedelta(minutes=i)
-            minute_end = minute_start + timedelta(minutes=1)
-            
-            votes_this_minute = recent_votes.filter(
-                vote_datetime__gte=minute_start,
-                vote_datetime__lt=minute_end
-            ).count()
-            
-            vote_rate_data.append({
-                'minute': minute_start.strftime('%H:%M'),
-                'votes': votes_this_minute
-            })
+        # Calculează rata de vot per minut (un singur query grupat pe minut)
+        vote_rate_data = [
+            {'minute': minute_start.strftime('%H:%M'), 'votes': votes_this_minute}
+            for minute_start, votes_this_minute in last_minutes(vote_model.objects.all(), now)
+        ]
         
         return Response({
             'active_vote_type': active_vote.vote_type,
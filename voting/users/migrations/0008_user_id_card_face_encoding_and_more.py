@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_remove_user_face_image_user_id_card_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='id_card_face_encoding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='id_card_face_encoding_source',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+    ]
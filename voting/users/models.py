@@ -69,6 +69,11 @@ class User(AbstractBaseUser, PermissionsMixin):
         _('ID Card Image'), upload_to='id_cards/', blank=True, null=True
     )
 
+    # Encoding-ul facial (128 x float64) extras din imaginea buletinului și
+    # numele fișierului din care a fost calculat, pentru invalidare
+    id_card_face_encoding = models.BinaryField(blank=True, null=True, editable=False)
+    id_card_face_encoding_source = models.CharField(max_length=255, blank=True, null=True, editable=False)
+
     username = None
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
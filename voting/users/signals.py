@@ -3,9 +3,18 @@ from django.dispatch import receiver
 from allauth.socialaccount.models import SocialAccount
 from django.contrib.auth import get_user_model
 
+from core.face_encodings import reference_encoding_cache, reference_source
+
 #obtine modelul de utilizator definit in aplicatie
 User = get_user_model()
 
+@receiver(post_save, sender=User)
+def invalidate_reference_face_encoding(sender, instance, **kwargs):
+    # encoding-ul de referinta devine invalid daca imaginea buletinului s-a schimbat,
+    # inclusiv cand fisierul a fost rescris sub acelasi nume (sursa include data modificarii)
+    if instance.id_card_face_encoding_source != reference_source(instance):
+        reference_encoding_cache.invalidate(instance.pk)
+
 @receiver(post_save, sender=SocialAccount) #receiver - asculta semnalul post_save emis dupa salvarea unui obiect SocialAccount
 def activate_user_on_google_login(sender, instance, created, **kwargs): # exec functia daca obiectul SocialAccount a fost creat pt prima data
     if created:
@@ -0,0 +1,116 @@
+import time
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .utils import BATCH_OCR_GAP, CNPValidationResult, IDCardProcessor, batch_ocr_regions
+
+
+def tesseract_data(words):
+    """Rezultat image_to_data pentru [(cuvânt, top, înălțime, linie)]"""
+    return {
+        'text': [word for word, _, _, _ in words],
+        'top': [top for _, top, _, _ in words],
+        'height': [height for _, _, height, _ in words],
+        'block_num': [1] * len(words),
+        'par_num': [1] * len(words),
+        'line_num': [line for _, _, _, line in words],
+    }
+
+
+class BatchOCRRegionsTestCase(SimpleTestCase):
+    """Teste pentru OCR-ul mai multor regiuni dintr-o singură invocare tesseract"""
+
+    def test_words_are_assigned_to_regions_by_vertical_position(self):
+        regions = [np.zeros((10, 40), dtype=np.uint8), np.zeros((30, 60), dtype=np.uint8)]
+        second_top = BATCH_OCR_GAP + 10 + BATCH_OCR_GAP
+        data = tesseract_data([
+            ('POPESCU', BATCH_OCR_GAP, 10, 1),
+            ('', BATCH_OCR_GAP, 10, 1),
+            ('Str.', second_top, 10, 2),
+            ('Lungă', second_top, 10, 2),
+            ('nr.', second_top + 18, 10, 3),
+            ('5', second_top + 18, 10, 3),
+        ])
+
+        with patch('users.utils.pytesseract.image_to_data', return_value=data) as image_to_data:
+            texts = batch_ocr_regions(regions)
+
+        self.assertEqual(texts, ['POPESCU', 'Str. Lungă\nnr. 5'])
+        image_to_data.assert_called_once()
+        canvas = image_to_data.call_args.args[0]
+        self.assertEqual(canvas.shape, (10 + 30 + 3 * BATCH_OCR_GAP, 60 + 2 * BATCH_OCR_GAP))
+
+    def test_regions_without_words_are_empty(self):
+        regions = [np.zeros((10, 40), dtype=np.uint8), np.zeros((10, 40), dtype=np.uint8)]
+        data = tesseract_data([('ION', BATCH_OCR_GAP, 10, 1)])
+
+        with patch('users.utils.pytesseract.image_to_data', return_value=data):
+            self.assertEqual(batch_ocr_regions(regions), ['ION', ''])
+        self.assertEqual(batch_ocr_regions([]), [])
+
+
+class IDCardFieldExtractionTestCase(SimpleTestCase):
+    """Teste pentru OCR-ul concurent al câmpurilor detectate pe buletin"""
+
+    def setUp(self):
+        self.processor = IDCardProcessor()
+        self.image = np.full((200, 300, 3), 255, dtype=np.uint8)
+        cnp = CNPValidationResult(cnp='1800101290011', valid=True, errors=[], componente={})
+        self.cnp_patcher = patch.object(self.processor.procesor_cnp, 'proceseaza_regiune_cnp', return_value=cnp)
+        self.proceseaza_regiune_cnp = self.cnp_patcher.start()
+        self.addCleanup(self.cnp_patcher.stop)
+
+    def ocr_by_width(self, texts, slow_width=None):
+        """image_to_string care răspunde după lățimea regiunii (un câmp per lățime)"""
+        def image_to_string(region, **kwargs):
+            width = region.shape[1]
+            if width == slow_width:
+                time.sleep(0.05)  # câmpul lent se termină ultimul
+            text = texts[width]
+            if isinstance(text, Exception):
+                raise text
+            return text
+        return image_to_string
+
+    def test_box_order_is_preserved(self):
+        fields = [('Nume', (0, 0, 50, 10)), ('CNP', (0, 20, 100, 30)), ('Prenume', (0, 40, 60, 50))]
+        texts = {50: 'POPESCU', 60: 'ION'}
+
+        with patch('users.utils.pytesseract.image_to_string', side_effect=self.ocr_by_width(texts, slow_width=50)):
+            extracted = self.processor.extract_fields(self.image, fields, batch=False)
+
+        self.assertEqual(list(extracted), ['Nume', 'CNP', 'Prenume'])
+        self.assertEqual(extracted['Nume'], 'POPESCU')
+        self.assertEqual(extracted['Prenume'], 'ION')
+        self.assertEqual(extracted['CNP']['value'], '1800101290011')
+
+    def test_failing_field_is_omitted(self):
+        fields = [('Nume', (0, 0, 50, 10)), ('Prenume', (0, 40, 60, 50)), ('Cetatenie', (0, 60, 70, 70))]
+        texts = {50: 'POPESCU', 60: RuntimeError('tesseract a eșuat'), 70: 'Română'}
+
+        with patch('users.utils.pytesseract.image_to_string', side_effect=self.ocr_by_width(texts)):
+            extracted = self.processor.extract_fields(self.image, fields, batch=False)
+
+        self.assertEqual(extracted, {'Nume': 'POPESCU', 'Cetatenie': 'Română'})
+
+    def test_batch_mode_keeps_cnp_separate(self):
+        fields = [('Nume', (0, 0, 50, 10)), ('CNP', (0, 20, 100, 30)), ('Prenume', (0, 40, 60, 50))]
+        second_top = BATCH_OCR_GAP + 10 + BATCH_OCR_GAP
+        data = tesseract_data([('POPESCU', BATCH_OCR_GAP, 10, 1), ('ION', second_top, 10, 2)])
+
+        with patch('users.utils.pytesseract.image_to_data', return_value=data) as image_to_data, \
+                patch('users.utils.pytesseract.image_to_string') as image_to_string:
+            extracted = self.processor.extract_fields(self.image, fields, batch=True)
+
+        self.assertEqual(extracted, {
+            'Nume': 'POPESCU',
+            'CNP': {'value': '1800101290011', 'status': 'CNP valid', 'errors': []},
+            'Prenume': 'ION',
+        })
+        # Doar cele două câmpuri text ajung în imaginea grupată
+        image_to_data.assert_called_once()
+        self.assertEqual(image_to_data.call_args.args[0].shape[0], 10 + 10 + 3 * BATCH_OCR_GAP)
+        image_to_string.assert_not_called()
+        self.proceseaza_regiune_cnp.assert_called_once_with(self.image, (0, 20, 100, 30))
@@ -30,6 +30,7 @@ urlpatterns = [
     path('social-login/callback/', SocialLoginCallbackView.as_view(), name='social-login-callback'),
     path('login/', LoginView.as_view(), name='login'),
     path('check-profanity/', views.check_profanity, name='check_profanity'),
+    path('check-profanity/metrics/', views.moderation_metrics, name='moderation_metrics'),
     path('scan-id/', ScanIdView.as_view(), name='scan_id'),
     path('autofill-scan-data/', AutofillScanDataView.as_view(), name='autofill-scan-data'),
     path('detect-id-card/', DetectIDCardView.as_view(), name='detect_id_card'),
@@ -3,23 +3,17 @@ from PIL import Image, ImageEnhance
 import re
 import cv2
 import os
-from ultralytics import YOLO
 from decouple import config
 import numpy as np
-import tensorflow as tf
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 import csv
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 from typing import List, Dict
 from fuzzywuzzy import process
 from rapidfuzz import fuzz
 from unidecode import unidecode
-from scipy import ndimage
-import face_recognition
 import logging
 logger = logging.getLogger(__name__)
 import requests
@@ -62,18 +56,52 @@ def is_valid_image(image_path):
         return False
 
 
+def decode_upload(uploaded_file):
+    """
+    Decodează o singură dată fișierul încărcat, direct din memorie, într-un
+    array BGR (formatul OpenCV); etapele următoare primesc array-ul, nu o cale.
+    """
+    data = np.frombuffer(uploaded_file.read(), dtype=np.uint8)
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    if image is None:
+        raise ValueError("Imaginea nu poate fi decodată")
+    return image
+
+
+def load_image(image):
+    """Returnează imaginea ca array BGR; acceptă un array deja decodat sau o cale"""
+    if isinstance(image, np.ndarray):
+        return image
+    loaded = cv2.imread(image)
+    if loaded is None:
+        raise ValueError("Imaginea nu poate fi incarcata!")
+    return loaded
+
+
+def derived_image_path(directory, filename, suffix):
+    """Calea unui artefact derivat din fișierul încărcat, ex. buletin.jpg -> buletin_cropped.jpg"""
+    base_name, ext = os.path.splitext(os.path.basename(filename))
+    return os.path.join(directory, f"{base_name}{suffix}{ext or '.jpg'}")
+
+
+def save_image(image, path, quality=95):
+    """Scrie pe disc doar artefactele care trebuie păstrate (imaginile returnate clientului)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, quality]):
+        raise ValueError(f"Imaginea nu a putut fi salvată: {path}")
+    return path
+
+
 
 class ImageScanner:
     @staticmethod
-    def enhance_image(image_path):
+    def enhance_image(image):
         """
 Transforma o imagine intr-o versiune scanata de inalta calitate, 
 pastrand culorile si mentinand calitatea documentului similara unui scanner profesional
         """
-        # Read the image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError("Imaginea nu poate fi incarcata!")
+        # Array BGR deja decodat sau cale catre imagine
+        image = load_image(image)
 
         # Step 1: Initial preprocessing
         original = image.copy()
@@ -219,9 +247,10 @@ pastrand culorile si mentinand calitatea documentului similara unui scanner prof
         return text.strip()
 
     @staticmethod
-    def save_enhanced_image(image_path, output_path):
-        enhanced_image = ImageScanner.enhance_image(image_path)
-        cv2.imwrite(output_path, enhanced_image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    def save_enhanced_image(image, output_path):
+        enhanced_image = ImageScanner.enhance_image(image)
+        save_image(enhanced_image, output_path, quality=95)
+        return enhanced_image
 
 
 
@@ -237,6 +266,10 @@ class LocalityMatcher:
         """
         Constructor imbunatatit pentru incarcarea si procesarea localitatilor.
         """
+        # Import lazy: pandas și sklearn sunt necesare doar la potrivirea localităților
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
         self.localitati_df = pd.read_csv(csv_path)
         # Umplem valorile NaN cu un sir gol pentru a evita erori
         self.localitati_df.fillna('', inplace=True)
@@ -309,6 +342,7 @@ class LocalityMatcher:
             ]
 
         # Cautam potriviri partiale
+        from sklearn.metrics.pairwise import cosine_similarity
         input_vector = self.vectorizer.transform([normalized_input])
         similarities = cosine_similarity(input_vector, self.tfidf_matrix).flatten()
 
@@ -340,6 +374,8 @@ def load_localitati():
     """
     Incarcarea localitaiilor cu tratarea erorilor imbunatatita.
     """
+    import pandas as pd
+
     try:
         localitati = pd.read_csv(settings.LOCALITATI_CSV_PATH)
         if localitati.empty:
@@ -382,12 +418,22 @@ class ImageManipulator:
         return cv2.flip(image, 1)  # 1 pentru oglindire orizontala
         
 
+def get_id_card_detector():
+    """
+    Detectorul de buletine partajat între cereri: graful și sesiunea TensorFlow
+    sunt încărcate o singură dată, la prima utilizare, de model_manager
+    """
+    return model_manager.get_model('id_card_detector')
+
+
 class IDCardDetector:
     def __init__(self):
         self.model_path = os.path.join('media', 'models', 'id-card-detector', 'frozen_inference_graph.pb')
         self.label_map_path = os.path.join('media', 'models', 'id-card-detector', 'label_map.pbtxt')
 
         # Incarcam modelul de detectie a cartilor de identitate TensorFlow
+        # (import lazy: TensorFlow se încarcă doar la prima detectie)
+        import tensorflow as tf
         self.detection_graph = tf.Graph()
         with self.detection_graph.as_default():
             od_graph_def = tf.compat.v1.GraphDef()
@@ -397,25 +443,33 @@ class IDCardDetector:
                 tf.import_graph_def(od_graph_def, name='')
         self.session = tf.compat.v1.Session(graph=self.detection_graph)
 
-    def detect_id_card(self, image_path):
+        # Tensorii de intrare si iesire sunt cautati o singura data, nu la fiecare detectie
+        self.image_tensor = self.detection_graph.get_tensor_by_name('image_tensor:0')
+        self.output_tensors = [
+            self.detection_graph.get_tensor_by_name('detection_boxes:0'),
+            self.detection_graph.get_tensor_by_name('detection_scores:0'),
+            self.detection_graph.get_tensor_by_name('detection_classes:0'),
+            self.detection_graph.get_tensor_by_name('num_detections:0'),
+        ]
+
+    def close(self):
+        """Inchide sesiunea TensorFlow (la descarcarea modelului)"""
+        self.session.close()
+
+    def detect_id_card(self, image):
         """
         Detecteaza si decupeaza cartea de identitate folosind TensorFlow.
+        Primeste array-ul BGR al imaginii (sau calea ei) si returneaza decupajul ca array.
         """
-        image = cv2.imread(image_path)
+        image = load_image(image)
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         image_np = np.array(image_rgb)
 
-        # Definim tensorii de intrare si iesire pentru modelul de detectie
-        image_tensor = self.detection_graph.get_tensor_by_name('image_tensor:0')
-        boxes = self.detection_graph.get_tensor_by_name('detection_boxes:0')
-        scores = self.detection_graph.get_tensor_by_name('detection_scores:0')
-        classes = self.detection_graph.get_tensor_by_name('detection_classes:0')
-        num_detections = self.detection_graph.get_tensor_by_name('num_detections:0')
-
         # Rulam modelul pentru a detecta cartea de identitate
+        # (Session.run este sigur pentru apeluri concurente pe aceeasi sesiune)
         (boxes, scores, classes, num_detections) = self.session.run(
-            [boxes, scores, classes, num_detections],
-            feed_dict={image_tensor: np.expand_dims(image_np, axis=0)}
+            self.output_tensors,
+            feed_dict={self.image_tensor: np.expand_dims(image_np, axis=0)}
         )
 
         # Decupam imaginea cartii de identitate
@@ -429,12 +483,16 @@ class IDCardDetector:
 
         return None  # Returnam None daca nu s-a detectat niciun ID
     
-def extract_text(image_path):
+def extract_text(image):
     """
     Extrage textul dintr-o imagine folosind Tesseract OCR.
+    Primeste un array BGR (fara scriere pe disc) sau calea imaginii.
     """
     try:
-        image = Image.open(image_path)
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        else:
+            image = Image.open(image)
         text = pytesseract.image_to_string(image, lang='ron')
         return text
     except Exception as e:
@@ -707,6 +765,54 @@ class ProcessorCNP:
     
 
 
+# Pool limitat pentru OCR-ul pe câmpuri: fiecare apel pytesseract pornește un
+# subproces tesseract, deci firele doar așteaptă și câmpurile rulează în paralel
+_field_ocr_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ID_CARD_OCR_WORKERS', 4), thread_name_prefix='id-card-ocr'
+)
+
+# Spațiul alb dintre regiuni când câmpurile sunt grupate într-o singură imagine
+BATCH_OCR_GAP = 20
+
+
+def batch_ocr_regions(regions, lang='ron', config='--psm 6'):
+    """
+    Rulează un singur proces tesseract pentru mai multe regiuni (imagini
+    grayscale/binare): regiunile sunt așezate una sub alta pe un fundal alb,
+    iar cuvintele recunoscute sunt atribuite regiunii după poziția verticală.
+    Returnează textul fiecărei regiuni, în ordinea primită.
+    """
+    if not regions:
+        return []
+
+    width = max(region.shape[1] for region in regions) + 2 * BATCH_OCR_GAP
+    height = sum(region.shape[0] + BATCH_OCR_GAP for region in regions) + BATCH_OCR_GAP
+    canvas = np.full((height, width), 255, dtype=np.uint8)
+
+    bounds = []
+    top = BATCH_OCR_GAP
+    for region in regions:
+        h, w = region.shape[:2]
+        canvas[top:top + h, BATCH_OCR_GAP:BATCH_OCR_GAP + w] = region
+        bounds.append((top - BATCH_OCR_GAP // 2, top + h + BATCH_OCR_GAP // 2))
+        top += h + BATCH_OCR_GAP
+
+    data = pytesseract.image_to_data(canvas, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+
+    lines = [{} for _ in regions]
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        center = data['top'][i] + data['height'][i] / 2
+        for index, (start, end) in enumerate(bounds):
+            if start <= center < end:
+                line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                lines[index].setdefault(line_key, []).append(word)
+                break
+
+    return ['\n'.join(' '.join(words) for words in region_lines.values()) for region_lines in lines]
+
+
 class IDCardProcessor:
     def __init__(self):
         self.procesor_cnp = ProcessorCNP()
@@ -755,6 +861,82 @@ class IDCardProcessor:
 
         return text if text else "Text nedetectat"
 
+    def process_cnp_field(self, image, box):
+        """OCR + validare pentru câmpul CNP; returnează valoarea din rezultat"""
+        rezultat_cnp = self.procesor_cnp.proceseaza_regiune_cnp(image, box)
+        if rezultat_cnp.valid:
+            logger.info(f"CNP valid detectat: {rezultat_cnp.cnp}")
+            return {
+                "value": rezultat_cnp.cnp,
+                "status": "CNP valid",
+                "errors": []
+            }
+        logger.warning(f"CNP invalid detectat: {rezultat_cnp.errors}")
+        return {
+            "value": rezultat_cnp.cnp if rezultat_cnp.cnp else "",
+            "status": "CNP invalid",
+            "errors": rezultat_cnp.errors
+        }
+
+    def process_text_field(self, image, box, field_name):
+        raw_text = self.extract_text_from_region(image, box, field_name=field_name)
+        cleaned_text = self.clean_extracted_text(raw_text, field_name)
+        logger.debug(f"Câmp {field_name}: '{cleaned_text}'")
+        return cleaned_text
+
+    def process_text_fields_batched(self, image, fields):
+        """Toate câmpurile text într-o singură invocare tesseract: {index: valoare}"""
+        regions = []
+        for _, field_name, (x1, y1, x2, y2) in fields:
+            regions.append(self.preprocess_black_white(image[y1:y2, x1:x2]))
+
+        values = {}
+        for (index, field_name, _), text in zip(fields, batch_ocr_regions(regions, lang='ron')):
+            values[index] = self.clean_extracted_text(text.strip() or "Text nedetectat", field_name)
+        return values
+
+    def extract_fields(self, image, fields, batch=None):
+        """
+        Rulează OCR-ul pe toate câmpurile detectate ([(nume, box)]) în paralel,
+        pe pool-ul limitat, astfel încât latența totală este cea a celui mai
+        lent câmp. Un câmp care eșuează este omis, fără a le afecta pe celelalte.
+        Cu batch=True (sau settings.ID_CARD_OCR_BATCH) câmpurile text sunt
+        citite dintr-o singură invocare tesseract; CNP-ul rămâne separat.
+        """
+        if batch is None:
+            batch = getattr(settings, 'ID_CARD_OCR_BATCH', False)
+
+        futures = {}
+        text_fields = []
+        for index, (field_name, box) in enumerate(fields):
+            if field_name == "CNP":
+                futures[index] = _field_ocr_executor.submit(self.process_cnp_field, image, box)
+            elif batch:
+                text_fields.append((index, field_name, box))
+            else:
+                futures[index] = _field_ocr_executor.submit(self.process_text_field, image, box, field_name)
+
+        values = {}
+        if text_fields:
+            batched = _field_ocr_executor.submit(self.process_text_fields_batched, image, text_fields)
+            try:
+                values.update(batched.result())
+            except Exception as e:
+                logger.error(f"Eroare la OCR-ul grupat al câmpurilor: {e}")
+
+        for index, future in futures.items():
+            try:
+                values[index] = future.result()
+            except Exception as e:
+                logger.error(f"Eroare la procesarea box-ului pentru clasa {fields[index][0]}: {e}")
+
+        # Ordinea box-urilor este păstrată (la nume duplicate ultimul câștigă, ca înainte)
+        extracted_info = {}
+        for index, (field_name, _) in enumerate(fields):
+            if index in values:
+                extracted_info[field_name] = values[index]
+        return extracted_info
+
     def clean_extracted_text(self, text: str, field_name: str) -> str:
         if field_name == "Valabilitate":
             match = re.findall(r'\d{2}\.\d{2}\.\d{2,4}', text)
@@ -821,13 +1003,12 @@ class IDCardProcessor:
                 logger.error(f"Nu s-a putut încărca imaginea de la: {image_path}")
                 return {"error": "Nu s-a putut încărca imaginea"}
 
-            # Rulează predicția YOLO
+            # Rulează predicția YOLO pe imaginea deja încărcată
             logger.info(f"Procesează imaginea cu YOLO: {image_path}")
-            results = model.predict(image_path)
+            results = model.predict(image)
             
-            extracted_info = {}
-
-            # Procesează rezultatele
+            # Colectează câmpurile detectate
+            fields = []
             for result in results:
                 if not hasattr(result, 'boxes') or result.boxes is None:
                     continue
@@ -842,38 +1023,15 @@ class IDCardProcessor:
                         class_name = model.names[class_id]  # FOLOSEȘTE model, NU self.model!
                         
                         logger.debug(f"Detectat câmp: {class_name} la coordonatele [{x1}, {y1}, {x2}, {y2}]")
-
-                        if class_name == "CNP":
-                            # Procesează CNP-ul special
-                            rezultat_cnp = self.procesor_cnp.proceseaza_regiune_cnp(
-                                image, 
-                                (x1, y1, x2, y2)
-                            )
-                            if rezultat_cnp.valid:
-                                extracted_info["CNP"] = {
-                                    "value": rezultat_cnp.cnp,
-                                    "status": "CNP valid",
-                                    "errors": []
-                                }
-                                logger.info(f"CNP valid detectat: {rezultat_cnp.cnp}")
-                            else:
-                                extracted_info["CNP"] = {
-                                    "value": rezultat_cnp.cnp if rezultat_cnp.cnp else "",
-                                    "status": "CNP invalid",
-                                    "errors": rezultat_cnp.errors
-                                }
-                                logger.warning(f"CNP invalid detectat: {rezultat_cnp.errors}")
-                        else:
-                            # Procesează alte câmpuri
-                            raw_text = self.extract_text_from_region(image, [x1, y1, x2, y2], field_name=class_name)
-                            cleaned_text = self.clean_extracted_text(raw_text, class_name)
-                            extracted_info[class_name] = cleaned_text
-                            logger.debug(f"Câmp {class_name}: '{cleaned_text}'")
+                        fields.append((class_name, (x1, y1, x2, y2)))
                             
                     except Exception as e:
-                        logger.error(f"Eroare la procesarea box-ului pentru clasa {class_name}: {e}")
+                        logger.error(f"Eroare la citirea box-ului detectat: {e}")
                         continue
 
+            # OCR-ul câmpurilor rulează în paralel
+            extracted_info = self.extract_fields(image, fields)
+
             logger.info(f"Procesare completă. Câmpuri detectate: {list(extracted_info.keys())}")
             return extracted_info
 
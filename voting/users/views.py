@@ -17,11 +17,10 @@ from django.core.mail import EmailMessage
 from allauth.socialaccount.models import SocialAccount  
 from django.shortcuts import render
 from decouple import config
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from transformers import pipeline
 import re
 import os
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -29,19 +28,18 @@ from django.conf import settings
 from .utils import IDCardProcessor
 from PIL import Image
 import pytesseract
-from .utils import IDCardDetector
+from .utils import get_id_card_detector
 import cv2
 from .utils import ImageManipulator
 from .utils import extract_text, load_valid_keywords
+from .utils import decode_upload, derived_image_path, save_image
 from .utils import LocalityMatcher
 import logging
 from .utils import ImageScanner
 import tracemalloc # pentru a monitoriza consumul de memorie
 import gc # pentru a elibera manual memoria utilizata de imaginile temporare
-import face_recognition
 import numpy as np
 import io
-from ultralytics import YOLO 
 import concurrent.futures
 from .serializers import IDCardRegistrationSerializer
 from django.utils.decorators import method_decorator
@@ -52,7 +50,11 @@ from account_settings.models import AccountSettings
 from .utils import ProcessorCNP
 from security.utils import create_security_event, log_captcha_attempt, log_2fa_event, log_gdpr_event
 from django.utils import timezone
-from core.ai_services import face_recognition_service, id_card_service
+from core.ai_services import id_card_service, compare_faces_task, run_biometric_task
+from core.model_manager import BiometricPoolBusy, BiometricTaskTimeout
+from core.moderation import ModerationUnavailable, moderation_service
+from core.views import biometric_unavailable_response, moderation_unavailable_response
+from core.face_encodings import compute_reference_encoding
 
 
 logger = logging.getLogger(__name__)
@@ -138,6 +140,14 @@ class RegisterWithIDCardView(APIView):
             if image:
                 user.id_card_image.save(f'id_cards/{user.id}_{image.name}', image, save=True)
 
+                # Calculam o singura data encoding-ul fetei din buletin, folosit la monitorizarea votului
+                try:
+                    _, encoding_error = compute_reference_encoding(user)
+                    if encoding_error:
+                        logger.warning(f"Encoding-ul de referinta nu a putut fi calculat pentru {user.id}: {encoding_error}")
+                except Exception as e:
+                    logger.error(f"Eroare la calcularea encoding-ului de referinta pentru {user.id}: {e}")
+
                 create_security_event(
                     user=user,
                     event_type='id_card_scan_success',
@@ -183,111 +193,6 @@ class FaceRecognitionView(APIView):
     #     # Incarca modelul YOLO pentru detectarea spoofing-ului
     #     self.model = YOLO(MODEL_PATH)
 
-    def detect_spoofing(self, image_array):
-        """Verifica daca imaginea este reala sau falsa folosind YOLO."""
-        try:
-            # Redimensionare imagine pentru procesare mai rapidă
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 640 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                image_array = cv2.resize(image_array, (new_w, new_h))
-
-            # Normalizare imagine si detectie spoofing cu YOLO 
-            gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-            normalized = cv2.equalizeHist(gray)
-            image_array = cv2.cvtColor(normalized, cv2.COLOR_GRAY2RGB)
-
-            # Optimizare inferență YOLO
-            results = self.model(image_array, stream=True, verbose=False, conf=0.6)
-
-            for r in results:
-                for box in r.boxes:
-                    conf = box.conf[0].item()
-                    cls = int(box.cls[0].item())  # 0 = fake, 1 = real
-                    
-                    logger.info(f"Detectare spoofing - Scor: {conf}, Clasificare: {cls}")
-                    
-                    return cls == 1  # Returăm imediat primul rezultat care depășește pragul
-
-            return False
-        except Exception as e:
-            logger.error(f"Eroare la detectarea spoofing-ului: {e}")
-            return False
-
-    def detect_and_encode_face(self, image_array):
-        """Detecteaza si extrage encoding-ul fetei."""
-        try:
-            # Redimensionează imaginea pentru procesare mai rapidă
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 480 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                small_image = cv2.resize(image_array, (new_w, new_h))
-            else:
-                small_image = image_array.copy()
-            
-            # Folosește doar HOG pentru detectare, care este mai rapid
-            face_locations = face_recognition.face_locations(small_image, model="hog")
-
-            if len(face_locations) == 0:
-                return None, "Nicio fata detectata in imagine. Verificati pozitia si iluminarea."
-
-            if len(face_locations) > 1:
-                return None, "S-au detectat mai multe fete. Procesul necesita o singura fata."
-
-            # Dacă am redimensionat, ajustăm locațiile fețelor înapoi la dimensiunea originală
-            if scale < 1.0:
-                adjusted_locations = []
-                for top, right, bottom, left in face_locations:
-                    adjusted_locations.append(
-                        (int(top / scale), int(right / scale), 
-                         int(bottom / scale), int(left / scale))
-                    )
-                face_encodings = face_recognition.face_encodings(image_array, known_face_locations=adjusted_locations)
-            else:
-                face_encodings = face_recognition.face_encodings(image_array, known_face_locations=face_locations)
-
-            if len(face_encodings) == 0:
-                return None, "Codificarea fetei a esuat"
-
-            return face_encodings[0], None
-        except Exception as e:
-            logger.error(f"Eroare la detectarea/codificarea fetei: {e}")
-            return None, f"Eroare la detectarea fetei: {e}"
-
-    def compare_faces(self, id_card_array, live_array):
-        """Compara fetele doar daca imaginea live este autentica."""
-        try:
-            # Executăm detectarea spoofing-ului și encoding-ul feței simultan pentru a economisi timp
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                spoofing_future = executor.submit(self.detect_spoofing, live_array)
-                id_card_future = executor.submit(self.detect_and_encode_face, id_card_array)
-                
-                # Așteaptă finalizarea verificării spoofing
-                is_real = spoofing_future.result()
-                if not is_real:
-                    return False, "Frauda detectata: folositi o imagine reala!"
-                
-                # Obține rezultatele encoding-ului feței din ID
-                id_card_encoding, id_card_error = id_card_future.result()
-                if id_card_encoding is None:
-                    return False, id_card_error
-                
-                # Acum face encoding pentru imaginea live
-                live_encoding, live_error = self.detect_and_encode_face(live_array)
-                if live_encoding is None:
-                    return False, live_error
-
-            # Compararea fețelor
-            face_distance = np.linalg.norm(id_card_encoding - live_encoding)
-            match = face_distance < 0.6
-
-            return match, "Identificare reusita!" if match else "Fetele nu se potrivesc."
-        except Exception as e:
-            logger.error(f"Eroare la compararea fetelor: {e}")
-            return False, f"Eroare la compararea fetelor: {e}"
-
     def post(self, request):
         """Primeste imaginile si verifica autenticitatea + compara fetele."""
         try:
@@ -311,29 +216,22 @@ class FaceRecognitionView(APIView):
             id_card_array = np.array(id_card_pil)
             live_array = np.array(live_pil)
 
-            match, message = face_recognition_service.compare_faces(id_card_array, live_array)
+            match, message = run_biometric_task(compare_faces_task, id_card_array, live_array)
 
             return Response({'message': message, 'match': match}, status=status.HTTP_200_OK)
+        except (BiometricPoolBusy, BiometricTaskTimeout) as e:
+            return biometric_unavailable_response(e)
         except Exception as e:
             logger.error(f"Eroare server: {e}")
             return Response({'error': 'Eroare internă server'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-toxic_classifier = pipeline("text-classification", model="unitary/toxic-bert")
-
-
-
 def contains_profanity_with_ai(message):
     """
     Detectează limbaj nepotrivit în mesaj folosind AI.
+    Propozițiile sunt clasificate într-un singur batch, cu verdicte din cache.
+    Ridică ModerationUnavailable dacă nu se poate obține un verdict.
     """
-    sentences = re.split(r'[.!?]', message)  # impartim mesajul în propozitii
-    for sentence in sentences:
-        if sentence.strip():  # Ignoram propozitiile goale
-            result = toxic_classifier(sentence)
-            for label in result:
-                if label["label"] == "LABEL_1" and label["score"] > 0.5:
-                    return True
-    return False
+    return moderation_service.check(message).flagged
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -342,9 +240,21 @@ def check_profanity(request):
     Endpoint pentru verificarea limbajului nepotrivit.
     """
     message = request.data.get('message', '')
-    if contains_profanity_with_ai(message):
-        return Response({'containsProfanity': True}, status=200)
-    return Response({'containsProfanity': False}, status=200)
+    try:
+        contains_profanity = contains_profanity_with_ai(message)
+    except ModerationUnavailable as e:
+        logger.warning(f"Verificarea limbajului indisponibilă: {e}")
+        return moderation_unavailable_response(e)
+    return Response({'containsProfanity': contains_profanity}, status=200)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def moderation_metrics(request):
+    """
+    Statisticile de cache, batch și latență ale verificării limbajului.
+    """
+    return Response(moderation_service.get_metrics(), status=200)
 
 
 @api_view(['POST'])
@@ -358,7 +268,12 @@ def send_feedback(request):
     }
 
     # Validare mesaj pentru injurii
-    if contains_profanity_with_ai(feedback_data['message']):
+    try:
+        contains_profanity = contains_profanity_with_ai(feedback_data['message'])
+    except ModerationUnavailable as e:
+        logger.warning(f"Verificarea limbajului indisponibilă: {e}")
+        return moderation_unavailable_response(e)
+    if contains_profanity:
         return Response({'error': 'Mesajul conține limbaj nepotrivit și nu poate fi trimis.'}, status=400)
 
     # Alte validari si trimiterea mesajului
@@ -403,7 +318,12 @@ def send_feedback(request):
         return Response({'error': 'Numar de telefon invalid. Verificati prefixul si numărul.'}, status=400)
 
     # Validare: mesajul sa nu contina injurii
-    if contains_profanity_with_ai(feedback_data['message']):
+    try:
+        contains_profanity = contains_profanity_with_ai(feedback_data['message'])
+    except ModerationUnavailable as e:
+        logger.warning(f"Verificarea limbajului indisponibilă: {e}")
+        return moderation_unavailable_response(e)
+    if contains_profanity:
         return Response({'error': 'Mesajul contine limbaj nepotrivit si nu a fost trimis.'}, status=400)
 
     # Validare: mesajul trebuie sa aiba cel putin 20 de cuvinte
@@ -457,28 +377,25 @@ class UploadIdView(APIView):
         if not image:
             return Response({'error': 'Niciun fișier nu a fost încărcat'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Salvam imaginea pe disc
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, image.name)
-
-        with open(file_path, 'wb+') as destination:
-            for chunk in image.chunks():
-                destination.write(chunk)
+        # Decodam imaginea o singura data, in memorie; etapele primesc array-ul
+        try:
+            image_array = decode_upload(image)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Detectam cartea de identitate
-        detector = IDCardDetector()
-        cropped_image = detector.detect_id_card(file_path)
+        detector = get_id_card_detector()
+        cropped_image = detector.detect_id_card(image_array)
 
         if cropped_image is None:
             return Response({'error': 'Nu s-a putut detecta cartea de identitate'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Salvam imaginea decupata
-        cropped_file_path = file_path.replace('.jpg', '_cropped.jpg')
-        cv2.imwrite(cropped_file_path, cropped_image)
+        # Salvam doar imaginea decupata, returnata clientului
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
+        cropped_file_path = save_image(cropped_image, derived_image_path(upload_dir, image.name, '_cropped'))
 
-        # Aplicam OCR pentru a extrage textul
-        extracted_text = extract_text(cropped_file_path)
+        # Aplicam OCR pentru a extrage textul, direct pe array
+        extracted_text = extract_text(cropped_image)
 
         # Dacă textul nu este detectat, încercăm cu imaginea oglindită
 
@@ -492,11 +409,9 @@ class UploadIdView(APIView):
                 request=request,
                 risk_level='medium'
             )
-            # Oglindim imaginea și rulăm OCR din nou
+            # Oglindim imaginea și rulăm OCR din nou (în memorie, fără fișier intermediar)
             flipped_image = cv2.flip(cropped_image, 1)  # 1 pentru oglindire orizontala
-            flipped_file_path = cropped_file_path.replace('.jpg', '_flipped.jpg')
-            cv2.imwrite(flipped_file_path, flipped_image)
-            extracted_text_flipped = extract_text(flipped_file_path)
+            extracted_text_flipped = extract_text(flipped_image)
 
             # Verificăm dacă imaginea oglindită conține text valid
             is_valid_id = any(keyword in extracted_text_flipped.upper() for keyword in self.valid_keywords)
@@ -666,30 +581,27 @@ class ScanIdView(APIView):
         if not image:
             return Response({'error': 'Niciun fișier nu a fost încărcat.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Salvează imaginea originală
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'camera')
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, image.name)
-
-        with open(file_path, 'wb+') as destination:
-            for chunk in image.chunks():
-                destination.write(chunk)
+        # Decodează imaginea o singură dată, în memorie
+        try:
+            image_array = decode_upload(image)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Aplică detectarea cărții de identitate
-        detector = IDCardDetector()
-        cropped_image = detector.detect_id_card(file_path)
+        detector = get_id_card_detector()
+        cropped_image = detector.detect_id_card(image_array)
 
         if cropped_image is None:
             return Response({'error': 'Nu s-a putut detecta cartea de identitate.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Salvează imaginea decupată
-        cropped_file_path = file_path.replace('.jpg', '_cropped.jpg')  # Schimbă extensia dacă imaginea nu este .jpg
-        cv2.imwrite(cropped_file_path, cropped_image)
+        # Salvează imaginea decupată (folosită ulterior la autocompletare)
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'camera')
+        cropped_file_path = save_image(cropped_image, derived_image_path(upload_dir, image.name, '_cropped'))
 
-        # Aplică transformarea într-o versiune "scanată"
-        enhanced_file_path = cropped_file_path.replace('_cropped.jpg', '_enhanced.jpg')  # Schimbă extensia dacă este .png
+        # Aplică transformarea într-o versiune "scanată", pornind direct de la array-ul decupat
+        enhanced_file_path = derived_image_path(upload_dir, image.name, '_enhanced')
         try:
-            ImageScanner.save_enhanced_image(cropped_file_path, enhanced_file_path)
+            ImageScanner.save_enhanced_image(cropped_image, enhanced_file_path)
         except Exception as e:
             return Response({'error': f'Eroare la procesarea imaginii: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -756,21 +668,20 @@ class DetectIDCardView(APIView):
         if not file:
             return Response({"error": "Niciun fișier încărcat"}, status=400)
 
-        file_path = os.path.join(settings.MEDIA_ROOT, 'uploads', file.name)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        with open(file_path, 'wb+') as f:
-            for chunk in file.chunks():
-                f.write(chunk)
+        try:
+            image_array = decode_upload(file)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-        detector = IDCardDetector()
-        cropped_image = detector.detect_id_card(file_path)
+        detector = get_id_card_detector()
+        cropped_image = detector.detect_id_card(image_array)
         if cropped_image is None:
             return Response({"error": "Carte de identitate nedetectată"}, status=400)
 
-        # Salvăm imaginea decupată
-        cropped_path = file_path.replace('.png', '_cropped.png')
-        cv2.imwrite(cropped_path, cropped_image)
+        # Salvăm doar imaginea decupată
+        cropped_path = save_image(
+            cropped_image, derived_image_path(os.path.join(settings.MEDIA_ROOT, 'uploads'), file.name, '_cropped')
+        )
 
         return Response({"cropped_image_path": cropped_path.replace(settings.MEDIA_ROOT, '/media/')}, status=200)
 
@@ -929,92 +840,6 @@ class LoginWithIDCardView(APIView):
     #     super().__init__(**kwargs)
     #     self.model = YOLO(MODEL_PATH)
     
-    def detect_spoofing(self, image_array):
-        try:
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 640 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                image_array = cv2.resize(image_array, (new_w, new_h))
-
-            gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-            normalized = cv2.equalizeHist(gray)
-            image_array = cv2.cvtColor(normalized, cv2.COLOR_GRAY2RGB)
-
-            results = self.model(image_array, stream=True, verbose=False, conf=0.6)
-
-            for r in results:
-                for box in r.boxes:
-                    conf = box.conf[0].item()
-                    cls = int(box.cls[0].item())
-                    
-                    logger.info(f"Detectare spoofing - Scor: {conf}, Clasificare: {cls}")
-                    
-                    return cls == 1
-
-            return False
-        except Exception as e:
-            logger.error(f"Eroare la detectarea spoofing-ului: {e}")
-            return False
-
-    def detect_and_encode_face(self, image_array):
-        try:
-            h, w = image_array.shape[:2]
-            scale = min(1.0, 480 / max(h, w))
-            if scale < 1.0:
-                new_h, new_w = int(h * scale), int(w * scale)
-                small_image = cv2.resize(image_array, (new_w, new_h))
-            else:
-                small_image = image_array.copy()
-            
-            face_locations = face_recognition.face_locations(small_image, model="hog")
-
-            if len(face_locations) == 0:
-                return None, "Nicio fata detectata in imagine. Verificati pozitia si iluminarea."
-
-            if len(face_locations) > 1:
-                return None, "S-au detectat mai multe fete. Procesul necesita o singura fata."
-
-            if scale < 1.0:
-                adjusted_locations = []
-                for top, right, bottom, left in face_locations:
-                    adjusted_locations.append(
-                        (int(top / scale), int(right / scale), 
-                         int(bottom / scale), int(left / scale))
-                    )
-                face_encodings = face_recognition.face_encodings(image_array, known_face_locations=adjusted_locations)
-            else:
-                face_encodings = face_recognition.face_encodings(image_array, known_face_locations=face_locations)
-
-            if len(face_encodings) == 0:
-                return None, "Codificarea fetei a esuat"
-
-            return face_encodings[0], None
-        except Exception as e:
-            logger.error(f"Eroare la detectarea/codificarea fetei: {e}")
-            return None, f"Eroare la detectarea fetei: {e}"
-
-    def compare_faces(self, id_card_array, live_array):
-        try:
-            is_real = self.detect_spoofing(live_array)
-            if not is_real:
-                return False, "Frauda detectata: folositi o imagine reala!"
-            
-            id_card_encoding, id_card_error = self.detect_and_encode_face(id_card_array)
-            if id_card_encoding is None:
-                return False, id_card_error
-                
-            live_encoding, live_error = self.detect_and_encode_face(live_array)
-            if live_encoding is None:
-                return False, live_error
-
-            face_distance = np.linalg.norm(id_card_encoding - live_encoding)
-            match = face_distance < 0.6
-            return match, "Identificare reușită!" if match else "Fetele nu se potrivesc."
-        except Exception as e:
-            logger.error(f"Eroare la compararea fetelor: {e}")
-            return False, f"Eroare la compararea fețelor: {e}"
-
     def post(self, request):
         logger.info(f"Cerere POST primită în LoginWithIDCardView")
         
@@ -1150,7 +975,10 @@ class LoginWithIDCardView(APIView):
                 id_card_array = np.array(id_card_pil)
                 live_array = np.array(live_pil)
                 
-                match, message = face_recognition_service.compare_faces(id_card_array, live_array)
+                try:
+                    match, message = run_biometric_task(compare_faces_task, id_card_array, live_array)
+                except (BiometricPoolBusy, BiometricTaskTimeout) as e:
+                    return biometric_unavailable_response(e)
                 
                 if not match:
                     if 'spoofing' in message.lower() or 'fraud' in message.lower():
@@ -8,5 +8,6 @@ class VoteConfig(AppConfig):
         # Importă signal-urile pentru a fi sigur că sunt înregistrate
         try:
             import vote.models  # Acest import va înregistra signal-urile
+            import vote.signals
         except ImportError:
             pass
\ No newline at end of file
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from vote.models import CountyTurnoutCounter
+from vote.services.turnout import VOTE_MODELS, rebuild_turnout_counters
+from vote.services.demographics import rebuild_demographic_counters
+
+
+class Command(BaseCommand):
+    help = 'Reconstruiește contoarele de prezență (județe, secții, demografice) din tabelele de voturi'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vote-type',
+            choices=list(VOTE_MODELS.keys()),
+            help='Reconstruiește doar contoarele pentru tipul de vot specificat',
+        )
+
+    def handle(self, *args, **options):
+        vote_types = [options['vote_type']] if options['vote_type'] else list(VOTE_MODELS.keys())
+
+        for vote_type in vote_types:
+            # Totalul anterior, pentru a raporta eventualele diferențe
+            previous_total = sum(
+                CountyTurnoutCounter.objects.filter(vote_type=vote_type)
+                .values_list('total_votes', flat=True)
+            )
+
+            section_count, county_count = rebuild_turnout_counters(vote_type)
+            voter_count = rebuild_demographic_counters(vote_type, VOTE_MODELS[vote_type])
+
+            current_total = sum(
+                CountyTurnoutCounter.objects.filter(vote_type=vote_type)
+                .values_list('total_votes', flat=True)
+            )
+
+            self.stdout.write(
+                f"{vote_type}: {county_count} județe, {section_count} secții, "
+                f"{current_total} voturi, {voter_count} alegători în statisticile demografice"
+            )
+            if previous_total != current_total:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"  Contoarele pentru {vote_type} erau desincronizate "
+                        f"({previous_total} -> {current_total} voturi)"
+                    )
+                )
+
+        self.stdout.write(self.style.SUCCESS('Contoarele de prezență au fost reconstruite.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from vote.services.vote_counters import verify_vote_counters
+
+
+class Command(BaseCommand):
+    help = 'Verifică contoarele de voturi ale sistemelor de vot personalizate față de tabela VoteCast'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--system', type=int, help='Verifică doar sistemul de vot cu ID-ul specificat')
+        parser.add_argument('--fix', action='store_true', help='Corectează contoarele desincronizate')
+
+    def handle(self, *args, **options):
+        mismatches = verify_vote_counters(vote_system_id=options['system'], fix=options['fix'])
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Contoarele de voturi sunt sincronizate.'))
+            return
+
+        for model_name, object_id, stored, actual in mismatches:
+            self.stdout.write(self.style.WARNING(f"{model_name} #{object_id}: contor {stored}, voturi reale {actual}"))
+
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'{len(mismatches)} contoare corectate.'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'{len(mismatches)} contoare desincronizate; rulați cu --fix pentru corectare.'
+            ))
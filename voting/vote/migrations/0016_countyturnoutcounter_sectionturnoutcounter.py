@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from vote.services.turnout import rebuild_turnout_counters
+
+# Tabela de voturi a fiecărui tip de vot (modele istorice)
+VOTE_MODEL_NAMES = {
+    'locale': 'LocalVote',
+    'prezidentiale': 'PresidentialVote',
+    'prezidentiale_tur2': 'PresidentialRound2Vote',
+    'parlamentare': 'ParliamentaryVote',
+}
+
+
+def backfill_turnout_counters(apps, schema_editor):
+    SectionTurnoutCounter = apps.get_model('vote', 'SectionTurnoutCounter')
+    CountyTurnoutCounter = apps.get_model('vote', 'CountyTurnoutCounter')
+    for vote_type, model_name in VOTE_MODEL_NAMES.items():
+        rebuild_turnout_counters(
+            vote_type, apps.get_model('vote', model_name), SectionTurnoutCounter, CountyTurnoutCounter
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0015_presidentialround2candidate_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountyTurnoutCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_type', models.CharField(max_length=20)),
+                ('county', models.CharField(max_length=50)),
+                ('total_votes', models.PositiveIntegerField(default=0)),
+                ('unique_voters', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contor Prezență Județ',
+                'verbose_name_plural': 'Contoare Prezență Județe',
+                'unique_together': {('vote_type', 'county')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SectionTurnoutCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_type', models.CharField(max_length=20)),
+                ('county', models.CharField(max_length=50)),
+                ('city', models.CharField(max_length=100)),
+                ('total_votes', models.PositiveIntegerField(default=0)),
+                ('unique_voters', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('voting_section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnout_counters', to='vote.votingsection')),
+            ],
+            options={
+                'verbose_name': 'Contor Prezență Secție',
+                'verbose_name_plural': 'Contoare Prezență Secții',
+                'indexes': [models.Index(fields=['vote_type', 'county'], name='vote_sectio_vote_ty_870491_idx')],
+                'unique_together': {('vote_type', 'voting_section')},
+            },
+        ),
+        migrations.RunPython(backfill_turnout_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+from vote.services.demographics import rebuild_demographic_counters
+
+# Tabela de voturi a fiecărui tip de vot (modele istorice)
+VOTE_MODEL_NAMES = {
+    'locale': 'LocalVote',
+    'prezidentiale': 'PresidentialVote',
+    'prezidentiale_tur2': 'PresidentialRound2Vote',
+    'parlamentare': 'ParliamentaryVote',
+}
+
+
+def backfill_demographic_counters(apps, schema_editor):
+    DemographicTurnoutCounter = apps.get_model('vote', 'DemographicTurnoutCounter')
+    for vote_type, model_name in VOTE_MODEL_NAMES.items():
+        rebuild_demographic_counters(vote_type, apps.get_model('vote', model_name), DemographicTurnoutCounter)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0016_countyturnoutcounter_sectionturnoutcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemographicTurnoutCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_type', models.CharField(max_length=20)),
+                ('dimension', models.CharField(choices=[('age_group', 'Grupă de vârstă'), ('gender', 'Gen'), ('environment', 'Mediu')], max_length=20)),
+                ('value', models.CharField(max_length=10)),
+                ('voters', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contor Demografic',
+                'verbose_name_plural': 'Contoare Demografice',
+                'unique_together': {('vote_type', 'dimension', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_demographic_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:54
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_vote_counters(apps, schema_editor):
+    VoteCast = apps.get_model('vote', 'VoteCast')
+    VoteOption = apps.get_model('vote', 'VoteOption')
+    VoteSystem = apps.get_model('vote', 'VoteSystem')
+
+    option_counts = VoteCast.objects.values_list('option_id').annotate(total=Count('id')).order_by()
+    for option_id, total in option_counts:
+        VoteOption.objects.filter(pk=option_id).update(votes_count=total)
+
+    system_counts = VoteCast.objects.values_list('vote_system_id').annotate(total=Count('id')).order_by()
+    for system_id, total in system_counts:
+        VoteSystem.objects.filter(pk=system_id).update(total_votes=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0017_demographicturnoutcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voteoption',
+            name='votes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='votesystem',
+            name='total_votes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0018_vote_system_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votetoken',
+            name='delivery_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='votetoken',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'Netrimis'), ('queued', 'În coadă'), ('sent', 'Trimis'), ('failed', 'Eșuat')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='votetoken',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_allowed_emails(apps, schema_editor):
+    VoteSystem = apps.get_model('vote', 'VoteSystem')
+    AllowedVoterEmail = apps.get_model('vote', 'AllowedVoterEmail')
+
+    for vote_system in VoteSystem.objects.exclude(allowed_emails__isnull=True).exclude(allowed_emails=''):
+        emails = dict.fromkeys(
+            email.strip().lower() for email in vote_system.allowed_emails.split(',') if email.strip()
+        )
+        AllowedVoterEmail.objects.bulk_create(
+            [AllowedVoterEmail(vote_system_id=vote_system.id, email=email) for email in emails],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+def restore_allowed_emails(apps, schema_editor):
+    """La revenire, câmpul text este refăcut din lista de alegători"""
+    VoteSystem = apps.get_model('vote', 'VoteSystem')
+    AllowedVoterEmail = apps.get_model('vote', 'AllowedVoterEmail')
+
+    emails_by_system = {}
+    for vote_system_id, email in AllowedVoterEmail.objects.order_by('id').values_list('vote_system_id', 'email'):
+        emails_by_system.setdefault(vote_system_id, []).append(email)
+
+    vote_systems = list(VoteSystem.objects.filter(id__in=emails_by_system).only('id'))
+    for vote_system in vote_systems:
+        vote_system.allowed_emails = ','.join(emails_by_system[vote_system.id])
+    VoteSystem.objects.bulk_update(vote_systems, ['allowed_emails'], batch_size=500)
+
+
+def _token_to_keep(tokens):
+    """
+    Un token folosit este păstrat doar dacă aparține aceleiași emiteri ca
+    cel mai nou token nefolosit (a fost folosit după crearea acestuia);
+    altfel a fost folosit la un vot anterior și se păstrează token-ul nou.
+    """
+    newest_unused = max((token for token in tokens if not token.used),
+                        key=lambda token: (token.created_at, token.id), default=None)
+    last_used = max((token for token in tokens if token.used),
+                    key=lambda token: (token.used_at or token.created_at, token.id), default=None)
+    if newest_unused is None or last_used is None:
+        return newest_unused or last_used
+    if (last_used.used_at or last_used.created_at) >= newest_unused.created_at:
+        return last_used
+    return newest_unused
+
+
+def normalize_token_emails(apps, schema_editor):
+    """
+    Token-urile existente primesc aceeași formă a adresei ca lista de alegători
+    (litere mici). Dintre duplicatele care rezultă se păstrează un singur
+    token (vezi _token_to_keep); restul sunt șterse.
+    """
+    VoteToken = apps.get_model('vote', 'VoteToken')
+
+    grouped = {}
+    tokens = VoteToken.objects.order_by('id').only('id', 'vote_system_id', 'email', 'used', 'used_at', 'created_at')
+    for token in tokens.iterator(chunk_size=2000):
+        grouped.setdefault((token.vote_system_id, token.email.strip().lower()), []).append(token)
+
+    kept = {}
+    duplicates = []
+    for key, group in grouped.items():
+        kept[key] = _token_to_keep(group)
+        duplicates.extend(token.id for token in group if token is not kept[key])
+
+    for start in range(0, len(duplicates), 1000):
+        VoteToken.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+
+    changed = []
+    for (_, email), token in kept.items():
+        if token.email != email:
+            token.email = email
+            changed.append(token)
+    VoteToken.objects.bulk_update(changed, ['email'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0019_vote_token_delivery_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllowedVoterEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('vote_system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allowed_voters', to='vote.votesystem')),
+            ],
+            options={
+                'verbose_name': 'Email permis',
+                'verbose_name_plural': 'Email-uri permise',
+                'unique_together': {('vote_system', 'email')},
+            },
+        ),
+        migrations.RunPython(copy_allowed_emails, restore_allowed_emails),
+        migrations.RunPython(normalize_token_emails, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='votesystem',
+            name='allowed_emails',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0020_allowed_voter_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votetoken',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
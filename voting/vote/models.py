@@ -268,9 +268,8 @@ class VoteSystem(models.Model):
     require_email_verification = models.BooleanField(default=False,
         help_text="Dacă este activat, utilizatorii vor trebui să verifice email-ul înainte de a vota")
     
-    # Lista de emailuri permise să voteze
-    allowed_emails = models.TextField(blank=True, null=True,
-        help_text="Lista de emailuri permise să voteze, separate prin virgulă")
+    # Contor denormalizat, actualizat atomic la fiecare VoteCast (vezi services.vote_counters)
+    total_votes = models.PositiveIntegerField(default=0)
     
     class Meta:
         verbose_name = "Sistem de vot"
@@ -307,6 +306,9 @@ class VoteOption(models.Model):
     image_url = models.URLField(blank=True, null=True)
     order = models.IntegerField(default=0)
     
+    # Contor denormalizat, actualizat atomic la fiecare VoteCast (vezi services.vote_counters)
+    votes_count = models.PositiveIntegerField(default=0)
+    
     class Meta:
         verbose_name = "Opțiune de vot"
         verbose_name_plural = "Opțiuni de vot"
@@ -343,6 +345,22 @@ class VoteCast(models.Model):
             return f"Vot de {self.user.email} pentru {self.option.title}"
         return f"Vot anonim pentru {self.option.title}"
     
+class AllowedVoterEmail(models.Model):
+    """Adresă de email permisă să voteze într-un sistem de vot (lista de alegători)"""
+    vote_system = models.ForeignKey(VoteSystem, on_delete=models.CASCADE, related_name='allowed_voters')
+    email = models.EmailField()
+    added_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Email permis"
+        verbose_name_plural = "Email-uri permise"
+        # Indexul unic servește și verificarea apartenenței (vote_system, email)
+        unique_together = ('vote_system', 'email')
+    
+    def __str__(self):
+        return f"{self.email} ({self.vote_system.name})"
+
+
 # Modele pentru one time tokens
 class VoteToken(models.Model):
     """Model pentru token-uri de vot de unică folosință"""
@@ -355,6 +373,17 @@ class VoteToken(models.Model):
     used_at = models.DateTimeField(null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
+    # Starea trimiterii email-ului cu token-ul (actualizată de coada de email-uri)
+    delivery_status = models.CharField(max_length=10, default='pending', choices=[
+        ('pending', 'Netrimis'),
+        ('queued', 'În coadă'),
+        ('sent', 'Trimis'),
+        ('failed', 'Eșuat'),
+    ])
+    delivery_error = models.TextField(blank=True, default='')
+    queued_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         verbose_name = "Token vot"
         verbose_name_plural = "Token-uri vot"
@@ -439,6 +468,92 @@ class PresidentialRound2Vote(models.Model):
     def __str__(self):
         return f"{self.user} - {self.candidate} - Turul 2 - {self.vote_datetime.strftime('%d.%m.%Y, %H:%M')}"
     
+class CountyTurnoutCounter(models.Model):
+    """
+    Contor de prezență per tur (tip de vot) și județ.
+    Este actualizat incremental la fiecare vot nou, astfel încât statisticile
+    live să nu mai scaneze tabelele de voturi. Poate fi reconstruit cu
+    comanda `rebuild_turnout_counters`.
+    """
+    vote_type = models.CharField(max_length=20)
+    county = models.CharField(max_length=50)
+    total_votes = models.PositiveIntegerField(default=0)
+    unique_voters = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contor Prezență Județ"
+        verbose_name_plural = "Contoare Prezență Județe"
+        unique_together = ('vote_type', 'county')
+
+    def __str__(self):
+        return f"{self.vote_type} - {self.county}: {self.total_votes} voturi"
+
+
+class SectionTurnoutCounter(models.Model):
+    """
+    Contor de prezență per tur (tip de vot) și secție de votare.
+    Județul și localitatea sunt denormalizate pentru agregări rapide.
+    """
+    vote_type = models.CharField(max_length=20)
+    voting_section = models.ForeignKey(VotingSection, on_delete=models.CASCADE, related_name='turnout_counters')
+    county = models.CharField(max_length=50)
+    city = models.CharField(max_length=100)
+    total_votes = models.PositiveIntegerField(default=0)
+    unique_voters = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contor Prezență Secție"
+        verbose_name_plural = "Contoare Prezență Secții"
+        unique_together = ('vote_type', 'voting_section')
+        indexes = [
+            models.Index(fields=['vote_type', 'county']),
+        ]
+
+    def __str__(self):
+        return f"{self.vote_type} - Secția {self.voting_section_id}: {self.total_votes} voturi"
+
+
+class DemographicTurnoutCounter(models.Model):
+    """
+    Numărul de alegători per tur, pe grupă de vârstă, gen și mediu.
+    Valorile sunt derivate o singură dată, la înregistrarea votului,
+    astfel încât statisticile live sunt o simplă citire a contoarelor.
+    """
+    DIMENSIONS = [
+        ('age_group', 'Grupă de vârstă'),
+        ('gender', 'Gen'),
+        ('environment', 'Mediu'),
+    ]
+
+    vote_type = models.CharField(max_length=20)
+    dimension = models.CharField(max_length=20, choices=DIMENSIONS)
+    value = models.CharField(max_length=10)
+    voters = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contor Demografic"
+        verbose_name_plural = "Contoare Demografice"
+        unique_together = ('vote_type', 'dimension', 'value')
+
+    def __str__(self):
+        return f"{self.vote_type} - {self.dimension}={self.value}: {self.voters} alegători"
+
+
+def reset_turnout_counters(vote_type=None):
+    """Șterge contoarele de prezență pentru un tip de vot (sau pentru toate)"""
+    counter_querysets = [
+        CountyTurnoutCounter.objects.all(),
+        SectionTurnoutCounter.objects.all(),
+        DemographicTurnoutCounter.objects.all(),
+    ]
+    for counters in counter_querysets:
+        if vote_type:
+            counters = counters.filter(vote_type=vote_type)
+        counters.delete()
+
 @receiver(pre_delete, sender=VoteSettings)
 def delete_related_votes_before_settings_delete(sender, instance, **kwargs):
     """
@@ -488,6 +603,9 @@ def delete_related_votes_before_settings_delete(sender, instance, **kwargs):
             
             total_deleted = local_count + presidential_count + presidential_r2_count + parliamentary_count
             logger.info(f"Au fost șterse {total_deleted} voturi în total pentru simulare")
+        
+        # Contoarele de prezență devin invalide odată cu ștergerea voturilor
+        reset_turnout_counters(None if vote_type == 'simulare' else vote_type)
             
     except Exception as e:
         logger.error(f"Eroare la ștergerea voturilor pentru tipul {vote_type}: {str(e)}")
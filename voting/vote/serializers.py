@@ -2,27 +2,22 @@ from rest_framework import serializers
 from .models import VoteSystem, VoteOption, VoteCast
 
 class VoteOptionSerializer(serializers.ModelSerializer):
-    votes_count = serializers.SerializerMethodField()
+    # Contor denormalizat, fără COUNT per opțiune
+    votes_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = VoteOption
         fields = ['id', 'title', 'description', 'image_url', 'order', 'votes_count']
-    
-    def get_votes_count(self, obj):
-        return obj.votes.count()
 
 
 class VoteSystemSerializer(serializers.ModelSerializer):
     options = VoteOptionSerializer(many=True, read_only=True)
-    total_votes = serializers.SerializerMethodField()
+    total_votes = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = VoteSystem
         fields = ['id', 'name', 'description', 'category', 'created_at', 'start_date', 
-                  'end_date', 'status', 'rules', 'options', 'total_votes', 'require_email_verification', 'allowed_emails']
-    
-    def get_total_votes(self, obj):
-        return VoteCast.objects.filter(vote_system=obj).count()
+                  'end_date', 'status', 'rules', 'options', 'total_votes', 'require_email_verification']
 
 
 class CreateVoteSystemSerializer(serializers.ModelSerializer):
@@ -0,0 +1,68 @@
+import csv
+import io
+
+from django.db import transaction
+
+from vote.models import AllowedVoterEmail
+
+
+def normalize_email(email):
+    """Forma canonică a unei adrese: fără spații, cu litere mici"""
+    return (email or '').strip().lower()
+
+
+def _rows(vote_system, emails):
+    unique = dict.fromkeys(normalize_email(email) for email in emails)
+    return [AllowedVoterEmail(vote_system=vote_system, email=email) for email in unique if email]
+
+
+def add_allowed_emails(vote_system, emails):
+    """
+    Adaugă adresele în lista de alegători permiși; duplicatele (în listă sau
+    deja existente) sunt ignorate de constrângerea unică (vote_system, email).
+    Returnează numărul total de adrese din listă după import.
+    """
+    AllowedVoterEmail.objects.bulk_create(_rows(vote_system, emails), batch_size=1000, ignore_conflicts=True)
+    return AllowedVoterEmail.objects.filter(vote_system=vote_system).count()
+
+
+def replace_allowed_emails(vote_system, emails):
+    """Înlocuiește întreaga listă de alegători permiși, într-o singură tranzacție"""
+    with transaction.atomic():
+        AllowedVoterEmail.objects.filter(vote_system=vote_system).delete()
+        return add_allowed_emails(vote_system, emails)
+
+
+def is_email_allowed(vote_system, email):
+    """Verifică apartenența la listă printr-o singură căutare pe indexul unic"""
+    return AllowedVoterEmail.objects.filter(vote_system=vote_system, email=normalize_email(email)).exists()
+
+
+def get_allowed_emails(vote_system):
+    """Adresele permise, în ordinea importului"""
+    return list(
+        AllowedVoterEmail.objects.filter(vote_system=vote_system).order_by('id').values_list('email', flat=True)
+    )
+
+
+def emails_from_csv(uploaded_file):
+    """
+    Extrage adresele dintr-un fișier CSV încărcat: orice celulă care conține
+    '@' este considerată adresă, astfel încât antetul și celelalte coloane
+    (nume, telefon etc.) sunt ignorate.
+    """
+    content = uploaded_file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig', errors='replace')
+
+    try:
+        dialect = csv.Sniffer().sniff(content[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    return [
+        cell.strip()
+        for row in csv.reader(io.StringIO(content), dialect)
+        for cell in row
+        if '@' in cell
+    ]
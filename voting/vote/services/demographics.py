@@ -0,0 +1,195 @@
+import logging
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from vote.models import DemographicTurnoutCounter
+
+logger = logging.getLogger(__name__)
+
+AGE_GROUPS = ['18-24', '25-34', '35-44', '45-64', '65+']
+GENDERS = ['M', 'F']
+ENVIRONMENTS = ['urban', 'rural']
+
+URBAN_KEYWORDS = ['municipiu', 'oraș', 'oras', 'municipiul', 'orasul', 'sector', 'sectorul']
+RURAL_KEYWORDS = ['comună', 'comuna', 'sat', 'satul', 'cătun', 'catun', 'cătunul', 'catunul']
+
+
+def age_from_cnp(cnp, on_date=None):
+    """Calculează vârsta din CNP la data indicată (implicit azi)"""
+    if not cnp or len(cnp) != 13:
+        return None
+
+    try:
+        # Prima cifră determină secolul și genul
+        first_digit = int(cnp[0])
+
+        # Determinarea secolului conform algoritmului CNP românesc
+        if first_digit in [1, 2]:
+            century = 1900  # Născuți între 1900-1999
+        elif first_digit in [3, 4]:
+            century = 1800  # Născuți între 1800-1899
+        elif first_digit in [5, 6]:
+            century = 2000  # Născuți între 2000-2099
+        elif first_digit in [7, 8]:
+            century = 1900  # Străini rezidenți născuți între 1900-1999
+        elif first_digit == 9:
+            century = 2000  # Străini născuți între 2000-2099
+        else:
+            return None  # Cazuri speciale
+
+        year = century + int(cnp[1:3])
+        month = int(cnp[3:5])
+        day = int(cnp[5:7])
+        if month < 1 or month > 12 or day < 1 or day > 31:
+            return None
+
+        birth_date = date(year, month, day)
+        on_date = on_date or date.today()
+        age = on_date.year - birth_date.year
+        if (on_date.month, on_date.day) < (birth_date.month, birth_date.day):
+            age -= 1
+        return age
+
+    except (ValueError, TypeError):
+        return None
+
+
+def gender_from_cnp(cnp):
+    """Extrage genul din CNP: cifrele impare sunt bărbați, cele pare femei"""
+    if not cnp or len(cnp) != 13:
+        return None
+
+    try:
+        return 'M' if int(cnp[0]) % 2 == 1 else 'F'
+    except (ValueError, TypeError):
+        return None
+
+
+def age_group(age):
+    """Determină grupa de vârstă"""
+    if age is None:
+        return None
+    elif 18 <= age <= 24:
+        return '18-24'
+    elif 25 <= age <= 34:
+        return '25-34'
+    elif 35 <= age <= 44:
+        return '35-44'
+    elif 45 <= age <= 64:
+        return '45-64'
+    elif age >= 65:
+        return '65+'
+    return None
+
+
+def environment_from_address(address):
+    """Determină mediul (urban/rural) din adresă; implicit urban"""
+    if not address:
+        return None
+
+    address_lower = address.lower()
+    if any(keyword in address_lower for keyword in URBAN_KEYWORDS):
+        return 'urban'
+    if any(keyword in address_lower for keyword in RURAL_KEYWORDS):
+        return 'rural'
+    return 'urban'
+
+
+def voter_profile(cnp, address, on_date=None):
+    """
+    Returnează {dimensiune: valoare} pentru un alegător; dimensiunile care
+    nu pot fi determinate (CNP invalid, adresă lipsă) sunt omise.
+    """
+    profile = {
+        'age_group': age_group(age_from_cnp(cnp, on_date)),
+        'gender': gender_from_cnp(cnp),
+        'environment': environment_from_address(address),
+    }
+    return {dimension: value for dimension, value in profile.items() if value}
+
+
+def _increment(vote_type, dimension, value, count=1):
+    lookup = {'vote_type': vote_type, 'dimension': dimension, 'value': value}
+    if DemographicTurnoutCounter.objects.filter(**lookup).update(voters=F('voters') + count):
+        return
+    try:
+        with transaction.atomic():
+            DemographicTurnoutCounter.objects.create(**lookup, voters=count)
+    except IntegrityError:
+        DemographicTurnoutCounter.objects.filter(**lookup).update(voters=F('voters') + count)
+
+
+def record_voter_demographics(vote_type, vote, multi_vote=False):
+    """
+    Adaugă alegătorul votului în contoarele demografice ale turului.
+    La tipurile cu mai multe voturi per alegător (locale) doar primul vot contează.
+    """
+    if multi_vote and type(vote).objects.filter(user_id=vote.user_id).exclude(pk=vote.pk).exists():
+        return
+
+    user = vote.user
+    profile = voter_profile(user.cnp, user.address, vote.vote_datetime.date())
+    with transaction.atomic():
+        for dimension, value in profile.items():
+            _increment(vote_type, dimension, value)
+
+
+def get_demographic_counts(vote_type):
+    """Returnează {dimensiune: {valoare: alegători}} din contoare, într-un singur query"""
+    counts = {'age_group': {}, 'gender': {}, 'environment': {}}
+    rows = DemographicTurnoutCounter.objects.filter(vote_type=vote_type)\
+        .values_list('dimension', 'value', 'voters')
+    for dimension, value, voters in rows:
+        counts.setdefault(dimension, {})[value] = voters
+    return counts
+
+
+def _tally_voters(votes):
+    """
+    Returnează ({(dimensiune, valoare): alegători}, număr de alegători) pentru
+    voturile primite, considerând primul vot al fiecărui alegător.
+    """
+    totals = {}
+    seen_users = set()
+    rows = votes.order_by('vote_datetime')\
+        .values_list('user_id', 'user__cnp', 'user__address', 'vote_datetime')
+    for user_id, cnp, address, vote_datetime in rows.iterator(chunk_size=2000):
+        if user_id in seen_users:
+            continue
+        seen_users.add(user_id)
+        for dimension, value in voter_profile(cnp, address, vote_datetime.date()).items():
+            totals[(dimension, value)] = totals.get((dimension, value), 0) + 1
+    return totals, len(seen_users)
+
+
+def count_demographics(votes):
+    """
+    Ca get_demographic_counts, dar calculat direct din voturile primite; folosit
+    când fereastra cerută nu include toate voturile numărate de contoare.
+    """
+    counts = {'age_group': {}, 'gender': {}, 'environment': {}}
+    totals, _ = _tally_voters(votes)
+    for (dimension, value), voters in totals.items():
+        counts.setdefault(dimension, {})[value] = voters
+    return counts
+
+
+def rebuild_demographic_counters(vote_type, vote_model, counter_model=DemographicTurnoutCounter):
+    """
+    Reconstruiește contoarele demografice din tabela de voturi, considerând
+    primul vot al fiecărui alegător (migrațiile transmit modelele istorice).
+    Returnează numărul de alegători.
+    """
+    totals, voters_count = _tally_voters(vote_model.objects.all())
+
+    with transaction.atomic():
+        counter_model.objects.filter(vote_type=vote_type).delete()
+        counter_model.objects.bulk_create([
+            counter_model(vote_type=vote_type, dimension=dimension, value=value, voters=voters)
+            for (dimension, value), voters in totals.items()
+        ])
+
+    logger.info(f"Contoare demografice reconstruite pentru {vote_type}: {voters_count} alegători")
+    return voters_count
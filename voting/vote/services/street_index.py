@@ -0,0 +1,89 @@
+import logging
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text):
+    """Returnează mulțimea de trigrame ale unui text deja normalizat"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class StreetIndex:
+    """
+    Index inversat pentru numele de străzi, construit o singură dată la încărcare.
+
+    Pentru fiecare pereche (județ, UAT) păstrează numele de străzi deja
+    normalizate și un index de trigrame, astfel încât căutările parțiale
+    și aproximative ating doar străzile candidate din UAT-ul respectiv,
+    nu toate străzile din țară.
+    """
+
+    def __init__(self, street_keys, normalize):
+        self.normalize = normalize
+        # (județ, UAT) -> listă de (stradă normalizată, cheie originală, nr. trigrame)
+        self._streets = defaultdict(list)
+        # (județ, UAT) -> trigramă -> indicii străzilor care o conțin
+        self._trigrams = defaultdict(lambda: defaultdict(set))
+
+        for key in street_keys:
+            judet, uat, street = key
+            bucket = self._streets[(judet, uat)]
+            normalized = normalize(street)
+            street_trigrams = trigrams(normalized)
+            street_idx = len(bucket)
+            bucket.append((normalized, key, len(street_trigrams)))
+            for trigram in street_trigrams:
+                self._trigrams[(judet, uat)][trigram].add(street_idx)
+
+        # După construire indexul este doar citit; renunțăm la defaultdict
+        self._streets = dict(self._streets)
+        self._trigrams = {uat_key: dict(postings) for uat_key, postings in self._trigrams.items()}
+
+        logger.info(f"Index de străzi construit pentru {len(self._streets)} UAT-uri")
+
+    def find_substring(self, judet, uat, street_name):
+        """
+        Returnează cheile originale ale străzilor din UAT care conțin
+        numele căutat (după normalizare), în ordinea din dicționarul sursă
+        """
+        bucket = self._streets.get((judet, uat))
+        if not bucket:
+            return []
+
+        query = self.normalize(street_name)
+        query_trigrams = trigrams(query)
+        if query_trigrams:
+            # Doar străzile care conțin toate trigramele pot conține textul căutat
+            postings = self._trigrams[(judet, uat)]
+            candidates = set.intersection(*(postings.get(t, set()) for t in query_trigrams))
+        else:
+            # Textele foarte scurte nu au trigrame; verificăm tot UAT-ul
+            candidates = range(len(bucket))
+
+        return [bucket[idx][1] for idx in sorted(candidates) if query in bucket[idx][0]]
+
+    def find_fuzzy(self, judet, uat, street_name, min_similarity=0.5, limit=5):
+        """
+        Returnează cheile străzilor cele mai asemănătoare (similaritate
+        Jaccard pe trigrame), pentru nume scrise greșit sau incomplet
+        """
+        query_trigrams = trigrams(self.normalize(street_name))
+        bucket = self._streets.get((judet, uat))
+        if not bucket or not query_trigrams:
+            return []
+
+        postings = self._trigrams[(judet, uat)]
+        shared = Counter()
+        for trigram in query_trigrams:
+            for street_idx in postings.get(trigram, ()):
+                shared[street_idx] += 1
+
+        scored = []
+        for street_idx, common in shared.items():
+            similarity = common / (len(query_trigrams) + bucket[street_idx][2] - common)
+            if similarity >= min_similarity:
+                scored.append((-similarity, street_idx))
+
+        scored.sort()
+        return [bucket[street_idx][1] for _, street_idx in scored[:limit]]
@@ -0,0 +1,75 @@
+import math
+from datetime import timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncMinute
+
+ONE_MINUTE = timedelta(minutes=1)
+
+
+def floor_to_minute(moment):
+    """Rotunjește un moment în jos la minutul întreg"""
+    return moment.replace(second=0, microsecond=0)
+
+
+def count_by_minute(queryset, start, end, field='vote_datetime'):
+    """
+    Numără înregistrările din [start, end) grupate pe minut, într-un singur
+    query GROUP BY. Rezultatul are cel mult un rând pe minut, indiferent
+    de numărul de voturi.
+    """
+    rows = (
+        queryset
+        .filter(**{f'{field}__gte': start, f'{field}__lt': end})
+        .annotate(minute=TruncMinute(field))
+        .values('minute')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    return {row['minute']: row['count'] for row in rows}
+
+
+def bucket_counts(queryset, start, end, width, field='vote_datetime'):
+    """
+    Returnează [(început_interval, număr)] pentru intervale consecutive de
+    lățime `width` între start și end, calculate dintr-un singur query.
+
+    Numărătorile pe minut sunt agregate în intervale în Python; intervalele
+    trebuie să fie multipli de un minut.
+    """
+    bucket_count = math.ceil((end - start) / width)
+    counts = [0] * bucket_count
+
+    for minute, count in count_by_minute(queryset, start, end, field).items():
+        # Filtrul garantează start <= vot < end; dacă start nu e la minut fix,
+        # minutul rotunjit poate cădea înainte de start și intră în primul interval
+        index = min(max(int((minute - start) // width), 0), bucket_count - 1)
+        counts[index] += count
+
+    return [(start + i * width, count) for i, count in enumerate(counts)]
+
+
+def cumulative_progression(queryset, start, duration, width, field='vote_datetime'):
+    """
+    Progresia voturilor în formatul folosit de paginile de rezultate și
+    statistici: [{'time': 'HH:MM', 'votes': n, 'cumulative': total}]
+    """
+    intervals = []
+    cumulative = 0
+    for bucket_start, votes in bucket_counts(queryset, start, start + duration, width, field):
+        cumulative += votes
+        intervals.append({
+            'time': bucket_start.strftime('%H:%M'),
+            'votes': votes,
+            'cumulative': cumulative,
+        })
+    return intervals
+
+
+def last_minutes(queryset, now, minutes=30, field='vote_datetime'):
+    """
+    Voturile pe fiecare minut din ultimele `minutes` minute (inclusiv minutul
+    curent), aliniate la minute întregi: [(început_minut, număr)]
+    """
+    end = floor_to_minute(now) + ONE_MINUTE
+    return bucket_counts(queryset, end - minutes * ONE_MINUTE, end, ONE_MINUTE, field)
@@ -0,0 +1,360 @@
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from vote.models import VoteToken
+from vote.services.allow_list import normalize_email
+
+logger = logging.getLogger(__name__)
+
+TOKEN_LIFETIME = timedelta(minutes=3)
+
+
+def _unique_tokens(count):
+    """Generează `count` token-uri distincte care nu există deja în baza de date"""
+    tokens = set()
+    while len(tokens) < count:
+        candidates = {VoteToken.generate_token() for _ in range(count - len(tokens))} - tokens
+        taken = set(VoteToken.objects.filter(token__in=candidates).values_list('token', flat=True))
+        tokens |= candidates - taken
+    return list(tokens)
+
+
+def issue_vote_tokens(vote_system, emails):
+    """
+    Emite token-urile pentru lista de email-uri într-o singură tranzacție:
+    token-urile lipsă sunt create cu bulk_create, cele folosite sau expirate
+    sunt regenerate cu bulk_update, iar cele valide sunt retrimise.
+    Returnează (ID-urile token-urilor de trimis, număr de token-uri noi/regenerate).
+    """
+    emails = list(dict.fromkeys(normalize_email(email) for email in emails if normalize_email(email)))
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Cheia este adresa normalizată, ca să coincidă și cu o colare case-insensitive (MySQL)
+        existing = {
+            normalize_email(token.email): token
+            for token in VoteToken.objects.select_for_update().filter(vote_system=vote_system, email__in=emails)
+        }
+        missing = [email for email in emails if email not in existing]
+        stale = [token for token in existing.values() if not token.is_valid()]
+        fresh_tokens = iter(_unique_tokens(len(missing) + len(stale)))
+
+        VoteToken.objects.bulk_create([
+            VoteToken(
+                vote_system=vote_system, email=email, token=next(fresh_tokens),
+                expires_at=now + TOKEN_LIFETIME, delivery_status='queued', queued_at=now,
+            )
+            for email in missing
+        ], batch_size=500)
+
+        for token in stale:
+            token.token = next(fresh_tokens)
+            token.expires_at = now + TOKEN_LIFETIME
+            token.used = False
+            token.used_at = None
+
+        for token in existing.values():
+            token.delivery_status = 'queued'
+            token.delivery_error = ''
+            token.queued_at = now
+            token.sent_at = None
+
+        VoteToken.objects.bulk_update(
+            list(existing.values()),
+            ['token', 'expires_at', 'used', 'used_at', 'delivery_status', 'delivery_error', 'queued_at', 'sent_at'],
+            batch_size=500,
+        )
+
+        # bulk_create nu întoarce cheile primare pe toate bazele de date (MySQL)
+        token_ids = list(
+            VoteToken.objects.filter(vote_system=vote_system, email__in=emails).values_list('id', flat=True)
+        )
+
+    return token_ids, len(missing) + len(stale)
+
+
+def get_token_delivery_counts(vote_system):
+    """Numărul de token-uri pe stări de trimitere, dintr-un singur query grupat"""
+    counts = {'pending': 0, 'queued': 0, 'sent': 0, 'failed': 0}
+    rows = VoteToken.objects.filter(vote_system=vote_system)\
+        .values_list('delivery_status')\
+        .annotate(total=Count('id'))\
+        .order_by()
+    counts.update(dict(rows))
+    return counts
+
+
+def vote_url_for(vote_system, token):
+    """URL-ul paginii de vot din email (folosește întotdeauna IP-ul de rețea)"""
+    network_ip = getattr(settings, 'NETWORK_IP', '192.168.29.201')
+    frontend_url = f"http://{network_ip}:4200"
+    return f"{frontend_url}/vote/{vote_system.id}?token={token.token}&email={token.email}"
+
+
+def _render_fallback(vote_system, token, vote_url):
+    """Variantă de rezervă a email-ului, dacă template-urile nu pot fi randate"""
+    html_message = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Codul tău de vot pentru {vote_system.name}</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .container {{ border: 1px solid #ddd; border-radius: 5px; padding: 20px; background-color: #f9f9f9; }}
+            .header {{ text-align: center; margin-bottom: 20px; }}
+            .token {{ background-color: #e9f7fe; color: #0078d4; font-size: 24px; font-weight: bold; text-align: center; padding: 15px; margin: 20px 0; border-radius: 5px; letter-spacing: 2px; }}
+            .info {{ margin-bottom: 15px; }}
+            .footer {{ font-size: 12px; color: #777; margin-top: 30px; text-align: center; }}
+            .button {{ display: inline-block; background-color: #0078d4; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin-top: 15px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>SmartVote</h1>
+                <h2>Codul tău de vot</h2>
+            </div>
+
+            <div class="info">
+                <p>Dragă participant,</p>
+                <p>Ai fost invitat să participi la votul: <strong>{vote_system.name}</strong>.</p>
+                <p>Pentru a-ți valida votul, te rugăm să folosești codul de mai jos:</p>
+            </div>
+
+            <div class="token">
+                {token.token}
+            </div>
+
+            <div class="info">
+                <p><strong>Important:</strong> Acest cod este valabil doar pentru 3 minute și poate fi folosit o singură dată.</p>
+                <p>Expiră la: {token.expires_at.strftime('%d.%m.%Y %H:%M:%S')}</p>
+
+                <p>Pentru a vota, accesează link-ul de mai jos și introdu codul când ți se solicită:</p>
+                <div style="text-align: center;">
+                    <a href="{vote_url}" class="button">Accesează pagina de vot</a>
+                </div>
+            </div>
+
+            <div class="footer">
+                <p>Acest email a fost trimis automat. Te rugăm să nu răspunzi la acest mesaj.</p>
+                <p>&copy; 2023 SmartVote. Toate drepturile rezervate.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+    plain_message = f"""
+    SmartVote - Codul tău de vot
+
+    Dragă participant,
+
+    Ai fost invitat să participi la votul: {vote_system.name}.
+
+    Pentru a-ți valida votul, te rugăm să folosești următorul cod:
+
+    {token.token}
+
+    Important: Acest cod este valabil doar pentru 3 minute și poate fi folosit o singură dată.
+    Expiră la: {token.expires_at.strftime('%d.%m.%Y %H:%M:%S')}
+
+    Pentru a vota, accesează link-ul de mai jos și introdu codul când ți se solicită:
+    {vote_url}
+
+    Acest email a fost trimis automat. Te rugăm să nu răspunzi la acest mesaj.
+
+    © 2023 SmartVote. Toate drepturile rezervate.
+    """
+    return html_message, plain_message
+
+
+def build_token_message(token, connection=None):
+    """Construiește email-ul cu token-ul de vot (HTML + text)"""
+    vote_system = token.vote_system
+    vote_url = vote_url_for(vote_system, token)
+    context = {
+        'vote_system': vote_system,
+        'token': token.token,
+        'expires_at': token.expires_at,
+        'vote_url': vote_url,
+    }
+
+    try:
+        html_message = render_to_string('vote_token.html', context)
+        plain_message = render_to_string('vote_token_plain.txt', context)
+    except Exception as template_error:
+        logger.warning(f"Eroare la randarea template-ului pentru token: {template_error}")
+        html_message, plain_message = _render_fallback(vote_system, token, vote_url)
+
+    message = EmailMultiAlternatives(
+        subject=f"[SmartVote] Codul tău de vot pentru {vote_system.name}",
+        body=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[token.email],
+        connection=connection,
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+class VoteTokenMailer:
+    """
+    Coadă de fundal pentru email-urile cu token-uri de vot.
+
+    Firul de lucru grupează token-urile în loturi de `batch_size`, deschide o
+    singură conexiune SMTP per lot și salvează starea fiecărui destinatar
+    (sent/failed) cu un singur bulk_update per lot. În modul sincron
+    (VOTE_TOKEN_MAIL_ASYNC = False, ex. în setările de test) loturile sunt trimise direct.
+
+    Coada este în memorie: token-urile rămase 'queued' după o repornire sunt
+    repuse în coadă de requeue_stale(), la pornirea firului de lucru și la
+    interogarea stării trimiterii.
+    """
+
+    def __init__(self, batch_size=50, flush_interval=0.5, stale_after=300):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stale_after = timedelta(seconds=stale_after)
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def synchronous(self):
+        return not getattr(settings, 'VOTE_TOKEN_MAIL_ASYNC', True)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='vote-token-mailer', daemon=True)
+                self._worker.start()
+
+    def enqueue(self, token_ids):
+        """Pune în coadă token-urile (după ID) pentru trimitere"""
+        token_ids = list(token_ids)
+        if self.synchronous:
+            for start in range(0, len(token_ids), self.batch_size):
+                self.send_batch(token_ids[start:start + self.batch_size])
+            return
+
+        self._ensure_worker()
+        for token_id in token_ids:
+            self._queue.put(token_id)
+
+    def _collect_batch(self):
+        """Așteaptă primul token, apoi adună altele până la batch_size sau flush_interval"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def requeue_stale(self, vote_system=None):
+        """
+        Repune în coadă token-urile aflate în starea 'queued' de mai mult de
+        stale_after (procesul care le avea în coadă a fost repornit sau firul
+        s-a oprit). Fiecare token este revendicat condiționat, astfel încât
+        un singur proces îl preia. Returnează numărul de token-uri repuse.
+        """
+        now = timezone.now()
+        stale = VoteToken.objects.filter(delivery_status='queued')\
+            .filter(Q(queued_at__lt=now - self.stale_after) | Q(queued_at__isnull=True))
+        if vote_system is not None:
+            stale = stale.filter(vote_system=vote_system)
+
+        claimed = [
+            token_id for token_id, queued_at in stale.values_list('id', 'queued_at')
+            if VoteToken.objects.filter(pk=token_id, delivery_status='queued', queued_at=queued_at)
+            .update(queued_at=now)
+        ]
+        if claimed:
+            logger.warning(f"Token-uri rămase în coadă repuse pentru trimitere: {len(claimed)}")
+            self.enqueue(claimed)
+        return len(claimed)
+
+    def _run(self):
+        # Token-urile rămase în coadă de la o rulare anterioară a procesului
+        close_old_connections()
+        try:
+            self.requeue_stale()
+        except Exception as e:
+            logger.error(f"Eroare la reluarea token-urilor rămase în coadă: {e}")
+
+        while True:
+            batch = self._collect_batch()
+            close_old_connections()
+            try:
+                self.send_batch(batch)
+            except Exception as e:
+                logger.error(f"Eroare la trimiterea lotului de token-uri ({len(batch)}): {e}")
+
+    def send_batch(self, token_ids):
+        """Trimite un lot pe o singură conexiune SMTP; returnează numărul de email-uri trimise"""
+        tokens = list(
+            VoteToken.objects.filter(pk__in=token_ids, delivery_status='queued').select_related('vote_system')
+        )
+        if not tokens:
+            return 0
+
+        sent = 0
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for token in tokens:
+                try:
+                    # Durata de valabilitate pornește la trimitere, nu la emitere:
+                    # email-urile din coadă pot pleca după câteva minute
+                    token.expires_at = timezone.now() + TOKEN_LIFETIME
+                    build_token_message(token, connection=connection).send()
+                    token.delivery_status = 'sent'
+                    token.delivery_error = ''
+                    token.sent_at = timezone.now()
+                    sent += 1
+                except Exception as e:
+                    logger.error(f"Eroare la trimiterea email-ului către {token.email}: {e}")
+                    token.delivery_status = 'failed'
+                    token.delivery_error = str(e)[:500]
+        except Exception as e:
+            # Conexiunea nu a putut fi deschisă: tot lotul este marcat ca eșuat
+            logger.error(f"Eroare la conectarea la serverul de email: {e}")
+            for token in tokens:
+                if token.delivery_status == 'queued':
+                    token.delivery_status = 'failed'
+                    token.delivery_error = str(e)[:500]
+        finally:
+            connection.close()
+
+        VoteToken.objects.bulk_update(tokens, ['expires_at', 'delivery_status', 'delivery_error', 'sent_at'])
+        logger.info(f"Lot de token-uri trimis: {sent}/{len(tokens)} email-uri")
+        return sent
+
+    def get_stats(self):
+        return {'pending': self._queue.qsize(), 'synchronous': self.synchronous}
+
+
+vote_token_mailer = VoteTokenMailer(
+    batch_size=getattr(settings, 'VOTE_TOKEN_MAIL_BATCH_SIZE', 50),
+    flush_interval=getattr(settings, 'VOTE_TOKEN_MAIL_FLUSH_INTERVAL', 0.5),
+    stale_after=getattr(settings, 'VOTE_TOKEN_MAIL_STALE_AFTER', 300),
+)
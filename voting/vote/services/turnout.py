@@ -0,0 +1,257 @@
+import logging
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Sum
+
+from vote.models import (
+    VotingSection, LocalVote, PresidentialVote, PresidentialRound2Vote, ParliamentaryVote,
+    CountyTurnoutCounter, SectionTurnoutCounter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tabela de voturi corespunzătoare fiecărui tip de vot
+VOTE_MODELS = {
+    'locale': LocalVote,
+    'prezidentiale': PresidentialVote,
+    'prezidentiale_tur2': PresidentialRound2Vote,
+    'parlamentare': ParliamentaryVote,
+}
+
+# La alegerile locale un utilizator votează pentru mai multe poziții,
+# deci un vot nou nu înseamnă neapărat un alegător nou
+MULTI_VOTE_TYPES = {'locale'}
+
+POLLING_STATIONS_CACHE_KEY = 'turnout:polling_station_counts'
+POLLING_STATIONS_CACHE_TTL = 600  # secțiile de votare se modifică foarte rar
+
+UAT_TURNOUT_CACHE_TTL = 15  # frontend-ul interoghează la 10 secunde
+
+# Denumirea județelor după codul auto folosit în VotingSection.county și în
+# contoarele pe județe; prezența istorică și exporturile folosesc denumirea
+COUNTY_NAMES = {
+    'AB': 'Alba', 'AR': 'Arad', 'AG': 'Argeș', 'BC': 'Bacău', 'BH': 'Bihor',
+    'BN': 'Bistrița-Năsăud', 'BT': 'Botoșani', 'BR': 'Brăila', 'BV': 'Brașov',
+    'B': 'București', 'BZ': 'Buzău', 'CL': 'Călărași', 'CS': 'Caraș-Severin',
+    'CJ': 'Cluj', 'CT': 'Constanța', 'CV': 'Covasna', 'DB': 'Dâmbovița', 'DJ': 'Dolj',
+    'GL': 'Galați', 'GR': 'Giurgiu', 'GJ': 'Gorj', 'HR': 'Harghita', 'HD': 'Hunedoara',
+    'IL': 'Ialomița', 'IS': 'Iași', 'IF': 'Ilfov', 'MM': 'Maramureș', 'MH': 'Mehedinți',
+    'MS': 'Mureș', 'NT': 'Neamț', 'OT': 'Olt', 'PH': 'Prahova', 'SJ': 'Sălaj',
+    'SM': 'Satu Mare', 'SB': 'Sibiu', 'SV': 'Suceava', 'TR': 'Teleorman', 'TM': 'Timiș',
+    'TL': 'Tulcea', 'VL': 'Vâlcea', 'VS': 'Vaslui', 'VN': 'Vrancea',
+}
+
+
+def get_county_name(county):
+    """Returnează denumirea județului pentru un cod auto; altfel valoarea primită"""
+    return COUNTY_NAMES.get(county, county)
+
+
+def get_vote_type_for_model(model):
+    """Returnează tipul de vot asociat unei clase de vot"""
+    for vote_type, vote_model in VOTE_MODELS.items():
+        if vote_model is model:
+            return vote_type
+    return None
+
+
+def _increment(counter_model, lookup, defaults, votes, voters):
+    """Incrementează atomic un contor, creându-l dacă nu există încă"""
+    increments = {
+        'total_votes': F('total_votes') + votes,
+        'unique_voters': F('unique_voters') + voters,
+    }
+    if counter_model.objects.filter(**lookup).update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            counter_model.objects.create(
+                **lookup, **defaults, total_votes=votes, unique_voters=voters
+            )
+    except IntegrityError:
+        # Alt request a creat contorul între timp
+        counter_model.objects.filter(**lookup).update(**increments)
+
+
+def record_vote(vote_type, vote):
+    """
+    Actualizează contoarele de prezență pentru un vot nou înregistrat.
+    Se execută în aceeași tranzacție cu inserarea votului.
+    """
+    section = vote.voting_section
+    if section is None:
+        return
+
+    vote_model = type(vote)
+    with transaction.atomic():
+        new_section_voter = new_county_voter = 1
+        if vote_type in MULTI_VOTE_TYPES:
+            previous_votes = vote_model.objects.filter(user_id=vote.user_id).exclude(pk=vote.pk)
+            new_section_voter = int(not previous_votes.filter(voting_section_id=section.id).exists())
+            # Un alegător deja numărat în secție este deja numărat și în județ
+            new_county_voter = new_section_voter and int(
+                not previous_votes.filter(voting_section__county=section.county).exists()
+            )
+
+        _increment(
+            SectionTurnoutCounter,
+            {'vote_type': vote_type, 'voting_section': section},
+            {'county': section.county, 'city': section.city},
+            1, new_section_voter
+        )
+        _increment(
+            CountyTurnoutCounter,
+            {'vote_type': vote_type, 'county': section.county},
+            {},
+            1, new_county_voter
+        )
+
+
+def get_county_turnout(vote_type):
+    """Returnează {județ: {'total_votes', 'unique_voters'}} din contoare"""
+    counters = CountyTurnoutCounter.objects.filter(vote_type=vote_type)\
+        .values_list('county', 'total_votes', 'unique_voters')
+    return {
+        county: {'total_votes': total_votes, 'unique_voters': unique_voters}
+        for county, total_votes, unique_voters in counters
+    }
+
+
+def get_polling_station_counts():
+    """Numărul de secții de votare per județ, păstrat în cache"""
+    counts = cache.get(POLLING_STATIONS_CACHE_KEY)
+    if counts is None:
+        counts = dict(
+            VotingSection.objects.values_list('county')
+            .annotate(station_count=Count('id'))
+            .order_by('county')
+        )
+        cache.set(POLLING_STATIONS_CACHE_KEY, counts, POLLING_STATIONS_CACHE_TTL)
+    return counts
+
+
+def normalize_city_key(city):
+    """Cheia normalizată după care sunt grupate UAT-urile unui județ"""
+    return (city or '').lower()
+
+
+def get_uat_turnout(vote_type, county_code):
+    """
+    Returnează statisticile per UAT pentru un județ, calculate din două
+    interogări grupate (secții per localitate și voturi per localitate).
+    Rezultatul este păstrat în cache pentru (tur, județ) pe o durată scurtă.
+    Returnează None dacă județul nu are secții de votare.
+    """
+    cache_key = f'turnout:uat:{vote_type}:{county_code}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    # Secțiile per localitate; același UAT poate apărea scris diferit (majuscule)
+    uats = {}
+    section_rows = VotingSection.objects.filter(county__iexact=county_code)\
+        .values('city')\
+        .annotate(station_count=Count('id'), first_id=Min('id'))\
+        .order_by('first_id')
+    for row in section_rows:
+        uat = uats.setdefault(normalize_city_key(row['city']), {
+            'name': row['city'],  # Păstrăm formatul primei secții întâlnite
+            'station_count': 0,
+            'votes': 0,
+        })
+        uat['station_count'] += row['station_count']
+
+    if not uats:
+        return None
+
+    vote_rows = SectionTurnoutCounter.objects.filter(vote_type=vote_type, county__iexact=county_code)\
+        .values('city')\
+        .annotate(votes=Sum('total_votes'))\
+        .order_by()
+    for row in vote_rows:
+        uat = uats.get(normalize_city_key(row['city']))
+        if uat:
+            uat['votes'] += row['votes']
+
+    result = {}
+    for uat_key, uat in uats.items():
+        # Calculăm numărul de alegători înregistrați (simulat: 1000 de alegători per secție)
+        registered_voters = uat['station_count'] * 1000
+        uat_data = {
+            'name': uat['name'],
+            'code': f'{county_code}-{uat["name"].replace(" ", "_")}',
+            'countyCode': county_code,
+            'registeredVoters': registered_voters,
+            'pollingStationCount': uat['station_count'],
+            'permanentListVoters': uat['votes'],  # Număr de voturi
+            'supplementaryListVoters': 0,
+            'specialCircumstancesVoters': 0,
+            'mobileUrnsVoters': 0,
+            'totalVoters': uat['votes'],
+            'turnoutPercentage': f"{(uat['votes'] / registered_voters * 100) if registered_voters > 0 else 0:.2f}"
+        }
+        result[uat_data['code']] = uat_data
+
+        # Adăugăm și o variantă normalizată pentru frontend
+        normalized_code = f'{county_code}-{uat_key.replace(" ", "_")}'
+        if normalized_code != uat_data['code']:
+            result[normalized_code] = uat_data.copy()
+
+    cache.set(cache_key, result, UAT_TURNOUT_CACHE_TTL)
+    return result
+
+
+def rebuild_turnout_counters(vote_type, vote_model=None, section_counter_model=SectionTurnoutCounter,
+                             county_counter_model=CountyTurnoutCounter):
+    """
+    Reconstruiește contoarele pentru un tip de vot direct din tabela de voturi.
+    Migrațiile transmit modelele istorice în locul celor curente.
+    Returnează numărul de contoare (secții, județe) create.
+    """
+    vote_model = vote_model or VOTE_MODELS[vote_type]
+    votes = vote_model.objects.filter(voting_section__isnull=False)
+
+    section_rows = votes.values(
+        'voting_section_id', 'voting_section__county', 'voting_section__city'
+    ).annotate(
+        total_votes=Count('id'),
+        unique_voters=Count('user', distinct=True)
+    ).order_by()
+
+    county_rows = votes.values('voting_section__county').annotate(
+        total_votes=Count('id'),
+        unique_voters=Count('user', distinct=True)
+    ).order_by()
+
+    with transaction.atomic():
+        section_counter_model.objects.filter(vote_type=vote_type).delete()
+        county_counter_model.objects.filter(vote_type=vote_type).delete()
+
+        section_counters = section_counter_model.objects.bulk_create([
+            section_counter_model(
+                vote_type=vote_type,
+                voting_section_id=row['voting_section_id'],
+                county=row['voting_section__county'],
+                city=row['voting_section__city'],
+                total_votes=row['total_votes'],
+                unique_voters=row['unique_voters'],
+            )
+            for row in section_rows
+        ], batch_size=1000)
+
+        county_counters = county_counter_model.objects.bulk_create([
+            county_counter_model(
+                vote_type=vote_type,
+                county=row['voting_section__county'],
+                total_votes=row['total_votes'],
+                unique_voters=row['unique_voters'],
+            )
+            for row in county_rows
+        ], batch_size=1000)
+
+    logger.info(
+        f"Contoare de prezență reconstruite pentru {vote_type}: "
+        f"{len(section_counters)} secții, {len(county_counters)} județe"
+    )
+    return len(section_counters), len(county_counters)
@@ -0,0 +1,68 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from vote.models import VoteSystem, VoteOption, VoteCast
+
+logger = logging.getLogger(__name__)
+
+
+def record_vote_cast(vote, delta=1):
+    """
+    Actualizează atomic contoarele opțiunii și ale sistemului pentru un vot
+    adăugat (delta=1) sau șters (delta=-1), cu UPDATE ... SET x = x + delta.
+    """
+    options = VoteOption.objects.filter(pk=vote.option_id)
+    systems = VoteSystem.objects.filter(pk=vote.vote_system_id)
+    if delta < 0:
+        # Contoarele desincronizate nu trebuie să ajungă negative
+        options = options.filter(votes_count__gte=-delta)
+        systems = systems.filter(total_votes__gte=-delta)
+
+    with transaction.atomic():
+        options.update(votes_count=F('votes_count') + delta)
+        systems.update(total_votes=F('total_votes') + delta)
+
+
+def verify_vote_counters(vote_system_id=None, fix=False):
+    """
+    Compară contoarele denormalizate cu numărătorile din tabela VoteCast.
+    Returnează lista diferențelor [(model, id, stocat, real)]; cu fix=True
+    contoarele greșite sunt corectate.
+    """
+    votes = VoteCast.objects.all()
+    options = VoteOption.objects.all()
+    systems = VoteSystem.objects.all()
+    if vote_system_id is not None:
+        votes = votes.filter(vote_system_id=vote_system_id)
+        options = options.filter(vote_system_id=vote_system_id)
+        systems = systems.filter(pk=vote_system_id)
+
+    option_counts = dict(votes.values_list('option_id').annotate(total=Count('id')).order_by())
+    system_counts = dict(votes.values_list('vote_system_id').annotate(total=Count('id')).order_by())
+
+    mismatches = []
+    wrong_options = []
+    for option in options.only('id', 'votes_count'):
+        actual = option_counts.get(option.id, 0)
+        if option.votes_count != actual:
+            mismatches.append(('VoteOption', option.id, option.votes_count, actual))
+            option.votes_count = actual
+            wrong_options.append(option)
+
+    wrong_systems = []
+    for system in systems.only('id', 'total_votes'):
+        actual = system_counts.get(system.id, 0)
+        if system.total_votes != actual:
+            mismatches.append(('VoteSystem', system.id, system.total_votes, actual))
+            system.total_votes = actual
+            wrong_systems.append(system)
+
+    if fix and mismatches:
+        with transaction.atomic():
+            VoteOption.objects.bulk_update(wrong_options, ['votes_count'], batch_size=500)
+            VoteSystem.objects.bulk_update(wrong_systems, ['total_votes'], batch_size=500)
+        logger.info(f"Contoare de voturi corectate: {len(wrong_options)} opțiuni, {len(wrong_systems)} sisteme")
+
+    return mismatches
@@ -3,12 +3,17 @@ import re
 import pickle
 import numpy as np
 from django.conf import settings
-import tensorflow as tf
 import logging
+from .services.street_index import StreetIndex
+from core.inference_batcher import MicroBatcher
 
 # Configurăm logging pentru a urmări mai ușor problemele
 logger = logging.getLogger(__name__)
 
+# Similaritatea minimă (Jaccard pe trigrame) pentru care potrivirea aproximativă
+# a străzii are prioritate față de modelul ML
+STRICT_FUZZY_SIMILARITY = 0.8
+
 class VotingSectionAIService:
     """
     Serviciu pentru recomandarea secțiilor de votare folosind AI
@@ -66,7 +71,18 @@ class VotingSectionAIService:
                     self.using_normalization = False
                     logger.info("S-a încărcat dicționarul vechi street_to_section.pkl")
                 
+            # Prima secție din fiecare (județ, UAT), pentru fallback-ul fără căutare liniară
+            self.uat_first_section = {}
+            for details in self.section_details.values():
+                self.uat_first_section.setdefault((details['JUDET'], details['UAT']), details)
+            
+            # Indexul de străzi pentru potrivirea parțială și aproximativă
+            if hasattr(self, 'street_to_section_map'):
+                self.street_index = StreetIndex(self.street_to_section_map.keys(), self.normalize_street)
+                
             # Încărcăm modelul TensorFlow - Încercăm toate metodele posibile
+            # (import lazy: serviciul este construit de model_manager la prima cerere)
+            import tensorflow as tf
             try:
                 # Prima încercare: formatul .keras
                 keras_path = os.path.join(model_dir, 'voting_section_model.keras')
@@ -96,11 +112,44 @@ class VotingSectionAIService:
             if not hasattr(self, 'model') or self.model is None:
                 logger.warning("AVERTISMENT: Modelul nu a fost încărcat, vom folosi doar căutarea directă")
                 self.model_loaded = False
+            else:
+                # Cererile concurente sunt grupate într-o singură inferență batch
+                self.batcher = MicroBatcher(self.predict_batch)
             
         except Exception as e:
             logger.error(f"Eroare la încărcarea componentelor: {e}")
             self.model_loaded = False
     
+    def predict_batch(self, batch):
+        """
+        Rulează modelul pe o matrice sparse (n_cereri x n_caracteristici) și
+        returnează indicele de clasă codificat pentru fiecare rând.
+        Modelul are o intrare densă, așa că matricea este densificată o singură
+        dată pentru tot batch-ul, direct din scipy.
+        """
+        dense_input = batch.toarray().astype(np.float32, copy=False)
+        
+        # Apelul direct evită overhead-ul lui predict() pentru batch-uri mici
+        if hasattr(self.model, 'predict'):
+            output = self.model(dense_input, training=False)
+        else:
+            output = self.model(dense_input)
+        output = np.asarray(output).reshape(batch.shape[0], -1)
+        
+        if self.is_categorical:
+            predictions = np.argmax(output, axis=1)
+        else:
+            predictions = np.rint(output[:, 0]).astype(int)
+        
+        # Ne asigurăm că predicțiile sunt în intervalul valid
+        return np.clip(predictions, 0, len(self.label_encoder.classes_) - 1)
+    
+    def get_inference_metrics(self):
+        """Statisticile de batch și latență pentru modelul ML"""
+        if not hasattr(self, 'batcher'):
+            return {'model_loaded': False}
+        return {'model_loaded': True, **self.batcher.get_metrics()}
+    
     def normalize_street(self, street_name):
         """Normalizează numele străzii pentru a face potrivirea mai robustă"""
         if not street_name:
@@ -325,82 +374,20 @@ class VotingSectionAIService:
                                         }
                                     }
                 
-                # 1.3 A treia încercare: potrivire parțială
-                if hasattr(self, 'street_to_section_map'):
-                    normalized_street_name = self.normalize_street(street_name)
-                    matching_sections = []
-                    matching_streets = set()  # Pentru a evita duplicate
+                # 1.3 A treia încercare: potrivire parțială, apoi aproximativă strictă (prin indexul de străzi).
+                # Potrivirile aproximative mai slabe sunt încercate abia după modelul ML (pasul 2.1)
+                if hasattr(self, 'street_index'):
+                    match_method = 'direct_lookup_partial'
+                    matching_keys = self.street_index.find_substring(judet, uat, street_name)
+                    if not matching_keys:
+                        match_method = 'direct_lookup_fuzzy'
+                        matching_keys = self.street_index.find_fuzzy(
+                            judet, uat, street_name, min_similarity=STRICT_FUZZY_SIMILARITY
+                        )
 
-                    for original_key in self.street_to_section_map.keys():
-                        if (original_key[0] == judet and 
-                            original_key[1] == uat and 
-                            normalized_street_name in self.normalize_street(original_key[2])):
-                            
-                            matching_streets.add(original_key[2])
-                            sections = self.street_to_section_map[original_key]
-                            for section in sections:
-                                matching_sections.append({
-                                    'street': original_key[2],
-                                    'section_id': section['NR_SV'],
-                                    'name': section.get('SEDIU_SV', 'Necunoscut'),
-                                    'address': section.get('ADRESA_SV', 'Adresa nu este disponibilă'),
-                                    'address_desc': section.get('ADRESA_SV_DESCRIPTIVA', ''),
-                                    'locality': section.get('LOCALITATE_COMPONENTA', '')
-                                })
-                    
-                    if matching_sections:
-                        # Dacă am găsit mai multe secții potrivite
-                        if len(matching_sections) > 1:
-                            # Dacă s-a specificat o selecție, returnăm secția selectată
-                            if section_selection is not None and 0 <= section_selection < len(matching_sections):
-                                section_data = matching_sections[section_selection]
-                                logger.info(f"Secție selectată manual (parțial): {section_data.get('name')}")
-                                return {
-                                    'success': True,
-                                    'method': 'direct_lookup_partial_selected',
-                                    'section': {
-                                        'section_id': section_data['section_id'],
-                                        'county': judet,
-                                        'city': uat,
-                                        'name': section_data.get('name', 'Necunoscut'),
-                                        'address': section_data.get('address', 'Adresa nu este disponibilă'),
-                                        'address_desc': section_data.get('address_desc', ''),
-                                        'locality': section_data.get('locality', ''),
-                                        'matched_street': section_data.get('street', '')
-                                    }
-                                }
-                            else:
-                                # Returnăm toate secțiile pentru ca utilizatorul să aleagă
-                                logger.info(f"S-au găsit {len(matching_sections)} secții pentru potrivire parțială, străzi: {', '.join(list(matching_streets)[:3])}")
-                                # Adăugăm indexul pentru fiecare secție
-                                for idx, section in enumerate(matching_sections):
-                                    section['index'] = idx
-                                
-                                return {
-                                    'success': True,
-                                    'method': 'direct_lookup_partial_multiple',
-                                    'multiple_sections': True,
-                                    'sections': matching_sections,
-                                    'street': f"Potriviri parțiale pentru '{street_name}'"
-                                }
-                        else:
-                            # Returnăm singura secție găsită
-                            section_data = matching_sections[0]
-                            logger.info(f"Secție găsită prin potrivire parțială: {section_data['name']} (pentru {section_data['street']})")
-                            return {
-                                'success': True,
-                                'method': 'direct_lookup_partial',
-                                'section': {
-                                    'section_id': section_data['section_id'],
-                                    'county': judet,
-                                    'city': uat,
-                                    'name': section_data.get('name', 'Necunoscut'),
-                                    'address': section_data.get('address', 'Adresa nu este disponibilă'),
-                                    'address_desc': section_data.get('address_desc', ''),
-                                    'locality': section_data.get('locality', ''),
-                                    'matched_street': section_data.get('street', '')
-                                }
-                            }
+                    result = self.street_match_result(judet, uat, street_name, matching_keys, match_method, section_selection)
+                    if result:
+                        return result
                 
                 # 1.4 Fallback la metoda veche
                 if hasattr(self, 'street_to_section') and not hasattr(self, 'street_to_section_map'):
@@ -425,25 +412,8 @@ class VotingSectionAIService:
                     # Aplicăm aceiași indici de caracteristici utilizați în antrenare
                     input_vec_small = input_vec[:, self.feature_indices]
                     
-                    # Facem predicția
-                    if self.is_categorical:
-                        prediction_probs = self.model.predict(input_vec_small.toarray())[0]
-                        prediction_encoded = np.argmax(prediction_probs)
-                    else:
-                        # Pentru formatul SavedModel sau regresie
-                        if hasattr(self.model, 'predict'):
-                            prediction_raw = self.model.predict(input_vec_small.toarray())[0]
-                            if isinstance(prediction_raw, np.ndarray) and len(prediction_raw.shape) > 0:
-                                prediction_encoded = int(round(prediction_raw[0]))
-                            else:
-                                prediction_encoded = int(round(prediction_raw))
-                        else:
-                            # Dacă modelul e SavedModel și nu are predict
-                            prediction_raw = self.model(tf.convert_to_tensor(input_vec_small.toarray(), dtype=tf.float32))
-                            prediction_encoded = int(round(prediction_raw.numpy()[0][0]))
-                    
-                    # Ne asigurăm că predicția este în intervalul valid
-                    prediction_encoded = max(0, min(prediction_encoded, len(self.label_encoder.classes_) - 1))
+                    # Facem predicția (rândul sparse este grupat cu cererile concurente)
+                    prediction_encoded = int(self.batcher.predict(input_vec_small))
                     
                     # Decodificăm rezultatul
                     section_id = self.label_encoder.inverse_transform([prediction_encoded])[0]
@@ -469,24 +439,33 @@ class VotingSectionAIService:
                     logger.error(f"Eroare la utilizarea modelului ML: {model_error}")
                     # Continuăm cu fallback
             
+            # 2.1 Potrivire aproximativă mai permisivă, doar dacă modelul ML nu a găsit secția
+            if street_name and hasattr(self, 'street_index'):
+                matching_keys = self.street_index.find_fuzzy(judet, uat, street_name)
+                result = self.street_match_result(
+                    judet, uat, street_name, matching_keys, 'direct_lookup_fuzzy', section_selection
+                )
+                if result:
+                    return result
+            
             # 3. Fallback - returnăm o secție din UAT-ul potrivit
             logger.info("Încercare cu metoda fallback...")
-            for section_id, details in self.section_details.items():
-                if details['JUDET'] == judet and details['UAT'] == uat:
-                    logger.info(f"Secție găsită prin fallback: {details.get('SEDIU_SV')}")
-                    return {
-                        'success': True,
-                        'method': 'fallback',
-                        'section': {
-                            'section_id': details['NR_SV'],
-                            'county': details['JUDET'],
-                            'city': details['UAT'],
-                            'name': details.get('SEDIU_SV', 'Necunoscut'),
-                            'address': details.get('ADRESA_SV', 'Adresa nu este disponibilă'),
-                            'address_desc': details.get('ADRESA_SV_DESCRIPTIVA', ''),
-                            'locality': details.get('LOCALITATE_COMPONENTA', '')
-                        }
+            details = getattr(self, 'uat_first_section', {}).get((judet, uat))
+            if details:
+                logger.info(f"Secție găsită prin fallback: {details.get('SEDIU_SV')}")
+                return {
+                    'success': True,
+                    'method': 'fallback',
+                    'section': {
+                        'section_id': details['NR_SV'],
+                        'county': details['JUDET'],
+                        'city': details['UAT'],
+                        'name': details.get('SEDIU_SV', 'Necunoscut'),
+                        'address': details.get('ADRESA_SV', 'Adresa nu este disponibilă'),
+                        'address_desc': details.get('ADRESA_SV_DESCRIPTIVA', ''),
+                        'locality': details.get('LOCALITATE_COMPONENTA', '')
                     }
+                }
             
             # Nu am găsit nicio secție potrivită
             logger.warning(f"Nu s-a găsit nicio secție pentru {judet}, {uat}")
@@ -502,6 +481,84 @@ class VotingSectionAIService:
                 'message': f'Eroare la recomandarea secției de votare: {str(e)}'
             }
     
+    def street_match_result(self, judet, uat, street_name, matching_keys, match_method, section_selection=None):
+        """
+        Construiește răspunsul pentru străzile găsite prin indexul de străzi:
+        o singură secție, secția selectată sau lista secțiilor de ales.
+        Returnează None dacă nu există nicio potrivire.
+        """
+        matching_sections = []
+        matching_streets = set()  # Pentru a evita duplicate
+        
+        for original_key in matching_keys:
+            matching_streets.add(original_key[2])
+            sections = self.street_to_section_map[original_key]
+            for section in sections:
+                matching_sections.append({
+                    'street': original_key[2],
+                    'section_id': section['NR_SV'],
+                    'name': section.get('SEDIU_SV', 'Necunoscut'),
+                    'address': section.get('ADRESA_SV', 'Adresa nu este disponibilă'),
+                    'address_desc': section.get('ADRESA_SV_DESCRIPTIVA', ''),
+                    'locality': section.get('LOCALITATE_COMPONENTA', '')
+                })
+        
+        if matching_sections:
+            # Dacă am găsit mai multe secții potrivite
+            if len(matching_sections) > 1:
+                # Dacă s-a specificat o selecție, returnăm secția selectată
+                if section_selection is not None and 0 <= section_selection < len(matching_sections):
+                    section_data = matching_sections[section_selection]
+                    logger.info(f"Secție selectată manual (parțial): {section_data.get('name')}")
+                    return {
+                        'success': True,
+                        'method': f'{match_method}_selected',
+                        'section': {
+                            'section_id': section_data['section_id'],
+                            'county': judet,
+                            'city': uat,
+                            'name': section_data.get('name', 'Necunoscut'),
+                            'address': section_data.get('address', 'Adresa nu este disponibilă'),
+                            'address_desc': section_data.get('address_desc', ''),
+                            'locality': section_data.get('locality', ''),
+                            'matched_street': section_data.get('street', '')
+                        }
+                    }
+                else:
+                    # Returnăm toate secțiile pentru ca utilizatorul să aleagă
+                    logger.info(f"S-au găsit {len(matching_sections)} secții pentru potrivire parțială, străzi: {', '.join(list(matching_streets)[:3])}")
+                    # Adăugăm indexul pentru fiecare secție
+                    for idx, section in enumerate(matching_sections):
+                        section['index'] = idx
+                    
+                    return {
+                        'success': True,
+                        'method': f'{match_method}_multiple',
+                        'multiple_sections': True,
+                        'sections': matching_sections,
+                        'street': f"Potriviri parțiale pentru '{street_name}'"
+                    }
+            else:
+                # Returnăm singura secție găsită
+                section_data = matching_sections[0]
+                logger.info(f"Secție găsită prin potrivire parțială: {section_data['name']} (pentru {section_data['street']})")
+                return {
+                    'success': True,
+                    'method': match_method,
+                    'section': {
+                        'section_id': section_data['section_id'],
+                        'county': judet,
+                        'city': uat,
+                        'name': section_data.get('name', 'Necunoscut'),
+                        'address': section_data.get('address', 'Adresa nu este disponibilă'),
+                        'address_desc': section_data.get('address_desc', ''),
+                        'locality': section_data.get('locality', ''),
+                        'matched_street': section_data.get('street', '')
+                    }
+                }
+        
+        return None
+    
     def direct_lookup_old(self, judet, uat, artera):
         """
         Metoda veche de căutare directă în dicționar
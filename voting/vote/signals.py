@@ -0,0 +1,54 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+import logging
+
+from .models import LocalVote, PresidentialVote, PresidentialRound2Vote, ParliamentaryVote, VoteCast
+from .services.turnout import MULTI_VOTE_TYPES, record_vote, get_vote_type_for_model
+from .services.demographics import record_voter_demographics
+from .services.vote_counters import record_vote_cast
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=LocalVote)
+@receiver(post_save, sender=PresidentialVote)
+@receiver(post_save, sender=PresidentialRound2Vote)
+@receiver(post_save, sender=ParliamentaryVote)
+def update_turnout_counters(sender, instance, created, **kwargs):
+    """Actualizează contoarele de prezență la înregistrarea unui vot nou"""
+    if not created or kwargs.get('raw'):
+        return
+
+    vote_type = get_vote_type_for_model(sender)
+    try:
+        record_vote(vote_type, instance)
+    except Exception as e:
+        # Contoarele pot fi reconstruite oricând, votul nu trebuie să eșueze din cauza lor
+        logger.error(f"Eroare la actualizarea contoarelor de prezență pentru votul {instance.pk}: {e}")
+
+    try:
+        record_voter_demographics(vote_type, instance, multi_vote=vote_type in MULTI_VOTE_TYPES)
+    except Exception as e:
+        logger.error(f"Eroare la actualizarea contoarelor demografice pentru votul {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=VoteCast)
+def increment_vote_cast_counters(sender, instance, created, **kwargs):
+    """Incrementează contoarele opțiunii și sistemului la un vot nou"""
+    if not created or kwargs.get('raw'):
+        return
+
+    try:
+        record_vote_cast(instance)
+    except Exception as e:
+        # Contoarele pot fi verificate și corectate cu `verify_vote_counters --fix`
+        logger.error(f"Eroare la actualizarea contoarelor pentru votul {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=VoteCast)
+def decrement_vote_cast_counters(sender, instance, **kwargs):
+    """Decrementează contoarele opțiunii și sistemului la ștergerea unui vot"""
+    try:
+        record_vote_cast(instance, delta=-1)
+    except Exception as e:
+        logger.error(f"Eroare la actualizarea contoarelor pentru votul șters {instance.pk}: {e}")
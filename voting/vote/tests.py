@@ -1,3 +1,455 @@
-from django.test import TestCase
+import importlib
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+import numpy as np
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+
+from .models import (
+    VotingSection, LocalCandidate, LocalVote, PresidentialCandidate, PresidentialVote,
+    CountyTurnoutCounter, SectionTurnoutCounter, DemographicTurnoutCounter,
+    VoteSystem, VoteOption, VoteCast, VoteToken, AllowedVoterEmail,
+)
+from .serializers import VoteSystemSerializer
+from .services.turnout import get_county_turnout, get_uat_turnout, rebuild_turnout_counters
+from .services.street_index import StreetIndex
+from .services_old import VotingSectionAIService
+from .services.time_buckets import bucket_counts, cumulative_progression, last_minutes
+from .services.demographics import get_demographic_counts, rebuild_demographic_counters
+from .services.vote_counters import verify_vote_counters
+from .services.token_mailer import VoteTokenMailer, issue_vote_tokens, get_token_delivery_counts
+from .services.allow_list import (
+    add_allowed_emails, emails_from_csv, get_allowed_emails, is_email_allowed, replace_allowed_emails,
+)
+
+User = get_user_model()
+
+
+class TurnoutCountersTestCase(TestCase):
+    """Teste pentru contoarele de prezență actualizate la vot"""
+
+    def setUp(self):
+        cache.clear()
+        self.section_1 = VotingSection.objects.create(
+            section_id='1', name='Școala 1', address='Str. A', city='Ploiești', county='PH'
+        )
+        self.section_2 = VotingSection.objects.create(
+            section_id='2', name='Școala 2', address='Str. B', city='Câmpina', county='PH'
+        )
+        self.mayor = LocalCandidate.objects.create(
+            name='Ion', party='P1', position='mayor', county='PH', city='Ploiești'
+        )
+        self.councilor = LocalCandidate.objects.create(
+            name='Ana', party='P2', position='councilor', county='PH', city='Ploiești'
+        )
+        self.president = PresidentialCandidate.objects.create(name='Maria', party='P3')
+        self.users = [
+            User.objects.create(email=f'user{i}@example.com', cnp=f'100000000000{i}')
+            for i in range(3)
+        ]
+
+    def test_local_votes_count_unique_voters_once(self):
+        LocalVote.objects.create(user=self.users[0], candidate=self.mayor, voting_section=self.section_1)
+        LocalVote.objects.create(user=self.users[0], candidate=self.councilor, voting_section=self.section_1)
+        LocalVote.objects.create(user=self.users[1], candidate=self.mayor, voting_section=self.section_2)
+
+        self.assertEqual(
+            get_county_turnout('locale'),
+            {'PH': {'total_votes': 3, 'unique_voters': 2}}
+        )
+        section_counter = SectionTurnoutCounter.objects.get(vote_type='locale', voting_section=self.section_1)
+        self.assertEqual(section_counter.total_votes, 2)
+        self.assertEqual(section_counter.unique_voters, 1)
+        self.assertEqual(section_counter.city, 'Ploiești')
+
+    def test_counters_are_separated_by_vote_type(self):
+        PresidentialVote.objects.create(user=self.users[2], candidate=self.president, voting_section=self.section_2)
+        PresidentialVote.objects.create(user=self.users[1], candidate=self.president)  # fără secție
+
+        self.assertEqual(get_county_turnout('prezidentiale'), {'PH': {'total_votes': 1, 'unique_voters': 1}})
+        self.assertEqual(get_county_turnout('locale'), {})
+
+    def test_rebuild_matches_incremental_counters(self):
+        LocalVote.objects.create(user=self.users[0], candidate=self.mayor, voting_section=self.section_1)
+        LocalVote.objects.create(user=self.users[0], candidate=self.councilor, voting_section=self.section_1)
+        LocalVote.objects.create(user=self.users[1], candidate=self.mayor, voting_section=self.section_2)
+        incremental = get_county_turnout('locale')
+
+        CountyTurnoutCounter.objects.all().delete()
+        SectionTurnoutCounter.objects.all().delete()
+        section_count, county_count = rebuild_turnout_counters('locale')
+
+        self.assertEqual((section_count, county_count), (2, 1))
+        self.assertEqual(get_county_turnout('locale'), incremental)
+
+    def test_migration_backfills_counters_for_existing_votes(self):
+        from django.apps import apps
+        migration = importlib.import_module('vote.migrations.0016_countyturnoutcounter_sectionturnoutcounter')
+        LocalVote.objects.create(user=self.users[0], candidate=self.mayor, voting_section=self.section_1)
+        PresidentialVote.objects.create(user=self.users[1], candidate=self.president, voting_section=self.section_2)
+        CountyTurnoutCounter.objects.all().delete()
+        SectionTurnoutCounter.objects.all().delete()
+
+        migration.backfill_turnout_counters(apps, None)
+
+        self.assertEqual(get_county_turnout('locale'), {'PH': {'total_votes': 1, 'unique_voters': 1}})
+        self.assertEqual(get_county_turnout('prezidentiale'), {'PH': {'total_votes': 1, 'unique_voters': 1}})
+        self.assertEqual(SectionTurnoutCounter.objects.count(), 2)
+
+    def test_uat_turnout_groups_sections_by_normalized_city(self):
+        VotingSection.objects.create(
+            section_id='3', name='Școala 3', address='Str. C', city='PLOIEȘTI', county='PH'
+        )
+        LocalVote.objects.create(user=self.users[0], candidate=self.mayor, voting_section=self.section_1)
+        LocalVote.objects.create(user=self.users[1], candidate=self.mayor, voting_section=self.section_2)
+
+        result = get_uat_turnout('locale', 'PH')
+
+        ploiesti = result['PH-Ploiești']
+        self.assertEqual(ploiesti['pollingStationCount'], 2)
+        self.assertEqual(ploiesti['totalVoters'], 1)
+        self.assertEqual(ploiesti['turnoutPercentage'], '0.05')
+        self.assertEqual(result['PH-ploiești'], ploiesti)
+        self.assertEqual(result['PH-Câmpina']['totalVoters'], 1)
+        self.assertIsNone(get_uat_turnout('locale', 'XX'))
+
+
+class StreetIndexTestCase(SimpleTestCase):
+    """Teste pentru indexul de străzi folosit la potrivirea parțială"""
+
+    def setUp(self):
+        keys = [
+            ('PH', 'MUNICIPIUL PLOIEŞTI', 'Strada Mihai Bravu'),
+            ('PH', 'MUNICIPIUL PLOIEŞTI', 'Bulevardul Republicii'),
+            ('PH', 'MUNICIPIUL PLOIEŞTI', 'Strada Ștefan cel Mare'),
+            ('PH', 'ORAŞ CÂMPINA', 'Strada Mihai Eminescu'),
+        ]
+        self.index = StreetIndex(keys, lambda s: s.lower().replace('ș', 's').replace('ă', 'a'))
+
+    def test_substring_is_limited_to_uat(self):
+        self.assertEqual(
+            self.index.find_substring('PH', 'MUNICIPIUL PLOIEŞTI', 'mihai'),
+            [('PH', 'MUNICIPIUL PLOIEŞTI', 'Strada Mihai Bravu')]
+        )
+        self.assertEqual(self.index.find_substring('PH', 'MUNICIPIUL PLOIEŞTI', 'Ștefan cel'),
+                         [('PH', 'MUNICIPIUL PLOIEŞTI', 'Strada Ștefan cel Mare')])
+        self.assertEqual(len(self.index.find_substring('PH', 'MUNICIPIUL PLOIEŞTI', 'a')), 3)
+        self.assertEqual(self.index.find_substring('CJ', 'MUNICIPIUL CLUJ-NAPOCA', 'mihai'), [])
+
+    def test_fuzzy_matches_misspelled_street(self):
+        self.assertEqual(
+            self.index.find_fuzzy('PH', 'MUNICIPIUL PLOIEŞTI', 'Bulevardul Republici')[0],
+            ('PH', 'MUNICIPIUL PLOIEŞTI', 'Bulevardul Republicii')
+        )
+        self.assertEqual(self.index.find_fuzzy('PH', 'MUNICIPIUL PLOIEŞTI', 'xyz'), [])
+
+
+class SectionLookupOrderTestCase(SimpleTestCase):
+    """Ordinea metodelor de căutare a secției: potrivirea aproximativă slabă vine după modelul ML"""
+
+    def setUp(self):
+        key = ('PH', 'MUNICIPIUL PLOIEŞTI', 'Strada Mihai Bravu')
+        section = {'NR_SV': '12', 'JUDET': 'PH', 'UAT': 'MUNICIPIUL PLOIEŞTI', 'SEDIU_SV': 'Școala 5'}
+        self.service = VotingSectionAIService.__new__(VotingSectionAIService)
+        self.service.street_to_section_map = {key: [section]}
+        self.service.street_index = StreetIndex([key], self.service.normalize_street)
+        self.service.model_loaded = True
+        self.service.model = object()
+        self.service.vectorizer = mock.Mock(**{'transform.return_value': np.ones((1, 2))})
+        self.service.feature_indices = [0]
+        self.service.batcher = mock.Mock(**{'predict.return_value': 0})
+        self.service.label_encoder = mock.Mock(**{'inverse_transform.return_value': ['40']})
+        self.service.section_details = {'40': {'NR_SV': '40', 'JUDET': 'PH', 'UAT': 'MUNICIPIUL PLOIEŞTI'}}
+
+    def find(self):
+        # similaritate ~0.53 față de 'Strada Mihai Bravu': sub pragul strict, peste cel permisiv
+        return self.service.find_voting_section('PH', 'MUNICIPIUL PLOIEŞTI', 'Strada Mihai Bravul 3')
+
+    def test_model_is_preferred_over_a_weak_fuzzy_match(self):
+        result = self.find()
+
+        self.assertEqual(result['method'], 'ml_model')
+        self.assertEqual(result['section']['section_id'], '40')
+
+    def test_weak_fuzzy_match_is_used_when_the_model_is_unavailable(self):
+        self.service.model_loaded = False
+
+        result = self.find()
+
+        self.assertEqual(result['method'], 'direct_lookup_fuzzy')
+        self.assertEqual(result['section']['section_id'], '12')
+
+
+class TimeBucketsTestCase(TestCase):
+    """Teste pentru progresia voturilor pe intervale de timp"""
+
+    def setUp(self):
+        self.start = datetime(2024, 12, 8, 7, 0, tzinfo=dt_timezone.utc)
+        candidate = PresidentialCandidate.objects.create(name='Maria', party='P3')
+        offsets = [0, 5, 9.5, 10, 31, 75]  # minute după deschidere
+        for i, offset in enumerate(offsets):
+            user = User.objects.create(email=f'voter{i}@example.com', cnp=f'200000000000{i}')
+            vote = PresidentialVote.objects.create(user=user, candidate=candidate)
+            PresidentialVote.objects.filter(pk=vote.pk).update(
+                vote_datetime=self.start + timedelta(minutes=offset)
+            )
+
+    def test_buckets_come_from_a_single_query(self):
+        with self.assertNumQueries(1):
+            buckets = bucket_counts(
+                PresidentialVote.objects.all(), self.start, self.start + timedelta(hours=1),
+                timedelta(minutes=10)
+            )
+
+        self.assertEqual([count for _, count in buckets], [3, 1, 0, 1, 0, 0])
+        self.assertEqual(buckets[1][0], self.start + timedelta(minutes=10))
+
+    def test_cumulative_progression_format(self):
+        progression = cumulative_progression(
+            PresidentialVote.objects.all(), self.start, timedelta(hours=14), timedelta(minutes=30)
+        )
+
+        self.assertEqual(len(progression), 28)
+        self.assertEqual(progression[0], {'time': '07:00', 'votes': 4, 'cumulative': 4})
+        self.assertEqual(progression[2], {'time': '08:00', 'votes': 1, 'cumulative': 6})
+        self.assertEqual(progression[-1]['cumulative'], 6)
+
+    def test_last_minutes_includes_current_minute(self):
+        now = self.start + timedelta(minutes=10, seconds=40)
+        minutes = last_minutes(PresidentialVote.objects.all(), now, minutes=5)
+
+        self.assertEqual(minutes[-1], (self.start + timedelta(minutes=10), 1))
+        self.assertEqual([count for _, count in minutes], [0, 0, 0, 1, 1])  # 07:06 - 07:10
+
+
+class DemographicCountersTestCase(TestCase):
+    """Teste pentru contoarele demografice actualizate la vot"""
+
+    def setUp(self):
+        self.section = VotingSection.objects.create(
+            section_id='1', name='Școala 1', address='Str. A', city='Ploiești', county='PH'
+        )
+        self.mayor = LocalCandidate.objects.create(
+            name='Ion', party='P1', position='mayor', county='PH', city='Ploiești'
+        )
+        self.councilor = LocalCandidate.objects.create(
+            name='Ana', party='P2', position='councilor', county='PH', city='Ploiești'
+        )
+        self.man = User.objects.create(
+            email='m@example.com', cnp='1800101290011', address='Municipiul Ploiești, Str. A'
+        )
+        self.woman = User.objects.create(
+            email='f@example.com', cnp='6030101290012', address='Comuna Bărcănești, Sat Pupezeni'
+        )
+
+    def test_each_voter_is_counted_once_per_round(self):
+        LocalVote.objects.create(user=self.man, candidate=self.mayor, voting_section=self.section)
+        LocalVote.objects.create(user=self.man, candidate=self.councilor, voting_section=self.section)
+        LocalVote.objects.create(user=self.woman, candidate=self.mayor, voting_section=self.section)
+
+        counts = get_demographic_counts('locale')
+
+        self.assertEqual(counts['gender'], {'M': 1, 'F': 1})
+        self.assertEqual(counts['environment'], {'urban': 1, 'rural': 1})
+        self.assertEqual(sum(counts['age_group'].values()), 2)
+        self.assertEqual(get_demographic_counts('prezidentiale')['gender'], {})
+
+    def test_rebuild_matches_incremental_counters(self):
+        LocalVote.objects.create(user=self.man, candidate=self.mayor, voting_section=self.section)
+        LocalVote.objects.create(user=self.woman, candidate=self.councilor, voting_section=self.section)
+        incremental = get_demographic_counts('locale')
+
+        DemographicTurnoutCounter.objects.all().delete()
+        self.assertEqual(rebuild_demographic_counters('locale', LocalVote), 2)
+        self.assertEqual(get_demographic_counts('locale'), incremental)
+
+    def test_migration_backfills_counters_for_existing_votes(self):
+        from django.apps import apps
+        migration = importlib.import_module('vote.migrations.0017_demographicturnoutcounter')
+        LocalVote.objects.create(user=self.man, candidate=self.mayor, voting_section=self.section)
+        incremental = get_demographic_counts('locale')
+        DemographicTurnoutCounter.objects.all().delete()
+
+        migration.backfill_demographic_counters(apps, None)
+
+        self.assertEqual(get_demographic_counts('locale'), incremental)
+
+
+class VoteCastCountersTestCase(TestCase):
+    """Teste pentru contoarele denormalizate ale sistemelor de vot"""
+
+    def setUp(self):
+        creator = User.objects.create(email='creator@example.com', cnp='1000000000001')
+        now = datetime.now(dt_timezone.utc)
+        self.system = VoteSystem.objects.create(
+            name='Sondaj', description='', creator=creator, category='survey',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        self.options = [
+            VoteOption.objects.create(vote_system=self.system, title=title, order=i)
+            for i, title in enumerate(['Da', 'Nu', 'Abținere'])
+        ]
+        for i, option in enumerate([0, 0, 1]):
+            VoteCast.objects.create(vote_system=self.system, option=self.options[option], anonymous_id=f'anon{i}')
+
+    def test_counters_follow_inserts_and_deletes(self):
+        self.system.refresh_from_db()
+        self.assertEqual(self.system.total_votes, 3)
+        self.assertEqual(list(self.system.options.values_list('votes_count', flat=True)), [2, 1, 0])
+
+        VoteCast.objects.filter(option=self.options[1]).delete()
+        self.system.refresh_from_db()
+        self.assertEqual(self.system.total_votes, 2)
+        self.assertEqual(verify_vote_counters(), [])
+
+    def test_serializer_reads_counters_without_counting(self):
+        system = VoteSystem.objects.prefetch_related('options').get(pk=self.system.pk)
+        with self.assertNumQueries(0):
+            data = VoteSystemSerializer(system).data
+
+        self.assertEqual(data['total_votes'], 3)
+        self.assertEqual([option['votes_count'] for option in data['options']], [2, 1, 0])
+
+    def test_verify_reports_and_fixes_drift(self):
+        VoteOption.objects.filter(pk=self.options[2].pk).update(votes_count=5)
+
+        self.assertEqual(verify_vote_counters(fix=True), [('VoteOption', self.options[2].pk, 5, 0)])
+        self.assertEqual(verify_vote_counters(), [])
+
+
+@override_settings(VOTE_TOKEN_MAIL_ASYNC=False)
+class VoteTokenIssuanceTestCase(TestCase):
+    """Teste pentru emiterea în bloc a token-urilor și trimiterea email-urilor"""
+
+    def setUp(self):
+        creator = User.objects.create(email='creator@example.com', cnp='1000000000001')
+        now = datetime.now(dt_timezone.utc)
+        self.system = VoteSystem.objects.create(
+            name='Sondaj', description='', creator=creator, category='survey',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        self.used = VoteToken.objects.create(vote_system=self.system, email='a@example.com', token='USED01', used=True)
+
+    def test_tokens_are_issued_in_bulk_and_mailed_in_one_batch(self):
+        with self.assertNumQueries(7):  # constant, indiferent de numărul de email-uri
+            token_ids, issued = issue_vote_tokens(self.system, ['a@example.com', 'b@example.com', 'c@example.com'])
+
+        self.assertEqual((len(token_ids), issued), (3, 3))
+        self.used.refresh_from_db()
+        self.assertFalse(self.used.used)
+        self.assertNotEqual(self.used.token, 'USED01')
+
+        with mock.patch('vote.services.token_mailer.get_connection', wraps=mail.get_connection) as get_connection:
+            VoteTokenMailer(batch_size=10).enqueue(token_ids)
+
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertEqual(get_token_delivery_counts(self.system)['sent'], 3)
+
+    def test_failed_recipient_is_recorded(self):
+        token_ids, _ = issue_vote_tokens(self.system, ['a@example.com', 'b@example.com'])
+        original_send = mail.EmailMultiAlternatives.send
+
+        def send(message, *args, **kwargs):
+            if message.to == ['b@example.com']:
+                raise OSError('mailbox unavailable')
+            return original_send(message, *args, **kwargs)
+
+        with mock.patch.object(mail.EmailMultiAlternatives, 'send', send):
+            VoteTokenMailer().enqueue(token_ids)
+
+        failed = VoteToken.objects.get(email='b@example.com')
+        self.assertEqual((failed.delivery_status, failed.delivery_error), ('failed', 'mailbox unavailable'))
+        self.assertEqual(VoteToken.objects.get(email='a@example.com').delivery_status, 'sent')
+
+    def test_token_lifetime_starts_when_the_email_is_sent(self):
+        token_ids, _ = issue_vote_tokens(self.system, ['b@example.com'])
+        # Token-ul a stat în coadă mai mult decât durata lui de valabilitate
+        expired_at = datetime.now(dt_timezone.utc) - timedelta(minutes=1)
+        VoteToken.objects.filter(pk__in=token_ids).update(expires_at=expired_at)
+
+        VoteTokenMailer().send_batch(token_ids)
+
+        token = VoteToken.objects.get(email='b@example.com')
+        self.assertEqual(token.delivery_status, 'sent')
+        self.assertTrue(token.is_valid())
+        self.assertGreaterEqual(token.expires_at, token.sent_at)
+
+    def test_tokens_left_queued_by_a_restart_are_requeued(self):
+        token_ids, _ = issue_vote_tokens(self.system, ['a@example.com', 'b@example.com'])
+        # Procesul a fost repornit înainte ca 'b' să fie trimis
+        VoteToken.objects.filter(email='b@example.com').update(
+            queued_at=datetime.now(dt_timezone.utc) - timedelta(minutes=10)
+        )
+        mailer = VoteTokenMailer(stale_after=300)
+
+        self.assertEqual(mailer.requeue_stale(self.system), 1)
+        self.assertEqual([message.to[0] for message in mail.outbox], ['b@example.com'])
+        self.assertEqual(VoteToken.objects.get(email='a@example.com').delivery_status, 'queued')
+        self.assertEqual(mailer.requeue_stale(self.system), 0)
+
+
+class AllowedVoterEmailTestCase(TestCase):
+    """Teste pentru lista indexată de alegători permiși"""
+
+    def setUp(self):
+        creator = User.objects.create(email='creator@example.com', cnp='1000000000001')
+        now = datetime.now(dt_timezone.utc)
+        self.system = VoteSystem.objects.create(
+            name='Sondaj', description='', creator=creator, category='survey',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+
+    def test_import_normalises_and_deduplicates(self):
+        replace_allowed_emails(self.system, ['A@Example.com ', 'a@example.com', 'b@example.com'])
+        self.assertEqual(add_allowed_emails(self.system, ['b@example.com', 'c@example.com']), 3)
+        self.assertEqual(get_allowed_emails(self.system), ['a@example.com', 'b@example.com', 'c@example.com'])
+
+        replace_allowed_emails(self.system, ['d@example.com'])
+        self.assertEqual(get_allowed_emails(self.system), ['d@example.com'])
+
+    def test_membership_is_a_single_lookup(self):
+        AllowedVoterEmail.objects.create(vote_system=self.system, email='a@example.com')
+
+        with self.assertNumQueries(1):
+            self.assertTrue(is_email_allowed(self.system, ' A@example.com'))
+        self.assertFalse(is_email_allowed(self.system, 'x@example.com'))
+
+    def test_tokens_are_issued_for_normalised_addresses(self):
+        token_ids, issued = issue_vote_tokens(self.system, ['Ion@Example.com', 'ion@example.com '])
+
+        self.assertEqual((len(token_ids), issued), (1, 1))
+        self.assertEqual(VoteToken.objects.get(pk=token_ids[0]).email, 'ion@example.com')
+
+    def test_migration_normalises_and_deduplicates_token_emails(self):
+        from django.apps import apps
+        migration = importlib.import_module('vote.migrations.0020_allowed_voter_emails')
+
+        now = datetime.now(dt_timezone.utc)
+        # Ion a votat la o emitere anterioară și a primit apoi un token nou
+        VoteToken.objects.create(vote_system=self.system, email='Ion@Example.com', token='OLD001',
+                                 expires_at=now - timedelta(days=1), used=True, used_at=now - timedelta(days=1))
+        VoteToken.objects.create(vote_system=self.system, email='ion@example.com', token='NEW001',
+                                 expires_at=now + timedelta(minutes=3))
+        # Maria a votat cu unul dintre cele două token-uri ale aceleiași emiteri
+        VoteToken.objects.create(vote_system=self.system, email='maria@example.com', token='MAR001',
+                                 expires_at=now + timedelta(minutes=3))
+        VoteToken.objects.create(vote_system=self.system, email='Maria@Example.com', token='MAR002',
+                                 expires_at=now + timedelta(minutes=3), used=True, used_at=now + timedelta(minutes=1))
+        VoteToken.objects.create(vote_system=self.system, email='Ana@Example.com', token='ANA001', expires_at=now)
+
+        migration.normalize_token_emails(apps, None)
+
+        self.assertEqual(
+            sorted(VoteToken.objects.values_list('email', 'token')),
+            [('ana@example.com', 'ANA001'), ('ion@example.com', 'NEW001'), ('maria@example.com', 'MAR002')],
+        )
+
+    def test_emails_are_read_from_csv_cells(self):
+        upload = io.BytesIO('\ufeffnume;email\nIon;ion@example.com\nAna;ana@example.com\n'.encode('utf-8'))
+        self.assertEqual(emails_from_csv(upload), ['ion@example.com', 'ana@example.com'])
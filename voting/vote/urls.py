@@ -1,12 +1,12 @@
 from django.urls import path
 from .views import VoteSettingsView, AdminVoteSettingsView
-from .views import UserVotingEligibilityView, FindVotingSectionView, LocalCandidatesView, SubmitLocalVoteView, CheckUserVoteStatusView,VoteMonitoringView
+from .views import UserVotingEligibilityView, FindVotingSectionView, VotingSectionInferenceMetricsView, LocalCandidatesView, SubmitLocalVoteView, CheckUserVoteStatusView,VoteMonitoringView
 from .views import ConfirmVoteAndSendReceiptView, GenerateVoteReceiptPDFView
 from .views import UserPresidentialVotingEligibilityView, PresidentialCandidatesView, CheckPresidentialVoteStatusView, SubmitPresidentialVoteView, GeneratePresidentialVoteReceiptPDFView
 from .views import UserParliamentaryVotingEligibilityView, ParliamentaryPartiesView, CheckParliamentaryVoteStatusView, SubmitParliamentaryVoteView, GenerateParliamentaryVoteReceiptPDFView
 from .views import CreateVoteSystemView, UserVoteSystemsView, VoteSystemDetailView, SubmitVoteView
 from .views import PublicVoteSystemView, PublicSubmitVoteView, PublicVoteResultsView
-from .views import ManageVoterEmailsView, SendVoteTokensView, VerifyVoteTokenView, CheckActiveVoteSystemView, VoteSystemResultsUpdateView, ActiveRoundVotingStatisticsView, ActiveRoundUATVotingStatisticsView
+from .views import ManageVoterEmailsView, SendVoteTokensView, VoteTokenDeliveryStatusView, VerifyVoteTokenView, CheckActiveVoteSystemView, VoteSystemResultsUpdateView, ActiveRoundVotingStatisticsView, ActiveRoundUATVotingStatisticsView
 from .views import UserPresidentialRound2VotingEligibilityView, PresidentialRound2CandidatesView, CheckPresidentialRound2VoteStatusView, SubmitPresidentialRound2VoteView, GeneratePresidentialRound2VoteReceiptPDFView
 
 urlpatterns = [
@@ -15,6 +15,7 @@ urlpatterns = [
     path('admin/vote-settings/<int:pk>/', AdminVoteSettingsView.as_view(), name='admin-vote-settings-detail'),
     path('vote/local/eligibility/', UserVotingEligibilityView.as_view(), name='local-eligibility'),
     path('vote/local/find-section/', FindVotingSectionView.as_view(), name='find-voting-section'),
+    path('admin/find-section/metrics/', VotingSectionInferenceMetricsView.as_view(), name='find-section-metrics'),
     path('vote/local/candidates/', LocalCandidatesView.as_view(), name='local-candidates'),
     path('vote/local/submit/', SubmitLocalVoteView.as_view(), name='submit-local-vote'),
     path('vote/local/check-status/', CheckUserVoteStatusView.as_view(), name='check-user-vote-status'),
@@ -40,6 +41,7 @@ urlpatterns = [
     path('vote-systems/<int:system_id>/public-results/', PublicVoteResultsView.as_view(), name='public-vote-results'),  
     path('vote-systems/<int:system_id>/manage-emails/', ManageVoterEmailsView.as_view(), name='manage-voter-emails'),
     path('vote-systems/<int:system_id>/send-tokens/', SendVoteTokensView.as_view(), name='send-vote-tokens'),
+    path('vote-systems/<int:system_id>/token-delivery/', VoteTokenDeliveryStatusView.as_view(), name='vote-token-delivery'),
     path('vote-systems/<int:system_id>/verify-token/', VerifyVoteTokenView.as_view(), name='verify-vote-token'),
     path('vote-systems/check-active/', CheckActiveVoteSystemView.as_view(), name='check-active-vote-system'),
     path('vote-systems/<int:system_id>/results-update/', VoteSystemResultsUpdateView.as_view(), name='vote-system-results-update'),
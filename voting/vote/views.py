@@ -9,9 +9,7 @@ from .models import VotingSection, LocalCandidate
 from django.db.models import Q
 import re
 from .models import LocalVote
-from .services_old import VotingSectionAIService
 import logging
-from .services.vote_monitoring import VoteMonitoringService
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
 import numpy as np
@@ -48,14 +46,27 @@ from datetime import timedelta
 from django.db.models import Count, Sum
 from .models import PresidentialRound2Candidate, PresidentialRound2Vote
 from security.utils import log_vote_security_event, log_captcha_attempt, create_security_event
-from core.ai_services import vote_monitoring_service
+from core.ai_services import verify_voter_identity_task, run_biometric_task
+from core.model_manager import BiometricPoolBusy, BiometricTaskTimeout, model_manager
+from core.views import biometric_unavailable_response
+from core.face_encodings import get_reference_encoding
+from .services.turnout import VOTE_MODELS, get_county_turnout, get_polling_station_counts, get_uat_turnout
+from .services.token_mailer import issue_vote_tokens, get_token_delivery_counts, vote_token_mailer
+from .services.allow_list import (
+    add_allowed_emails, emails_from_csv, get_allowed_emails, is_email_allowed, normalize_email,
+    replace_allowed_emails,
+)
 
 
 logger = logging.getLogger(__name__)
 
 
-# Inițializăm serviciul AI o singură dată pentru a evita încărcarea repetată a modelului
-voting_section_ai = VotingSectionAIService()
+def get_voting_section_ai():
+    """
+    Serviciul AI pentru secțiile de votare, încărcat o singură dată, la prima
+    cerere (TensorFlow și dicționarele nu mai sunt încărcate la importul modulului)
+    """
+    return model_manager.get_model('voting_section_ai')
 
 class VoteSettingsView(APIView):
     permission_classes = [AllowAny]  # Allow any user to access vote settings, even unauthenticated
@@ -278,7 +289,7 @@ class FindVotingSectionView(APIView):
         county_uppercase = county.upper()
         
         # Apelăm serviciul AI pentru a găsi secția de votare
-        result = voting_section_ai.find_voting_section(
+        result = get_voting_section_ai().find_voting_section(
             county_uppercase, city.upper(), address, section_selection
         )
         
@@ -366,6 +377,13 @@ class FindVotingSectionView(APIView):
             'error': 'Nu am putut identifica o secție de vot pentru adresa furnizată.'
         }, status=status.HTTP_404_NOT_FOUND)
     
+class VotingSectionInferenceMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        """Returnează statisticile de batch și latență ale modelului de identificare a secțiilor"""
+        return Response(get_voting_section_ai().get_inference_metrics())
+    
 class LocalCandidatesView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -600,9 +618,9 @@ class VoteMonitoringView(APIView):
             )
             
         try:
-            # Încărcăm imaginea de referință din buletin
-            id_card_path = user.id_card_image.path if default_storage.exists(user.id_card_image.name) else None
-            if not id_card_path:
+            # Encoding-ul feței din buletin este calculat o singură dată și păstrat în cache
+            reference_encoding, error = get_reference_encoding(user)
+            if reference_encoding is None and not default_storage.exists(user.id_card_image.name):
                 log_vote_security_event(
                     user=user,
                     event_type='vote_verification_failed',
@@ -610,13 +628,7 @@ class VoteMonitoringView(APIView):
                     request=request
                 )
                 return Response({"error": "Nu există imaginea de referință în baza de date."}, status=404)
-                
-            # Pregătim imaginea de buletin
-            id_card_image = Image.open(id_card_path).convert("RGB")
-            id_card_array = np.array(id_card_image)
             
-            # Extragem encoding-ul feței din buletin
-            reference_encoding, error, _ = vote_monitoring_service.detect_and_encode_face(id_card_array)
             if reference_encoding is None:
                 log_vote_security_event(
                     user=user,
@@ -629,8 +641,9 @@ class VoteMonitoringView(APIView):
             # Citim imaginea live
             live_image_data = live_image.read()
             
-            # Verificăm identitatea
-            match, message, num_faces = vote_monitoring_service.verify_voter_identity(
+            # Verificăm identitatea în pool-ul de procese biometrice
+            match, message, num_faces = run_biometric_task(
+                verify_voter_identity_task,
                 reference_encoding, 
                 live_image_data
             )
@@ -676,6 +689,8 @@ class VoteMonitoringView(APIView):
                 "num_faces": num_faces
             }, status=status.HTTP_200_OK)
                 
+        except (BiometricPoolBusy, BiometricTaskTimeout) as e:
+            return biometric_unavailable_response(e)
         except Exception as e:
             logger.error(f"Eroare în monitorizarea votului: {e}")
             log_vote_security_event(
@@ -2187,7 +2202,7 @@ class UserVoteSystemsView(APIView):
     
     def get(self, request):
         # Obținem toate sistemele de vot create de utilizatorul curent
-        vote_systems = VoteSystem.objects.filter(creator=request.user)
+        vote_systems = VoteSystem.objects.filter(creator=request.user).prefetch_related('options')
         
         # Actualizăm status-ul pentru fiecare sistem
         for system in vote_systems:
@@ -2484,12 +2499,18 @@ class PublicSubmitVoteView(APIView):
                         'error': 'Token-ul și adresa de email sunt necesare pentru acest sistem de vot.'
                     }, status=status.HTTP_400_BAD_REQUEST)
                 
+                # Adresa trebuie să fie în lista de alegători permiși (căutare pe index)
+                if not is_email_allowed(vote_system, email):
+                    return Response({
+                        'error': 'Token invalid sau adresă de email incorectă.'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
                 # Căutăm token-ul în baza de date
                 try:
                     token = VoteToken.objects.get(
                         vote_system=vote_system, 
                         token=token_value,
-                        email=email
+                        email=normalize_email(email)
                     )
                     
                     # Verificăm dacă token-ul este valid
@@ -2658,15 +2679,8 @@ class ManageVoterEmailsView(APIView):
                     'error': 'Nu aveți permisiunea de a accesa email-urile pentru acest sistem de vot.'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Verificăm dacă există email-uri pentru acest sistem
-            if not vote_system.allowed_emails:
-                return Response({
-                    'success': True,
-                    'emails': []
-                })
-            
-            # Obținem email-urile din câmpul allowed_emails al sistemului de vot
-            emails_list = [email.strip() for email in vote_system.allowed_emails.split(',') if email.strip()]
+            # Obținem email-urile din lista de alegători permiși
+            emails_list = get_allowed_emails(vote_system)
             
             return Response({
                 'success': True,
@@ -2686,7 +2700,9 @@ class ManageVoterEmailsView(APIView):
     
     def post(self, request, system_id):
         """
-        Adaugă sau actualizează email-urile votanților pentru un sistem de vot
+        Adaugă sau actualizează email-urile votanților pentru un sistem de vot.
+        Acceptă o listă lipită ('emails') și/sau un fișier CSV ('file');
+        cu mode='append' adresele sunt adăugate la listă, altfel o înlocuiesc.
         """
         try:
             # Obținem sistemul de vot
@@ -2700,28 +2716,31 @@ class ManageVoterEmailsView(APIView):
             
             # Procesăm lista de emailuri
             emails_data = request.data.get('emails', '')
-            
-            # Debug pentru a vedea ce se primește
-            print(f"Datele primite pentru email-uri: {emails_data}")
+            if 'file' in request.FILES:
+                emails_data = '\n'.join([emails_data] + emails_from_csv(request.FILES['file']))
+            append = request.data.get('mode') == 'append'
             
             form = EmailListForm({'emails': emails_data})
             
             if form.is_valid():
                 emails = form.cleaned_data['emails']
                 
-                # Debug pentru a vedea ce rezultă după procesare
-                print(f"Email-uri procesate: {emails}")
+                # Importăm adresele în tabela indexată, în loturi
+                if append:
+                    emails_count = add_allowed_emails(vote_system, emails)
+                else:
+                    emails_count = replace_allowed_emails(vote_system, emails)
                 
                 # Actualizăm sistemul de vot cu opțiunea de verificare prin email
-                vote_system.require_email_verification = True
-                vote_system.allowed_emails = ','.join(emails)
-                vote_system.save()
+                if not vote_system.require_email_verification:
+                    vote_system.require_email_verification = True
+                    vote_system.save(update_fields=['require_email_verification'])
                 
                 # Returnăm răspunsul
                 return Response({
                     'success': True,
                     'message': f'Au fost adăugate {len(emails)} adrese de email.',
-                    'emails_count': len(emails)
+                    'emails_count': emails_count
                 })
             else:
                 print(f"Erori validare email-uri: {form.errors}")
@@ -2755,167 +2774,29 @@ class SendVoteTokensView(APIView):
                     'error': 'Nu aveți permisiunea de a gestiona acest sistem de vot.'
                 }, status=status.HTTP_403_FORBIDDEN)
             
+            # Obținem lista de emailuri
+            emails = get_allowed_emails(vote_system)
+            
             # Verificăm dacă sunt adrese de email configurate
-            if not vote_system.allowed_emails:
+            if not emails:
                 return Response({
                     'error': 'Nu există adrese de email configurate pentru acest sistem de vot.'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Obținem lista de emailuri
-            emails = [email.strip() for email in vote_system.allowed_emails.split(',') if email.strip()]
-            
-            # Generăm și trimitem token-uri pentru fiecare email
-            tokens_created = 0
-            emails_sent = 0
+            # Emitem toate token-urile într-o singură tranzacție, apoi email-urile
+            # sunt trimise în fundal, în loturi, pe conexiuni SMTP reutilizate
+            token_ids, tokens_created = issue_vote_tokens(vote_system, emails)
+            vote_token_mailer.enqueue(token_ids)
             
-            # Folosește întotdeauna IP-ul de rețea pentru link-urile din email
-            network_ip = getattr(settings, 'NETWORK_IP', '192.168.29.201')
-            frontend_url = f"http://{network_ip}:4200"
-            
-            print(f"Folosim URL de rețea pentru email: {frontend_url}")
-            
-            for email in emails:
-                # Verificăm dacă există deja un token pentru acest email
-                token, created = VoteToken.objects.get_or_create(
-                    vote_system=vote_system,
-                    email=email,
-                    defaults={
-                        'token': VoteToken.generate_token(),
-                        'expires_at': timezone.now() + timedelta(minutes=3)
-                    }
-                )
-                
-                # Dacă token-ul a fost deja folosit sau a expirat, generăm unul nou
-                if not token.is_valid():
-                    token.token = VoteToken.generate_token()
-                    token.expires_at = timezone.now() + timedelta(minutes=3)
-                    token.used = False
-                    token.used_at = None
-                    token.save()
-                
-                if created or not token.is_valid():
-                    tokens_created += 1
-                
-                # Generăm URL-ul pentru pagina de vot folosind IP-ul de rețea
-                vote_url = f"{frontend_url}/vote/{vote_system.id}?token={token.token}&email={email}"
-                print(f"URL generat pentru email: {vote_url}")
-                
-                # Trimitem email-ul cu token-ul
-                try:
-                    # Pregătim contextul pentru șablon
-                    context = {
-                        'vote_system': vote_system,
-                        'token': token.token,
-                        'expires_at': token.expires_at,
-                        'vote_url': vote_url  # URL-ul complet cu IP-ul de rețea
-                    }
-                    
-                    # Încercăm să folosim template-urile, dar avem și o variantă de backup
-                    try:
-                        html_message = render_to_string('vote_token.html', context)
-                        plain_message = render_to_string('vote_token_plain.txt', context)
-                    except Exception as template_error:
-                        print(f"Eroare la randarea template-ului: {str(template_error)}")
-                        
-                        # Folosim un string HTML direct cu URL-ul de rețea
-                        html_message = f"""
-                        <!DOCTYPE html>
-                        <html>
-                        <head>
-                            <meta charset="UTF-8">
-                            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                            <title>Codul tău de vot pentru {vote_system.name}</title>
-                            <style>
-                                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }}
-                                .container {{ border: 1px solid #ddd; border-radius: 5px; padding: 20px; background-color: #f9f9f9; }}
-                                .header {{ text-align: center; margin-bottom: 20px; }}
-                                .token {{ background-color: #e9f7fe; color: #0078d4; font-size: 24px; font-weight: bold; text-align: center; padding: 15px; margin: 20px 0; border-radius: 5px; letter-spacing: 2px; }}
-                                .info {{ margin-bottom: 15px; }}
-                                .footer {{ font-size: 12px; color: #777; margin-top: 30px; text-align: center; }}
-                                .button {{ display: inline-block; background-color: #0078d4; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin-top: 15px; }}
-                            </style>
-                        </head>
-                        <body>
-                            <div class="container">
-                                <div class="header">
-                                    <h1>SmartVote</h1>
-                                    <h2>Codul tău de vot</h2>
-                                </div>
-                                
-                                <div class="info">
-                                    <p>Dragă participant,</p>
-                                    <p>Ai fost invitat să participi la votul: <strong>{vote_system.name}</strong>.</p>
-                                    <p>Pentru a-ți valida votul, te rugăm să folosești codul de mai jos:</p>
-                                </div>
-                                
-                                <div class="token">
-                                    {token.token}
-                                </div>
-                                
-                                <div class="info">
-                                    <p><strong>Important:</strong> Acest cod este valabil doar pentru 3 minute și poate fi folosit o singură dată.</p>
-                                    <p>Expiră la: {token.expires_at.strftime('%d.%m.%Y %H:%M:%S')}</p>
-                                    
-                                    <p>Pentru a vota, accesează link-ul de mai jos și introdu codul când ți se solicită:</p>
-                                    <div style="text-align: center;">
-                                        <a href="{vote_url}" class="button">Accesează pagina de vot</a>
-                                    </div>
-                                </div>
-                                
-                                <div class="footer">
-                                    <p>Acest email a fost trimis automat. Te rugăm să nu răspunzi la acest mesaj.</p>
-                                    <p>&copy; 2023 SmartVote. Toate drepturile rezervate.</p>
-                                </div>
-                            </div>
-                        </body>
-                        </html>
-                        """
-                        
-                        plain_message = f"""
-                        SmartVote - Codul tău de vot
-                        
-                        Dragă participant,
-                        
-                        Ai fost invitat să participi la votul: {vote_system.name}.
-                        
-                        Pentru a-ți valida votul, te rugăm să folosești următorul cod:
-                        
-                        {token.token}
-                        
-                        Important: Acest cod este valabil doar pentru 3 minute și poate fi folosit o singură dată.
-                        Expiră la: {token.expires_at.strftime('%d.%m.%Y %H:%M:%S')}
-                        
-                        Pentru a vota, accesează link-ul de mai jos și introdu codul când ți se solicită:
-                        {vote_url}
-                        
-                        Acest email a fost trimis automat. Te rugăm să nu răspunzi la acest mesaj.
-                        
-                        © 2023 SmartVote. Toate drepturile rezervate.
-                        """
-                    
-                    # Trimitem email-ul
-                    send_mail(
-                        subject=f"[SmartVote] Codul tău de vot pentru {vote_system.name}",
-                        message=plain_message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[email],
-                        html_message=html_message,
-                        fail_silently=False
-                    )
-                    print(f"Email trimis cu succes către {email} cu link: {vote_url}")
-                    emails_sent += 1
-                    
-                except Exception as e:
-                    print(f"Eroare la trimiterea email-ului către {email}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+            delivery = get_token_delivery_counts(vote_system)
             
             return Response({
                 'success': True,
-                'message': f'Au fost trimise {emails_sent} email-uri cu coduri de vot.',
+                'message': f'Au fost puse în coadă {len(token_ids)} email-uri cu coduri de vot.',
                 'tokens_created': tokens_created,
-                'emails_sent': emails_sent
-            })
+                'emails_queued': len(token_ids),
+                'delivery': delivery
+            }, status=status.HTTP_202_ACCEPTED)
             
         except VoteSystem.DoesNotExist:
             return Response({
@@ -2929,6 +2810,39 @@ class SendVoteTokensView(APIView):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+class VoteTokenDeliveryStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, system_id):
+        """
+        Returnează starea trimiterii email-urilor cu token-uri, per destinatar
+        """
+        try:
+            vote_system = VoteSystem.objects.get(id=system_id)
+            
+            if vote_system.creator != request.user:
+                return Response({
+                    'error': 'Nu aveți permisiunea de a gestiona acest sistem de vot.'
+                }, status=status.HTTP_403_FORBIDDEN)
+            
+            # Token-urile rămase în coadă după o repornire sunt trimise din nou
+            vote_token_mailer.requeue_stale(vote_system)
+            
+            recipients = VoteToken.objects.filter(vote_system=vote_system)\
+                .order_by('email')\
+                .values('email', 'delivery_status', 'delivery_error', 'sent_at')
+            
+            return Response({
+                'success': True,
+                'delivery': get_token_delivery_counts(vote_system),
+                'recipients': list(recipients)
+            })
+        
+        except VoteSystem.DoesNotExist:
+            return Response({
+                'error': 'Sistemul de vot nu a fost găsit.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
 class VerifyVoteTokenView(APIView):
     permission_classes = [AllowAny]
     
@@ -2956,12 +2870,19 @@ class VerifyVoteTokenView(APIView):
                     'message': 'Token-ul și adresa de email sunt necesare.'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Adresa trebuie să fie în lista de alegători permiși (căutare pe index)
+            if not is_email_allowed(vote_system, email):
+                return Response({
+                    'valid': False,
+                    'message': 'Token invalid sau adresă de email incorectă.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
             # Căutăm token-ul în baza de date
             try:
                 token = VoteToken.objects.get(
                     vote_system=vote_system, 
                     token=token_value,
-                    email=email
+                    email=normalize_email(email)
                 )
                 
                 # Verificăm dacă token-ul este valid
@@ -3037,19 +2958,19 @@ class VoteSystemResultsUpdateView(APIView):
                     'error': 'Nu aveți permisiunea de a vedea acest sistem de vot.'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Obținem toate opțiunile și le sortăm după numărul de voturi (descrescător)
-            options = VoteOption.objects.filter(vote_system=vote_system)
+            # Obținem toate opțiunile cu contoarele lor, într-un singur query
+            options = VoteOption.objects.filter(vote_system=vote_system)\
+                .values_list('id', 'title', 'votes_count')
             
             # Pregătim datele pentru grafic
             results_data = []
             total_votes = 0
             
-            for option in options:
-                votes_count = option.votes.count()
+            for option_id, title, votes_count in options:
                 total_votes += votes_count
                 results_data.append({
-                    'id': option.id,
-                    'title': option.title,
+                    'id': option_id,
+                    'title': title,
                     'votes_count': votes_count
                 })
             
@@ -3092,232 +3013,56 @@ class ActiveRoundVotingStatisticsView(APIView):
         if not active_vote:
             return Response({'error': 'Nu există o sesiune de vot activă în acest moment.'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Tipul de vot determină tabela din care luăm datele
+        # Tipul de vot determină contoarele din care luăm datele
         vote_type = active_vote.vote_type
         
-        if vote_type == 'locale':
-            # Obținem datele de vot locale agregate pe județe
-            county_stats = LocalVote.objects.values('voting_section__county')\
-                .annotate(
-                    total_votes=Count('id'),
-                    unique_voters=Count('user', distinct=True)
-                )\
-                .order_by('voting_section__county')
-                
-            # Formatul datelor pentru frontend
-            data = {}
-            for stat in county_stats:
-                county_code = stat['voting_section__county']
-                if county_code:
-                    data[county_code] = {
-                        'total_voters': stat['total_votes'],
-                        'pollingStationCount': 0,  # Va fi actualizat mai jos
-                        'permanentListVoters': stat['unique_voters'],
-                        'supplementaryListVoters': 0,
-                        'specialCircumstancesVoters': 0,
-                        'mobileUrnsVoters': 0,
-                        'turnoutPercentage': '0.00'  # Va fi calculat după ce adăugăm registeredVoters
-                    }
-            
-            # Adăugăm numărul de secții de votare pentru fiecare județ
-            polling_stations = VotingSection.objects.values('county')\
-                .annotate(station_count=Count('id'))\
-                .order_by('county')
-                
-            for station in polling_stations:
-                county_code = station['county']
-                if county_code in data:
-                    data[county_code]['pollingStationCount'] = station['station_count']
-                else:
-                    # Inițializăm datele pentru județe care nu au voturi încă
-                    data[county_code] = {
-                        'total_voters': 0,
-                        'pollingStationCount': station['station_count'],
-                        'permanentListVoters': 0,
-                        'supplementaryListVoters': 0,
-                        'specialCircumstancesVoters': 0,
-                        'mobileUrnsVoters': 0,
-                        'turnoutPercentage': '0.00'
-                    }
-            
-            # Estimăm numărul de alegători înregistrați (simulare pentru exemplu)
-            # În practică, acestea ar trebui obținute din altă sursă
-            for county_code in data:
-                # Presupunem că fiecare secție are în medie 1000 de alegători
-                data[county_code]['registeredVoters'] = data[county_code]['pollingStationCount'] * 1000
-                
-                # Calculăm procentajul de prezență
-                if data[county_code]['registeredVoters'] > 0:
-                    turnout = (data[county_code]['total_voters'] / data[county_code]['registeredVoters']) * 100
-                    data[county_code]['turnoutPercentage'] = f"{turnout:.2f}"
-                
-        elif vote_type == 'prezidentiale':
-            county_stats = PresidentialVote.objects.filter(
-                voting_section__isnull=False
-            ).values('voting_section__county')\
-                .annotate(
-                    total_votes=Count('id'),
-                    unique_voters=Count('user', distinct=True)
-                )\
-                .order_by('voting_section__county')
-            
-            # Formatul datelor pentru frontend
-            data = {}
-            for stat in county_stats:
-                county_code = stat['voting_section__county']
-                if county_code:
-                    data[county_code] = {
-                        'total_voters': stat['total_votes'],
-                        'pollingStationCount': 0,  # Va fi actualizat mai jos
-                        'permanentListVoters': stat['unique_voters'],
-                        'supplementaryListVoters': 0,
-                        'specialCircumstancesVoters': 0,
-                        'mobileUrnsVoters': 0,
-                        'turnoutPercentage': '0.00'  # Va fi calculat după ce adăugăm registeredVoters
-                    }
-
-                # Adăugăm numărul de secții de votare pentru fiecare județ
-            polling_stations = VotingSection.objects.values('county')\
-                .annotate(station_count=Count('id'))\
-                .order_by('county')
-            
-            for station in polling_stations:
-                county_code = station['county']
-                if county_code in data:
-                    data[county_code]['pollingStationCount'] = station['station_count']
-                else:
-                    # Inițializăm datele pentru județe care nu au voturi încă
-                    data[county_code] = {
-                        'total_voters': 0,
-                        'pollingStationCount': station['station_count'],
-                        'permanentListVoters': 0,
-                        'supplementaryListVoters': 0,
-                        'specialCircumstancesVoters': 0,
-                        'mobileUrnsVoters': 0,
-                        'turnoutPercentage': '0.00'
-                    }
-            # Estimăm numărul de alegători înregistrați (simulare pentru exemplu)
-            for county_code in data:
-                data[county_code]['registeredVoters'] = data[county_code]['pollingStationCount'] * 1000
-
-                # Calculăm procentajul de prezență
-                if data[county_code]['registeredVoters'] > 0:
-                    turnout = (data[county_code]['total_voters'] / data[county_code]['registeredVoters']) * 100
-                    data[county_code]['turnoutPercentage'] = f"{turnout:.2f}"
-                
-                
-        elif vote_type == 'prezidentiale_tur2':
-                county_stats = PresidentialRound2Vote.objects.filter(
-                    voting_section__isnull=False
-                ).values('voting_section__county')\
-                    .annotate(
-                        total_votes=Count('id'),
-                        unique_voters=Count('user', distinct=True)
-                    )\
-                    .order_by('voting_section__county')
-                # Formatul datelor pentru frontend
-                data = {}
-                for stat in county_stats:
-                    county_code = stat['voting_section__county']
-                    if county_code:
-                        data[county_code] = {
-                            'total_voters': stat['total_votes'],
-                            'pollingStationCount': 0,  # Va fi actualizat mai jos
-                            'permanentListVoters': stat['unique_voters'],
-                            'supplementaryListVoters': 0,
-                            'specialCircumstancesVoters': 0,
-                            'mobileUrnsVoters': 0,
-                            'turnoutPercentage': '0.00'  # Va fi calculat după ce adăugăm registeredVoters
-                        }
-                # Adăugăm numărul de secții de votare pentru fiecare județ
-                polling_stations = VotingSection.objects.values('county')\
-                    .annotate(station_count=Count('id'))\
-                    .order_by('county')
-                
-                for station in polling_stations:
-                    county_code = station['county']
-                    if county_code in data:
-                        data[county_code]['pollingStationCount'] = station['station_count']
-                    else:
-                        # Inițializăm datele pentru județe care nu au voturi încă
-                        data[county_code] = {
-                            'total_voters': 0,
-                            'pollingStationCount': station['station_count'],
-                            'permanentListVoters': 0,
-                            'supplementaryListVoters': 0,
-                            'specialCircumstancesVoters': 0,
-                            'mobileUrnsVoters': 0,
-                            'turnoutPercentage': '0.00'
-                        }
-
-                # Estimăm numărul de alegători înregistrați (simulare pentru exemplu)
-                for county_code in data:
-                    data[county_code]['registeredVoters'] = data[county_code]['pollingStationCount'] * 1000
-
-                    # Calculăm procentajul de prezență
-                    if data[county_code]['registeredVoters'] > 0:
-                        turnout = (data[county_code]['total_voters'] / data[county_code]['registeredVoters']) * 100
-                        data[county_code]['turnoutPercentage'] = f"{turnout:.2f}"
-                    
-                return Response(data)
-            
-        elif vote_type == 'parlamentare':
-            county_stats = ParliamentaryVote.objects.filter(
-                voting_section__isnull=False
-            ).values('voting_section__county')\
-                .annotate(
-                    total_votes=Count('id'),
-                    unique_voters=Count('user', distinct=True)
-                )\
-                .order_by('voting_section__county')
-            
-            # Formatul datelor pentru frontend
-            data = {}
-            for stat in county_stats:
-                county_code = stat['voting_section__county']
-                if county_code:
-                    data[county_code] = {
-                        'total_voters': stat['total_votes'],
-                        'pollingStationCount': 0,  # Va fi actualizat mai jos
-                        'permanentListVoters': stat['unique_voters'],
-                        'supplementaryListVoters': 0,
-                        'specialCircumstancesVoters': 0,
-                        'mobileUrnsVoters': 0,
-                        'turnoutPercentage': '0.00'  # Va fi calculat după ce adăugăm registeredVoters
-                    }
-
-            # Adăugăm numărul de secții de votare pentru fiecare județ
-            polling_stations = VotingSection.objects.values('county')\
-                .annotate(station_count=Count('id'))\
-                .order_by('county')
-            
-            for station in polling_stations:
-                county_code = station['county']
-                if county_code in data:
-                    data[county_code]['pollingStationCount'] = station['station_count']
-                else:
-                    # Inițializăm datele pentru județe care nu au voturi încă
-                    data[county_code] = {
-                        'total_voters': 0,
-                        'pollingStationCount': station['station_count'],
-                        'permanentListVoters': 0,
-                        'supplementaryListVoters': 0,
-                        'specialCircumstancesVoters': 0,
-                        'mobileUrnsVoters': 0,
-                        'turnoutPercentage': '0.00'
-                    }
-
-                for county_code in data:
-                    data[county_code]['registeredVoters'] = data[county_code]['pollingStationCount'] * 1000
-
-                    # Calculăm procentajul de prezență
-                    if data[county_code]['registeredVoters'] > 0:
-                        turnout = (data[county_code]['total_voters'] / data[county_code]['registeredVoters']) * 100
-                        data[county_code]['turnoutPercentage'] = f"{turnout:.2f}"
-        
-        else:
+        if vote_type not in VOTE_MODELS:
             return Response({'error': f'Tip de vot nesuportat: {vote_type}'}, status=status.HTTP_400_BAD_REQUEST)
         
+        # Contoarele sunt actualizate la fiecare vot, deci citim doar câte un rând per județ
+        county_stats = get_county_turnout(vote_type)
+        
+        # Formatul datelor pentru frontend
+        data = {}
+        for county_code, stat in county_stats.items():
+            if county_code:
+                data[county_code] = {
+                    'total_voters': stat['total_votes'],
+                    'pollingStationCount': 0,  # Va fi actualizat mai jos
+                    'permanentListVoters': stat['unique_voters'],
+                    'supplementaryListVoters': 0,
+                    'specialCircumstancesVoters': 0,
+                    'mobileUrnsVoters': 0,
+                    'turnoutPercentage': '0.00'  # Va fi calculat după ce adăugăm registeredVoters
+                }
+        
+        # Adăugăm numărul de secții de votare pentru fiecare județ
+        for county_code, station_count in get_polling_station_counts().items():
+            if county_code in data:
+                data[county_code]['pollingStationCount'] = station_count
+            else:
+                # Inițializăm datele pentru județe care nu au voturi încă
+                data[county_code] = {
+                    'total_voters': 0,
+                    'pollingStationCount': station_count,
+                    'permanentListVoters': 0,
+                    'supplementaryListVoters': 0,
+                    'specialCircumstancesVoters': 0,
+                    'mobileUrnsVoters': 0,
+                    'turnoutPercentage': '0.00'
+                }
+        
+        # Estimăm numărul de alegători înregistrați (simulare pentru exemplu)
+        # În practică, acestea ar trebui obținute din altă sursă
+        for county_code in data:
+            # Presupunem că fiecare secție are în medie 1000 de alegători
+            data[county_code]['registeredVoters'] = data[county_code]['pollingStationCount'] * 1000
+            
+            # Calculăm procentajul de prezență
+            if data[county_code]['registeredVoters'] > 0:
+                turnout = (data[county_code]['total_voters'] / data[county_code]['registeredVoters']) * 100
+                data[county_code]['turnoutPercentage'] = f"{turnout:.2f}"
+        
         return Response(data)
     
 class ActiveRoundUATVotingStatisticsView(APIView):
@@ -3346,70 +3091,17 @@ class ActiveRoundUATVotingStatisticsView(APIView):
         # Normalizăm codul județului (upper case)
         county_code = county_code.upper()
         
-        # Obținem toate secțiile de votare din județul specificat (case insensitive)
-        voting_sections = VotingSection.objects.filter(county__iexact=county_code)
-        
-        if not voting_sections.exists():
-            return Response({'error': f'Nu există secții de votare pentru județul {county_code}'}, status=status.HTTP_404_NOT_FOUND)
+        # Tipul de vot determină contoarele din care luăm datele
+        vote_type = active_vote.vote_type
         
-        # Creăm un dicționar pentru a normaliza numele UAT-urilor
-        # Cheie: numele UAT în lowercase, Valoare: numele original
-        uat_names = {}
-        for section in voting_sections:
-            uat_lower = section.city.lower()
-            if uat_lower not in uat_names:
-                uat_names[uat_lower] = section.city  # Păstrăm formatul original
+        if vote_type not in VOTE_MODELS:
+            return Response({'error': f'Tip de vot nesuportat: {vote_type}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Inițializăm rezultatul
-        result = {}
-
-        # Tipul de vot determină tabela din care luăm datele
-        vote_type = active_vote.vote_type
+        # Toate UAT-urile județului sunt calculate din interogări grupate (cu cache scurt)
+        result = get_uat_turnout(vote_type, county_code)
         
-        # Pentru fiecare UAT normalizat, calculăm statisticile
-        for uat_lower, uat_original in uat_names.items():
-            # Obținem secțiile de votare pentru acest UAT (case insensitive)
-            uat_sections = voting_sections.filter(city__iexact=uat_original)
-            section_ids = [section.id for section in uat_sections]
-            
-            # Obținem toate voturile pentru aceste secții
-            if vote_type == 'locale':
-                uat_votes = LocalVote.objects.filter(voting_section_id__in=section_ids)
-            elif vote_type == 'prezidentiale':
-                uat_votes = PresidentialVote.objects.filter(voting_section_id__in=section_ids)
-            elif vote_type == 'prezidentiale_tur2':
-                uat_votes = PresidentialRound2Vote.objects.filter(voting_section_id__in=section_ids)
-            elif vote_type == 'parlamentare':
-                uat_votes = ParliamentaryVote.objects.filter(voting_section_id__in=section_ids)
-            else:
-                uat_votes = None
-                
-            # Calculăm numărul de alegători înregistrați (simulat pentru exemplu)
-            # În practică, ar trebui să aveți această informație în baza de date
-            registered_voters = len(section_ids) * 1000  # Estimat: 1000 de alegători per secție
-            
-            # Calculăm statisticile
-            uat_data = {
-                'name': uat_original,  # Folosim numele original
-                'code': f'{county_code}-{uat_original.replace(" ", "_")}',
-                'countyCode': county_code,
-                'registeredVoters': registered_voters,
-                'pollingStationCount': len(section_ids),
-                'permanentListVoters': uat_votes.count(),  # Număr de voturi
-                'supplementaryListVoters': 0,
-                'specialCircumstancesVoters': 0,
-                'mobileUrnsVoters': 0,
-                'totalVoters': uat_votes.count(),
-                'turnoutPercentage': f"{(uat_votes.count() / registered_voters * 100) if registered_voters > 0 else 0:.2f}"
-            }
-            
-            # Adăugăm datele UAT-ului la rezultat
-            result[uat_data['code']] = uat_data
-            
-            # Adăugăm și o variantă normalizată pentru frontend
-            normalized_code = f'{county_code}-{uat_lower.replace(" ", "_")}'
-            if normalized_code != uat_data['code']:
-                result[normalized_code] = uat_data.copy()
+        if result is None:
+            return Response({'error': f'Nu există secții de votare pentru județul {county_code}'}, status=status.HTTP_404_NOT_FOUND)
         
         return Response(result)
     
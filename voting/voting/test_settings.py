@@ -0,0 +1,9 @@
+"""
+Setările pentru teste: python manage.py test --settings=voting.test_settings
+
+Cozile de fundal rulează sincron, astfel încât testele văd efectele imediat.
+"""
+from .settings import *  # noqa: F401,F403
+
+VOTE_TOKEN_MAIL_ASYNC = False
+SECURITY_EVENTS_ASYNC = False
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voting.settings')
 
 application = get_wsgi_application()
+
+# Modelele AI sunt încărcate leneș; workerii de producție le pot pre-încărca
+# la pornire prin settings.MODEL_WARMUP (ex. ['toxic_classifier', 'id_card_detector'])
+from core.model_manager import model_manager  # noqa: E402
+
+model_manager.warm_up()